@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M (input, output) tokens, list prices. Keyed by model so the mock provider
+# reports the cost of the model it stands in for. Unknown models are priced at 0.
+MODEL_PRICING: Dict[str, tuple] = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "gemini-pro": (0.5, 1.5),
+    "gemini-1.5-pro": (1.25, 5.0),
+    "gemini-1.5-flash": (0.075, 0.3),
+    "mistral-large-latest": (2.0, 6.0),
+    "mistral-small-latest": (0.2, 0.6),
+    "open-mixtral-8x7b": (0.7, 0.7),
+    "open-mistral-7b": (0.25, 0.25),
+}
+
+# Price of a cached prompt token relative to a regular one, by model family: OpenAI automatic
+# prefix caching, Anthropic cache reads and Gemini context caching (storage is not priced).
+CACHED_INPUT_FACTOR: Dict[str, float] = {
+    "gpt": 0.5,
+    "claude": 0.1,
+    "gemini": 0.25,
+}
+
+
+def _cached_input_factor(model: str) -> float:
+    for family, factor in CACHED_INPUT_FACTOR.items():
+        if model.startswith(family):
+            return factor
+    return 1.0
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token) for providers that report no usage."""
+    return sum(len(t) for t in texts) // 4 + 1
+
+
+class TokenUsage(BaseModel):
+    """Token usage and cost of one or more LLM calls."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = Field(default=0, description="Prompt tokens served from a provider-side prompt cache")
+    cost_usd: float = 0.0
+    calls: int = 0
+    estimated: bool = Field(default=False, description="True if any figure is a local estimate, not provider-reported")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def reported(self) -> bool:
+        return self.prompt_tokens > 0 or self.completion_tokens > 0
+
+    def price(self, model: str) -> "TokenUsage":
+        """Fill `cost_usd` from MODEL_PRICING, charging cached prompt tokens at the discounted rate."""
+        input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+        cached = min(self.cached_tokens, self.prompt_tokens)
+        input_cost = (self.prompt_tokens - cached) * input_price + cached * input_price * _cached_input_factor(model)
+        self.cost_usd = (input_cost + self.completion_tokens * output_price) / 1_000_000
+        return self
+
+    def add(self, other: "TokenUsage") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.cost_usd += other.cost_usd
+        self.calls += other.calls
+        self.estimated = self.estimated or other.estimated
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "calls": self.calls,
+            "estimated": self.estimated,
+        }
+
+
+class UsageLedger:
+    """
+    Token/cost spend of one workflow run, broken down by stage, with an optional budget.
+    Agents record into the ledger bound to the current context (see `usage_scope`), so
+    concurrent runs sharing the same engines never mix their accounts.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, cost_budget_usd: Optional[float] = None):
+        self.token_budget = token_budget
+        self.cost_budget_usd = cost_budget_usd
+        self.total = TokenUsage()
+        self.stages: Dict[str, TokenUsage] = {}
+        self.degradations: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, usage: TokenUsage, stage: Optional[str] = None) -> None:
+        with self._lock:
+            self.total.add(usage)
+            self.stages.setdefault(stage or "unscoped", TokenUsage()).add(usage)
+
+    @property
+    def has_budget(self) -> bool:
+        return self.token_budget is not None or self.cost_budget_usd is not None
+
+    def spent_fraction(self) -> float:
+        """Share of the tightest budget already spent (0.0 without a budget)."""
+        fractions = [0.0]
+        if self.token_budget:
+            fractions.append(self.total.total_tokens / self.token_budget)
+        if self.cost_budget_usd:
+            fractions.append(self.total.cost_usd / self.cost_budget_usd)
+        return max(fractions)
+
+    def gate(self, name: str, share: float, calls_per_step: int = 2) -> "BudgetGate":
+        return BudgetGate(self, name, share, calls_per_step)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total": self.total.summary(),
+            "stages": {name: usage.summary() for name, usage in self.stages.items()},
+            "budget": {
+                "tokens": self.token_budget,
+                "cost_usd": self.cost_budget_usd,
+                "spent_fraction": round(self.spent_fraction(), 4),
+                "exceeded": self.spent_fraction() > 1.0,
+            },
+            "degraded": list(self.degradations),
+        }
+
+
+class BudgetGate:
+    """
+    Decides whether an iterative step (a generation, an arena round) may start.
+    A step is allowed only if the spend so far plus the expected cost of the step stays
+    within `share` of the budget, so the gate stops *before* overshooting. The first step
+    is priced as `calls_per_step` average calls of the run so far; later ones as the
+    costliest step already taken.
+    """
+
+    def __init__(self, ledger: UsageLedger, name: str, share: float, calls_per_step: int = 2):
+        self.ledger = ledger
+        self.name = name
+        self.share = share
+        self.calls_per_step = calls_per_step
+        self._last_spent: Optional[float] = None
+        self._step_cost = 0.0
+        self.steps = 0
+
+    def __call__(self) -> bool:
+        if not self.ledger.has_budget:
+            return True
+        spent = self.ledger.spent_fraction()
+        if self._last_spent is None:
+            calls = self.ledger.total.calls
+            self._step_cost = spent / calls * self.calls_per_step if calls else 0.0
+        else:
+            self._step_cost = max(self._step_cost, spent - self._last_spent)
+        self._last_spent = spent
+        if spent + self._step_cost > self.share:
+            outcome = f"stopped after {self.steps} step(s)" if self.steps else "skipped"
+            note = f"{self.name}: {outcome} at {spent:.0%} of budget"
+            logger.warning(f"💸 Budget gate {note}")
+            self.ledger.degradations.append(note)
+            return False
+        self.steps += 1
+        return True
+
+
+_ledger: contextvars.ContextVar[Optional[UsageLedger]] = contextvars.ContextVar("fitymi_usage_ledger", default=None)
+_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("fitymi_usage_stage", default=None)
+
+
+@contextmanager
+def usage_scope(ledger: UsageLedger) -> Iterator[UsageLedger]:
+    """Bind `ledger` to the current context: every LLM call made inside is recorded in it."""
+    token = _ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _ledger.reset(token)
+
+
+@contextmanager
+def stage_scope(stage: str) -> Iterator[None]:
+    """Attribute the LLM calls made inside to `stage`."""
+    token = _stage.set(stage)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def record_usage(usage: TokenUsage) -> None:
+    """Record one call in the ledger of the current context (no-op outside a workflow)."""
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.record(usage, _stage.get())
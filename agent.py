@@ -1,14 +1,21 @@
 import logging
 import asyncio
 import os
-from typing import List, Dict, Any, Optional
-from pathlib import Path
+from typing import List, Dict, Any, Optional, AsyncIterator, Mapping, Tuple
 from pydantic import BaseModel, Field, ValidationError
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+from clients import capture_response_headers, get_client_registry
+from cache import ResponseCache, make_cache_key
+from routing import ProviderRouter, RoutingPolicy
+from mock_provider import get_mock_provider
+from tracing import annotate, get_tracer
+from accounting import TokenUsage, estimate_tokens, record_usage
+from template_registry import DEFAULT_FRAMEWORK, get_template_registry
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - FITYMI - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -17,9 +24,17 @@ SUPPORTED_PROVIDERS = {
     "openai": ["gpt-4", "gpt-4-turbo", "gpt-4o", "gpt-3.5-turbo"],
     "anthropic": ["claude-3-opus-20240229", "claude-3-sonnet-20240229", "claude-3-haiku-20240307"],
     "google": ["gemini-pro", "gemini-1.5-pro", "gemini-1.5-flash"],
-    "mistral": ["mistral-large-latest", "mistral-small-latest", "open-mixtral-8x7b", "open-mistral-7b"]
+    "mistral": ["mistral-large-latest", "mistral-small-latest", "open-mixtral-8x7b", "open-mistral-7b"],
+    # Offline, deterministic stand-in (see mock_provider.py); accepts any model name
+    "mock": ["mock"]
 }
 
+# Prompt layouts. "classic": the system message is Layer 1 only and the user message carries
+# the brief followed by the protocols and the framework reference. "prefix": every static
+# layer (L1 role, L4/L5 protocols, framework) goes into the system message, a stable prefix
+# that providers can cache across calls; only the variable brief is sent as the user message.
+PROMPT_LAYOUTS = ("classic", "prefix")
+
 
 class TopologicConstraints(BaseModel):
     max_words: int = Field(default=500)
@@ -33,17 +48,69 @@ class FitymiPayload(BaseModel):
     task_definition: str
     verification_protocol: str
     aeo_shielding: str
+    # Named framework from the template registry, appended as the framework reference
+    framework: str = DEFAULT_FRAMEWORK
 
 
 class AgentResponse(BaseModel):
     raw_output: str
-    aeo_summary: Optional[str]
+    aeo_summary: Optional[str] = None
+    usage: TokenUsage = Field(default_factory=TokenUsage)
+
+
+def _set_usage(usage: Optional[TokenUsage], prompt_tokens: Any, completion_tokens: Any, cached_tokens: Any = None) -> None:
+    """Copy provider-reported counts into `usage` (missing or non-numeric values are ignored)."""
+    if usage is None:
+        return
+    if isinstance(prompt_tokens, int):
+        usage.prompt_tokens = prompt_tokens
+    if isinstance(completion_tokens, int):
+        usage.completion_tokens = completion_tokens
+    if isinstance(cached_tokens, int):
+        usage.cached_tokens = cached_tokens
+
+
+def _set_openai_usage(usage: Optional[TokenUsage], reported: Any) -> None:
+    """OpenAI/Mistral usage; OpenAI reports automatic prefix-cache hits in prompt_tokens_details."""
+    details = getattr(reported, "prompt_tokens_details", None)
+    _set_usage(usage, getattr(reported, "prompt_tokens", None), getattr(reported, "completion_tokens", None),
+               getattr(details, "cached_tokens", None))
+
+
+def _set_anthropic_usage(usage: Optional[TokenUsage], reported: Any) -> None:
+    """Anthropic reports cache reads and writes apart from `input_tokens`: fold them into the prompt count."""
+    input_tokens = getattr(reported, "input_tokens", None)
+    cache_read = getattr(reported, "cache_read_input_tokens", None)
+    cache_write = getattr(reported, "cache_creation_input_tokens", None)
+    if isinstance(input_tokens, int):
+        input_tokens += sum(n for n in (cache_read, cache_write) if isinstance(n, int))
+    _set_usage(usage, input_tokens, getattr(reported, "output_tokens", None), cache_read)
+
+
+def _set_google_usage(usage: Optional[TokenUsage], reported: Any) -> None:
+    _set_usage(usage, getattr(reported, "prompt_token_count", None), getattr(reported, "candidates_token_count", None),
+               getattr(reported, "cached_content_token_count", None))
 
 
 class FitymiCopyAgent:
-    def __init__(self, provider: str = "openai", model: str = "gpt-4o"):
-        self.provider = provider.lower()
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o",
+                 cache: Optional[ResponseCache] = None, role: Optional[str] = None,
+                 routing: Optional[RoutingPolicy] = None, prompt_layout: Optional[str] = None,
+                 temperature: Optional[float] = None, limiters: Optional[Mapping[str, Any]] = None):
+        # FITYMI_PROVIDER_OVERRIDE=mock reroutes every agent of the swarm (benchmarks, offline runs)
+        self.provider = (os.getenv("FITYMI_PROVIDER_OVERRIDE") or provider).lower()
         self.model = model
+        # Optional content-addressed response cache; `role` labels its hit/miss counters
+        self.cache = cache
+        self.role = role or f"{self.provider}/{model}"
+        # Deadlines, retries, hedging and fallbacks over SUPPORTED_PROVIDERS
+        self.routing = routing or RoutingPolicy.from_env()
+        self._fallback_agents: Dict[str, "FitymiCopyAgent"] = {}
+        self.prompt_layout = (prompt_layout or os.getenv("FITYMI_PROMPT_LAYOUT") or "classic").lower()
+        # Sampling temperature override (None = provider default)
+        self.temperature = temperature
+        # Shared provider -> RateLimiter map (core.neural_mesh.PROVIDER_LIMITERS); None = unthrottled
+        self.limiters = limiters
         self._validate_provider()
         self._setup_clients()
         logger.info(f"Init Fitymi Agent su {self.provider}/{self.model}")
@@ -55,24 +122,28 @@ class FitymiCopyAgent:
         
         # Allow any model for flexibility, but warn if not in known list
         known_models = SUPPORTED_PROVIDERS[self.provider]
-        if self.model not in known_models:
+        if self.model not in known_models and self.provider != "mock":
             logger.warning(f"Model '{self.model}' not in known models for {self.provider}. Proceeding anyway.")
+        if self.prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Prompt layout '{self.prompt_layout}' not supported. Supported layouts: {list(PROMPT_LAYOUTS)}")
 
     def _setup_clients(self) -> None:
-        """Initialize API clients for the selected provider."""
+        """Attach the pooled API client for the selected provider from the process-wide registry."""
         self._openai_client = None
         self._anthropic_client = None
+        self._mistral_client = None
         self._google_configured = False
+        self._google_api_key = None
+        registry = get_client_registry()
 
-        # Pre-initialize clients based on available API keys
+        # Reuse pooled clients based on available API keys
         if self.provider == "openai":
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 logger.warning("OPENAI_API_KEY environment variable not set. API calls will fail.")
             try:
-                from openai import AsyncOpenAI
-                self._openai_client = AsyncOpenAI(api_key=api_key) if api_key else None
-                logger.debug("OpenAI client initialized")
+                self._openai_client = registry.get_openai(api_key) if api_key else None
+                logger.debug("OpenAI client attached")
             except ImportError:
                 raise ImportError("openai package not installed. Run: pip install openai")
 
@@ -81,9 +152,8 @@ class FitymiCopyAgent:
             if not api_key:
                 logger.warning("ANTHROPIC_API_KEY environment variable not set. API calls will fail.")
             try:
-                from anthropic import AsyncAnthropic
-                self._anthropic_client = AsyncAnthropic(api_key=api_key) if api_key else None
-                logger.debug("Anthropic client initialized")
+                self._anthropic_client = registry.get_anthropic(api_key) if api_key else None
+                logger.debug("Anthropic client attached")
             except ImportError:
                 raise ImportError("anthropic package not installed. Run: pip install anthropic")
 
@@ -92,9 +162,9 @@ class FitymiCopyAgent:
             if not api_key:
                 logger.warning("GEMINI_API_KEY environment variable not set. API calls will fail.")
             try:
-                import google.generativeai as genai
                 if api_key:
-                    genai.configure(api_key=api_key)
+                    registry.configure_google(api_key)
+                self._google_api_key = api_key
                 self._google_configured = True if api_key else False
                 logger.debug("Google Gemini configured")
             except ImportError:
@@ -105,22 +175,17 @@ class FitymiCopyAgent:
             if not api_key:
                 logger.warning("MISTRAL_API_KEY environment variable not set. API calls will fail.")
             try:
-                from mistralai import Mistral
-                self._mistral_client = Mistral(api_key=api_key) if api_key else None
-                logger.debug("Mistral client initialized")
+                self._mistral_client = registry.get_mistral(api_key) if api_key else None
+                logger.debug("Mistral client attached")
             except ImportError:
                 raise ImportError("mistralai package not installed. Run: pip install mistralai")
 
-
-    def _load_template(self) -> str:
-        """Load the master framework template."""
-        template_path = Path(__file__).parent.parent / "templates" / "master_framework.md"
-        try:
-            with open(template_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
-            logger.warning(f"Template file not found at {template_path}, using default structure")
-            return ""
+    def _load_template(self, framework: str = DEFAULT_FRAMEWORK) -> str:
+        """Framework text from the in-memory template registry (no disk I/O on the call path)."""
+        registry = get_template_registry()
+        if framework not in registry:
+            raise ValueError(f"Framework '{framework}' not found. Available frameworks: {registry.frameworks()}")
+        return registry.get(framework)
 
     def _build_full_prompt(self, payload: FitymiPayload) -> tuple[str, str]:
         """Build the complete prompt from payload and template.
@@ -128,6 +193,19 @@ class FitymiCopyAgent:
         Returns:
             tuple: (system_message, user_message)
         """
+        if self.prompt_layout == "prefix":
+            # Static layers first and byte-identical across calls: a cacheable prefix
+            system_message = f"""{payload.system_prompt}
+
+{payload.verification_protocol}
+{payload.aeo_shielding}
+
+---
+Master Framework Reference:
+{self._load_template(payload.framework)}
+"""
+            return system_message, payload.user_context
+
         # Build system message from Layer 1
         system_message = payload.system_prompt
 
@@ -139,10 +217,21 @@ class FitymiCopyAgent:
 
 ---
 Master Framework Reference:
-{self._load_template()}
+{self._load_template(payload.framework)}
 """
         return system_message, user_message
 
+    def _sampling_params(self) -> Dict[str, Any]:
+        """Sampling parameters sent to the provider. Part of the response-cache key."""
+        params: Dict[str, Any] = {}
+        if self.provider == "openai":
+            params = {"temperature": 0.7, "max_tokens": 2000}
+        elif self.provider == "anthropic":
+            params = {"max_tokens": 2000}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        return params
+
     def build_payload(self, role: str, anchors: Dict, context: Dict, task: str, constraints: dict) -> FitymiPayload:
         valid_constraints = TopologicConstraints(**constraints)
         
@@ -154,8 +243,8 @@ Master Framework Reference:
 
         return FitymiPayload(system_prompt=l1, user_context=f"{l2}\n{l3}", task_definition=task, verification_protocol=l4, aeo_shielding=l5)
 
-    async def _call_openai(self, system_message: str, user_message: str) -> str:
-        """Call OpenAI API."""
+    async def _call_openai(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Call OpenAI API. Reported token counts are copied into `usage`."""
         try:
             response = await self._openai_client.chat.completions.create(
                 model=self.model,
@@ -163,68 +252,196 @@ Master Framework Reference:
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_message}
                 ],
-                temperature=0.7,
-                max_tokens=2000
+                **self._sampling_params()
             )
+            _set_openai_usage(usage, getattr(response, "usage", None))
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
             raise
 
-    async def _call_anthropic(self, system_message: str, user_message: str) -> str:
-        """Call Anthropic API."""
+    async def _call_anthropic(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Call Anthropic API. Reported token counts are copied into `usage`."""
         try:
             response = await self._anthropic_client.messages.create(
                 model=self.model,
-                max_tokens=2000,
-                system=system_message,
+                system=self._anthropic_system(system_message),
                 messages=[
                     {"role": "user", "content": user_message}
-                ]
+                ],
+                **self._sampling_params()
             )
+            _set_anthropic_usage(usage, getattr(response, "usage", None))
             return response.content[0].text
         except Exception as e:
             logger.error(f"Anthropic API error: {e}")
             raise
 
-    async def _call_google(self, system_message: str, user_message: str) -> str:
-        """Call Google Gemini API."""
+    async def _call_google(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Call Google Gemini API. Reported token counts are copied into `usage`."""
         try:
-            import google.generativeai as genai
-            
-            # Combine system and user message for Gemini
-            full_prompt = f"{system_message}\n\n{user_message}"
-            
-            # Create model and generate
-            model = genai.GenerativeModel(self.model)
-            
-            # Run in executor since google-generativeai is sync
+            # Run in executor since google-generativeai is sync (and context-cache setup does I/O)
+            def generate():
+                model, prompt = self._google_request(system_message, user_message)
+                return model.generate_content(prompt, generation_config=self._sampling_params() or None)
+
             loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: model.generate_content(full_prompt)
-            )
+            response = await loop.run_in_executor(None, generate)
             
+            _set_google_usage(usage, getattr(response, "usage_metadata", None))
             return response.text
         except Exception as e:
             logger.error(f"Google Gemini API error: {e}")
             raise
 
-    async def _call_mistral(self, system_message: str, user_message: str) -> str:
-        """Call Mistral API."""
+    async def _call_mistral(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Call Mistral API. Reported token counts are copied into `usage`."""
         try:
             response = await self._mistral_client.chat.complete_async(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_message}
-                ]
+                ],
+                **self._sampling_params()
             )
+            _set_openai_usage(usage, getattr(response, "usage", None))
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Mistral API error: {e}")
             raise
 
+    async def _call_mock(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Call the offline mock provider (resolved per call so its profile can be swapped at runtime)."""
+        mock = get_mock_provider()
+        output = await mock.complete(system_message, user_message)
+        # The mock reports usage like a real provider, using the same ~4 chars/token rule
+        _set_usage(usage, estimate_tokens(system_message, user_message), estimate_tokens(output), mock.cached_tokens(system_message))
+        return output
+
+    async def _stream_openai(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Stream OpenAI completion deltas; the final usage chunk is copied into `usage`."""
+        try:
+            stream = await self._openai_client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": user_message}
+                ],
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._sampling_params()
+            )
+            async for chunk in stream:
+                reported = getattr(chunk, "usage", None)
+                if reported is not None:
+                    _set_openai_usage(usage, reported)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise
+
+    async def _stream_anthropic(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Stream Anthropic text deltas; the final message usage is copied into `usage`."""
+        try:
+            async with self._anthropic_client.messages.stream(
+                model=self.model,
+                system=self._anthropic_system(system_message),
+                messages=[
+                    {"role": "user", "content": user_message}
+                ],
+                **self._sampling_params()
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                _set_anthropic_usage(usage, getattr(await stream.get_final_message(), "usage", None))
+        except Exception as e:
+            logger.error(f"Anthropic API error: {e}")
+            raise
+
+    async def _stream_google(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Stream Google Gemini chunks. The sync SDK iterator runs in an executor and feeds a queue."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                model, prompt = self._google_request(system_message, user_message)
+                for chunk in model.generate_content(prompt, stream=True, generation_config=self._sampling_params() or None):
+                    # Every chunk carries the running usage; the last one is the total
+                    _set_google_usage(usage, getattr(chunk, "usage_metadata", None))
+                    if chunk.text:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    logger.error(f"Google Gemini API error: {item}")
+                    raise item
+                yield item
+        finally:
+            await producer
+
+    async def _stream_mistral(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Stream Mistral completion deltas; the usage of the final event is copied into `usage`."""
+        try:
+            stream = await self._mistral_client.chat.stream_async(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": user_message}
+                ],
+                **self._sampling_params()
+            )
+            async for event in stream:
+                reported = getattr(event.data, "usage", None)
+                if reported is not None:
+                    _set_openai_usage(usage, reported)
+                delta = event.data.choices[0].delta.content if event.data.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            logger.error(f"Mistral API error: {e}")
+            raise
+
+    async def _stream_mock(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Stream the offline mock provider word by word."""
+        chunks: List[str] = []
+        mock = get_mock_provider()
+        async for chunk in mock.stream(system_message, user_message):
+            chunks.append(chunk)
+            yield chunk
+        _set_usage(usage, estimate_tokens(system_message, user_message), estimate_tokens("".join(chunks)), mock.cached_tokens(system_message))
+
+    def _anthropic_system(self, system_message: str) -> Any:
+        """In the prefix layout the system message is marked as a prompt-cache breakpoint."""
+        if self.prompt_layout != "prefix":
+            return system_message
+        return [{"type": "text", "text": system_message, "cache_control": {"type": "ephemeral"}}]
+
+    def _google_request(self, system_message: str, user_message: str) -> Tuple[Any, str]:
+        """
+        Model handle and prompt for Gemini. The classic layout sends one combined prompt; the
+        prefix layout binds the system message to the model as a (context-cached) system instruction.
+        """
+        system_instruction = system_message if self.prompt_layout == "prefix" else None
+        prompt = user_message if system_instruction else f"{system_message}\n\n{user_message}"
+        # Reuse the pooled model handle
+        if self._google_configured:
+            return get_client_registry().get_google_model(self._google_api_key, self.model, system_instruction), prompt
+        import google.generativeai as genai
+        return genai.GenerativeModel(self.model, system_instruction=system_instruction), prompt
+
     def _extract_aeo_summary(self, raw_output: str) -> Optional[str]:
         """Extract AEO summary from the response."""
         import re
@@ -234,32 +451,245 @@ Master Framework Reference:
             return match.group(1).strip()
         return None
 
+    async def _dispatch(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> str:
+        """Route the prompt to the configured provider."""
+        if self.provider == "openai":
+            return await self._call_openai(system_message, user_message, usage)
+        elif self.provider == "anthropic":
+            return await self._call_anthropic(system_message, user_message, usage)
+        elif self.provider == "google":
+            return await self._call_google(system_message, user_message, usage)
+        elif self.provider == "mistral":
+            return await self._call_mistral(system_message, user_message, usage)
+        elif self.provider == "mock":
+            return await self._call_mock(system_message, user_message, usage)
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+    def _stream(self, system_message: str, user_message: str, usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Open a streamed completion on the configured provider."""
+        streamers = {
+            "openai": self._stream_openai,
+            "anthropic": self._stream_anthropic,
+            "google": self._stream_google,
+            "mistral": self._stream_mistral,
+            "mock": self._stream_mock,
+        }
+        if self.provider not in streamers:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        return streamers[self.provider](system_message, user_message, usage)
+
+    @property
+    def route(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+    def _route_agent(self, route: str) -> "FitymiCopyAgent":
+        """Agent serving a fallback route; built lazily on top of the pooled clients."""
+        if route == self.route:
+            return self
+        if route not in self._fallback_agents:
+            provider, _, model = route.partition("/")
+            self._fallback_agents[route] = FitymiCopyAgent(provider=provider, model=model, routing=RoutingPolicy(fallbacks=[]),
+                                                           prompt_layout=self.prompt_layout, temperature=self.temperature)
+        return self._fallback_agents[route]
+
+    async def _dispatch_routed(self, system_message: str, user_message: str) -> Tuple[str, TokenUsage, str]:
+        """
+        Dispatch through the routing layer: primary route first, then the policy fallbacks.
+        Every attempt (retry, hedge, fallback) waits on the rate limiter of its own provider before
+        its deadline starts, reports its outcome to it and is charged to the current ledger, failed
+        and cancelled ones included (their prompt, estimated when the provider reported nothing).
+        Returns the output and the usage of the attempt that served it, priced for its model, and its route.
+        """
+        routes = [self.route] + [r for r in self.routing.fallbacks if r != self.route]
+        reserved = estimate_tokens(system_message, user_message)
+
+        async def acquire(route: str) -> None:
+            await self._acquire_limiter(self._route_agent(route).provider, reserved)
+
+        async def attempt(route: str) -> Tuple[str, TokenUsage]:
+            agent = self._route_agent(route)
+            limiter = self._limiter(agent.provider)
+            usage = TokenUsage()
+            try:
+                with capture_response_headers() as headers:
+                    output = await agent._dispatch(system_message, user_message, usage)
+            except BaseException as e:
+                # Failed retries, timeouts and losing hedges were sent too: charge what they cost
+                record_usage(self._settle_usage(usage, agent.model, system_message, user_message, ""))
+                if limiter is not None and isinstance(e, Exception):
+                    limiter.report_outcome(e)
+                raise
+            usage = self._settle_usage(usage, agent.model, system_message, user_message, output)
+            # Charged to the workflow ledger (and stage) this call runs under
+            record_usage(usage)
+            if limiter is not None:
+                # Settle the reserved prompt estimate against the real prompt + completion usage,
+                # then let the response headers (the provider's own count) have the last word
+                limiter.record_usage(usage.total_tokens, reserved_tokens=reserved)
+                limiter.report_outcome(headers=headers)
+            return output, usage, route
+
+        attempts = {route: (lambda route=route: attempt(route)) for route in routes}
+        return await ProviderRouter(self.routing).call(routes, attempts, acquire=acquire)
+
+    async def _open_stream_routed(self, system_message: str, user_message: str
+                                  ) -> Tuple["FitymiCopyAgent", AsyncIterator[str], str, TokenUsage, Dict[str, str]]:
+        """
+        Open a stream through the routing layer. Deadline, retries, breaker and fallbacks apply up to
+        the first chunk: once tokens reach the caller the stream cannot fail over. Attempts that fail
+        before it are charged and reported like `_dispatch_routed` ones. Returns the agent of the route
+        that answered, its stream, the first chunk, the usage the stream fills in and its response headers.
+        """
+        routes = [self.route] + [r for r in self.routing.fallbacks if r != self.route]
+        reserved = estimate_tokens(system_message, user_message)
+
+        async def acquire(route: str) -> None:
+            await self._acquire_limiter(self._route_agent(route).provider, reserved)
+
+        async def attempt(route: str):
+            agent = self._route_agent(route)
+            usage = TokenUsage()
+            try:
+                stream = agent._stream(system_message, user_message, usage)
+                with capture_response_headers() as headers:
+                    try:
+                        first = await stream.__anext__()
+                    except StopAsyncIteration:
+                        first = ""
+            except BaseException as e:
+                record_usage(self._settle_usage(usage, agent.model, system_message, user_message, ""))
+                limiter = self._limiter(agent.provider)
+                if limiter is not None and isinstance(e, Exception):
+                    limiter.report_outcome(e)
+                raise
+            return agent, stream, first, usage, headers
+
+        attempts = {route: (lambda route=route: attempt(route)) for route in routes}
+        return await ProviderRouter(self.routing).call(routes, attempts, acquire=acquire)
+
+    def _limiter(self, provider: str) -> Optional[Any]:
+        return self.limiters.get(provider) if self.limiters is not None else None
+
+    async def _acquire_limiter(self, provider: str, tokens: int) -> None:
+        limiter = self._limiter(provider)
+        if limiter is not None:
+            with get_tracer().span("limiter.wait", provider=provider, tokens=tokens):
+                await limiter.acquire(tokens)
+
+    @staticmethod
+    def _settle_usage(usage: TokenUsage, model: str, system_message: str, user_message: str, output: str) -> TokenUsage:
+        """Fall back to local estimates when the provider reported nothing, then price the call."""
+        if not usage.reported:
+            usage.prompt_tokens = estimate_tokens(system_message, user_message)
+            # A failed attempt produced no completion
+            usage.completion_tokens = estimate_tokens(output) if output else 0
+            usage.estimated = True
+        usage.calls = 1
+        return usage.price(model)
+
+    def _span_attributes(self, system_message: str, user_message: str) -> Dict[str, Any]:
+        """Tags of the `llm.call` span; the prompt size is replaced by the reported usage after the call."""
+        return {"provider": self.provider, "model": self.model, "role": self.role,
+                "prompt_tokens": estimate_tokens(system_message, user_message)}
+
+    @staticmethod
+    def _annotate_usage(span, usage: TokenUsage) -> None:
+        if span is not None and usage.calls:
+            span.set(prompt_tokens=usage.prompt_tokens, cached_tokens=usage.cached_tokens,
+                     response_tokens=usage.completion_tokens, cost_usd=usage.cost_usd, usage_estimated=usage.estimated)
+
     async def execute(self, payload: FitymiPayload) -> AgentResponse:
         """Execute the LLM API call based on the configured provider."""
         logger.info(f"Avvio inferenza Fitymi con {self.provider}/{self.model}...")
         
         # Build the full prompt
         system_message, user_message = self._build_full_prompt(payload)
+
+        with get_tracer().span("llm.call", **self._span_attributes(system_message, user_message)) as span:
+            response = await self._execute_prompt(system_message, user_message)
+            self._annotate_usage(span, response.usage)
+            return response
+
+    async def _execute_prompt(self, system_message: str, user_message: str) -> AgentResponse:
+        """Cache lookup, routed dispatch and cache write-back for a built prompt."""
+        cache_key = None
+        annotate(cache="off")
+        if self.cache is not None:
+            cache_key = make_cache_key(self.provider, self.model, system_message, user_message, self._sampling_params())
+            cached_output = self.cache.get(cache_key, role=self.role)
+            annotate(cache="hit" if cached_output is not None else "miss")
+            if cached_output is not None:
+                logger.info(f"🗄️ Cache hit per {self.role}")
+                return AgentResponse(raw_output=cached_output, aeo_summary=self._extract_aeo_summary(cached_output))
         
         # Call the appropriate API
         try:
-            if self.provider == "openai":
-                raw_output = await self._call_openai(system_message, user_message)
-            elif self.provider == "anthropic":
-                raw_output = await self._call_anthropic(system_message, user_message)
-            elif self.provider == "google":
-                raw_output = await self._call_google(system_message, user_message)
-            elif self.provider == "mistral":
-                raw_output = await self._call_mistral(system_message, user_message)
-            else:
-                raise ValueError(f"Unsupported provider: {self.provider}")
+            raw_output, usage, route = await self._dispatch_routed(system_message, user_message)
             
             # Extract AEO summary
             aeo_summary = self._extract_aeo_summary(raw_output)
+
+            # The key is the primary route's: a fallback model's answer must not be replayed as its own
+            if cache_key is not None and raw_output and route == self.route:
+                self.cache.set(cache_key, raw_output)
             
             logger.info("Inferenza completata con successo")
-            return AgentResponse(raw_output=raw_output, aeo_summary=aeo_summary)
+            return AgentResponse(raw_output=raw_output, aeo_summary=aeo_summary, usage=usage)
             
         except Exception as e:
             logger.error(f"Errore durante inferenza: {e}")
             raise
+
+    async def execute_stream(self, payload: FitymiPayload) -> AsyncIterator[str]:
+        """
+        Streaming variant of `execute`: yields text chunks as the provider decodes them.
+        Cache hits are replayed as a single chunk; misses are routed like `execute` up to the first
+        chunk (rate limiter, deadline, retries, fallbacks). Completed streams of the primary route
+        are written back to the cache.
+        """
+        logger.info(f"Avvio inferenza streaming Fitymi con {self.provider}/{self.model}...")
+        system_message, user_message = self._build_full_prompt(payload)
+
+        with get_tracer().span("llm.call", streaming=True, **self._span_attributes(system_message, user_message)) as span:
+            cache_key = None
+            annotate(cache="off")
+            if self.cache is not None:
+                cache_key = make_cache_key(self.provider, self.model, system_message, user_message, self._sampling_params())
+                cached_output = self.cache.get(cache_key, role=self.role)
+                annotate(cache="hit" if cached_output is not None else "miss")
+                if cached_output is not None:
+                    logger.info(f"🗄️ Cache hit per {self.role}")
+                    yield cached_output
+                    return
+
+            # Only cache misses reach the provider, so only they take a limiter slot
+            agent, stream, first, usage, headers = await self._open_stream_routed(system_message, user_message)
+            limiter = self._limiter(agent.provider)
+            chunks: List[str] = []
+            try:
+                if first:
+                    chunks.append(first)
+                    yield first
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            except BaseException as e:
+                # Past the first token the stream cannot fail over: charge what was sent and give up
+                record_usage(self._settle_usage(usage, agent.model, system_message, user_message, "".join(chunks)))
+                if isinstance(e, Exception):
+                    logger.error(f"Errore durante inferenza streaming: {e}")
+                    if limiter is not None:
+                        limiter.report_outcome(e)
+                raise
+
+            output = "".join(chunks)
+            if cache_key is not None and output and agent is self:
+                self.cache.set(cache_key, output)
+            self._settle_usage(usage, agent.model, system_message, user_message, output)
+            record_usage(usage)
+            if limiter is not None:
+                limiter.record_usage(usage.total_tokens, reserved_tokens=estimate_tokens(system_message, user_message))
+                limiter.report_outcome(headers=headers)
+            self._annotate_usage(span, usage)
+            logger.info("Inferenza streaming completata con successo")
@@ -1,12 +1,35 @@
-from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import HTMLResponse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Dict, Any, Optional
 
 from nexus import FitymiNexus, NexusContext
+from clients import get_client_registry
+from cache import get_response_cache
+from jobs import JobManager, QueueFullError
+from tracing import get_tracer
+from template_registry import DEFAULT_FRAMEWORK, get_template_registry, validate_framework
 
-app = FastAPI(title="Fitymi Nexus API", version="2026.5.0", description="Multi-Agent AEO Copywriting Architecture")
+
+async def _run_job(request: Dict[str, Any]) -> Dict[str, Any]:
+    return await nexus_engine.execute_workflow(NexusContext(**request))
+
+job_manager = JobManager.from_env(_run_job)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    # Drain the shared keep-alive pools of every provider client
+    await get_client_registry().aclose()
+
+app = FastAPI(title="Fitymi Nexus API", version="2026.5.0", description="Multi-Agent AEO Copywriting Architecture", lifespan=lifespan)
 
 class CopyRequest(BaseModel):
     brand: str
@@ -15,25 +38,40 @@ class CopyRequest(BaseModel):
     goal: str
     task_type: str
     constraints: Optional[Dict[str, Any]] = {"max_words": 150, "tone": "assertive, no hype"}
+    token_budget: Optional[int] = None
+    cost_budget_usd: Optional[float] = None
+    framework: str = DEFAULT_FRAMEWORK
+    workflow_id: Optional[str] = None
+
+    @field_validator("framework")
+    @classmethod
+    def _known_framework(cls, value: str) -> str:
+        return validate_framework(value)
 
 nexus_engine = FitymiNexus()
 
 @app.get("/", response_class=HTMLResponse)
 async def serve_dashboard():
-    with open("templates/index.html", "r") as f:
-        html_content = f.read()
-    return html_content
+    # Served from memory; the registry reloads the file when it changes
+    return get_template_registry().get("dashboard")
 
-@app.post("/api/v1/generate")
-async def generate_copy(request: CopyRequest):
-    ctx = NexusContext(
+def _build_context(request: CopyRequest) -> NexusContext:
+    return NexusContext(
         brand=request.brand,
         target_audience=request.target_audience,
         product=request.product,
         goal=request.goal,
         task_type=request.task_type,
-        constraints=request.constraints or {}
+        constraints=request.constraints or {},
+        token_budget=request.token_budget,
+        cost_budget_usd=request.cost_budget_usd,
+        framework=request.framework,
+        workflow_id=request.workflow_id
     )
+
+@app.post("/api/v1/generate")
+async def generate_copy(request: CopyRequest):
+    ctx = _build_context(request)
     
     # Execute the MoA Direct Acyclic Graph
     result = await nexus_engine.execute_workflow(ctx)
@@ -43,6 +81,98 @@ async def generate_copy(request: CopyRequest):
         "data": result
     }
 
+@app.post("/api/v1/generate/stream")
+async def generate_copy_stream(request: CopyRequest):
+    """
+    Server-Sent Events variant of /api/v1/generate.
+    Emits stage_start / stage_output / stage_end events while the swarm runs,
+    `token` events as the final copy is decoded, then a single `result` (or `error`) event.
+    """
+    ctx = _build_context(request)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_workflow():
+        try:
+            result = await nexus_engine.execute_workflow(ctx, on_event=queue.put_nowait)
+            queue.put_nowait({"event": "result", "data": result})
+        except Exception as e:
+            queue.put_nowait({"event": "error", "data": {"message": str(e)}})
+        finally:
+            queue.put_nowait(None)
+
+    async def event_stream():
+        task = asyncio.create_task(run_workflow())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            # Client went away: stop spending provider calls on an unread stream
+            task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/v1/jobs", status_code=202)
+async def submit_job(request: CopyRequest):
+    ctx = _build_context(request)
+    try:
+        job = job_manager.submit(ctx.model_dump())
+    except QueueFullError as e:
+        # Backpressure: tell the caller to come back instead of holding the connection
+        return JSONResponse(status_code=429, content={"status": "rejected", "detail": str(e)}, headers={"Retry-After": "30"})
+    return {"status": "accepted", "job_id": job.id, "job_status": job.status, "queue_depth": job_manager.queue_depth}
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.model_dump()
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.model_dump()
+
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    cache = get_response_cache()
+    return {
+        "enabled": cache is not None,
+        "roles": cache.stats() if cache is not None else {}
+    }
+
+@app.get("/api/v1/frameworks")
+async def list_frameworks():
+    """Names accepted by the `framework` field of generation requests."""
+    return {"default": DEFAULT_FRAMEWORK, "frameworks": get_template_registry().frameworks()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Span latency histograms and token counters in Prometheus text format."""
+    return PlainTextResponse(get_tracer().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/traces")
+async def list_spans(limit: int = 500):
+    """Most recent finished spans across all runs."""
+    return [span.model_dump() for span in get_tracer().spans(limit=limit)]
+
+@app.get("/api/v1/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All spans of one workflow run (its `trace_id` is returned with the result)."""
+    spans = get_tracer().spans(trace_id=trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return [span.model_dump() for span in spans]
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
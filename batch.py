@@ -0,0 +1,183 @@
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from pydantic import BaseModel, ValidationError
+
+from nexus import NexusContext
+
+logger = logging.getLogger(__name__)
+
+# Brief files picked up when the batch source is a directory
+BRIEF_SUFFIXES = {".txt", ".md"}
+
+# Column aliases accepted in JSONL/CSV rows, mapped to NexusContext fields
+_ALIASES = {"audience": "target_audience", "task": "task_type"}
+_CONTEXT_FIELDS = {"brand", "target_audience", "product", "goal", "task_type", "constraints",
+                   "token_budget", "cost_budget_usd", "framework", "workflow_id"}
+DEFAULT_TONE = "human-first, assertivo, zero hype"
+
+
+class BatchItem(BaseModel):
+    """One brief of a batch. `id` keys the output row and makes reruns resumable."""
+    id: str
+    row: Dict[str, Any]
+
+
+def _row_id(row: Dict[str, Any]) -> str:
+    """Explicit `id` column, or a digest of the row content (stable across reruns and reorderings)."""
+    if row.get("id") not in (None, ""):
+        return str(row["id"])
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def load_batch(source: Path) -> Iterator[BatchItem]:
+    """
+    Yield the briefs of a batch source: a JSONL file (one object per line), a CSV file
+    with a header row, or a directory of brief files (.txt/.md, one brief each).
+    """
+    source = Path(source)
+    if source.is_dir():
+        for path in sorted(p for p in source.iterdir() if p.suffix.lower() in BRIEF_SUFFIXES):
+            yield BatchItem(id=path.name, row={"brief": path.read_text(encoding="utf-8")})
+    elif source.suffix.lower() == ".csv":
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                # Empty cells mean "use the default", not an empty value
+                row = {k: v for k, v in row.items() if k and v not in (None, "")}
+                yield BatchItem(id=_row_id(row), row=row)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping line {line_no} of {source}: {e}")
+                    continue
+                yield BatchItem(id=_row_id(row), row=row)
+
+
+def build_context(row: Dict[str, Any], defaults: Dict[str, Any]) -> NexusContext:
+    """
+    Map a batch row onto NexusContext. Known fields (and the `audience`/`task` aliases) fill the
+    context; `brief` becomes `constraints.brief_content`; any other column is merged into the
+    constraints (e.g. `max_words`, product attributes of a catalogue export).
+    """
+    fields = dict(defaults)
+    constraints: Dict[str, Any] = {"tone": DEFAULT_TONE}
+    for key, value in row.items():
+        key = _ALIASES.get(key, key)
+        if key == "id":
+            continue
+        if key == "constraints":
+            constraints.update(json.loads(value) if isinstance(value, str) else value)
+        elif key == "brief":
+            constraints["brief_content"] = value
+        elif key in _CONTEXT_FIELDS:
+            fields[key] = value
+        else:
+            constraints[key] = value
+    return NexusContext(**fields, constraints=constraints)
+
+
+def completed_ids(output_path: Path) -> Set[str]:
+    """Ids already written with status "ok" (a truncated last line from a crash is ignored)."""
+    done: Set[str] = set()
+    if not Path(output_path).exists():
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+class BatchRunner:
+    """
+    Runs many briefs through one shared FitymiNexus (one set of pooled clients, limiters and
+    caches) with at most `concurrency` workflows in flight. Each result is appended to the
+    JSONL output as soon as it finishes, so an interrupted batch resumes where it stopped:
+    rows already recorded as "ok" are skipped, failed rows are retried.
+    """
+
+    def __init__(self, nexus, output_path: Path, concurrency: int = 4, resume: bool = True,
+                 defaults: Optional[Dict[str, Any]] = None):
+        self.nexus = nexus
+        self.output_path = Path(output_path)
+        self.concurrency = max(1, concurrency)
+        self.resume = resume
+        self.defaults = defaults or {}
+        self.stats = {"ok": 0, "error": 0, "skipped": 0}
+
+    def _terminate_partial_line(self) -> None:
+        """A crash mid-write leaves a line without newline: close it so the next record stays parseable."""
+        if self.output_path.exists() and self.output_path.stat().st_size:
+            with open(self.output_path, "rb") as f:
+                f.seek(-1, 2)
+                if f.read(1) != b"\n":
+                    with open(self.output_path, "a", encoding="utf-8") as out:
+                        out.write("\n")
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with open(self.output_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    async def _run_item(self, item: BatchItem) -> None:
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"id": item.id}
+        try:
+            context = build_context(item.row, self.defaults)
+            if context.workflow_id is None:
+                # A rerun of the row resumes from the stages its failed attempt completed
+                context.workflow_id = f"batch:{item.id}"
+        except (ValidationError, ValueError) as e:
+            context = None
+            record.update(status="error", error=f"Invalid brief: {e}")
+        if context is not None:
+            try:
+                result = await self.nexus.execute_workflow(context)
+                record.update(status="ok", final_copy=result.get("final_copy"), final_score=result.get("final_score"),
+                              usage=result.get("usage"), trace_id=result.get("trace_id"), result=result)
+            except Exception as e:
+                record.update(status="error", error=str(e))
+        record["duration_s"] = round(time.perf_counter() - start, 3)
+        self._write(record)
+        self.stats[record["status"]] += 1
+        if record["status"] == "ok":
+            logger.info(f"✅ Batch item {item.id} completed in {record['duration_s']}s")
+        else:
+            logger.error(f"❌ Batch item {item.id} failed: {record['error']}")
+
+    async def run(self, items: Iterable[BatchItem]) -> Dict[str, int]:
+        """Process `items`; returns counts of ok, error and skipped rows."""
+        skip = completed_ids(self.output_path) if self.resume else set()
+        if not self.resume and self.output_path.exists():
+            self.output_path.unlink()
+        self._terminate_partial_line()
+        seen: Set[str] = set()
+        iterator = iter(items)
+
+        async def worker():
+            # Workers pull lazily from one shared iterator: thousands of rows, never thousands of tasks
+            for item in iterator:
+                if item.id in skip or item.id in seen:
+                    self.stats["skipped"] += 1
+                    continue
+                seen.add(item.id)
+                await self._run_item(item)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        logger.info(f"📦 Batch done: {self.stats['ok']} ok, {self.stats['error']} failed, "
+                    f"{self.stats['skipped']} skipped -> {self.output_path}")
+        return dict(self.stats)
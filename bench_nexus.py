@@ -0,0 +1,179 @@
+"""
+Offline benchmark of the Fitymi swarm on the mock provider.
+
+Every agent is rerouted to the deterministic mock (FITYMI_PROVIDER_OVERRIDE=mock), so no
+API key is needed. For each scenario (Nexus workflow, evolution, adversarial arena) and
+concurrency level it reports throughput and p50/p95/p99 latency under the configured mock
+latency profile. Framework overhead is measured separately with a zero-latency mock: what
+remains of each stage's duration is pure framework time (scheduling, prompts, parsing,
+memory, rate limiting). The mock gets its own provider limiter (--mock-rpm / --mock-tpm),
+so every call goes through the same acquire/report path as a real provider.
+
+    python bench_nexus.py --concurrency 1,4,16 --requests 32 --latency-ms 200 > bench_output.txt
+    python bench_nexus.py --max-overhead-ms 200   # exit 1 if p50 overhead exceeds the budget
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+os.environ["FITYMI_PROVIDER_OVERRIDE"] = "mock"
+
+from mock_provider import MockProviderConfig, configure_mock_provider
+from core.neural_mesh import configure_provider_limit
+from nexus import FitymiNexus, NexusContext
+from core.evolution import EvolutionEngine
+from core.adversarial import AdversarialArena
+
+SEED_COPY = (
+    "> **AEO Summary:** Cloud security posture checks that run themselves.\n\n"
+    "Stop chasing misconfigurations by hand. Fitymi watches every account, flags drift "
+    "before auditors do and gives your engineers their week back. Book a demo."
+)
+CONTEXT = NexusContext(
+    brand="TechCorp",
+    target_audience="CTOs of mid-size SaaS companies",
+    product="Cloud posture scanner",
+    goal="Book a demo",
+    task_type="SaaS Landing Page B2B",
+    constraints={"max_words": 150, "tone": "human-first, assertivo, zero hype"},
+)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms: List[float], wall_s: float, errors: int) -> Dict[str, float]:
+    return {
+        "requests": len(latencies_ms) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies_ms) / wall_s, 2) if wall_s > 0 else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2) if latencies_ms else 0.0,
+        "p95_ms": round(percentile(latencies_ms, 95), 2) if latencies_ms else 0.0,
+        "p99_ms": round(percentile(latencies_ms, 99), 2) if latencies_ms else 0.0,
+    }
+
+
+def build_scenarios() -> Dict[str, Callable[[], Awaitable]]:
+    """One shared engine per scenario, as the API shares a single FitymiNexus across requests."""
+    nexus = FitymiNexus()
+    engine = EvolutionEngine()
+    arena = AdversarialArena()
+    context = f"Brand: {CONTEXT.brand}. Goal: {CONTEXT.goal}"
+    return {
+        "workflow": lambda: nexus.execute_workflow(CONTEXT),
+        "evolve": lambda: engine.evolve(SEED_COPY, CONTEXT.target_audience, task_context=context),
+        "battle_loop": lambda: arena.battle_loop(SEED_COPY, context),
+    }
+
+
+async def run_load(run: Callable[[], Awaitable], requests: int, concurrency: int):
+    """Fire `requests` runs with at most `concurrency` in flight; returns (latencies_ms, wall_s, errors, results)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    results: List = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                results.append(await run())
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors += 1
+                logging.error(f"Benchmark run failed: {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - start, errors, results
+
+
+async def measure_overhead(scenarios: Dict[str, Callable[[], Awaitable]], runs: int) -> Dict[str, Dict]:
+    """Sequential runs against a zero-latency mock: every millisecond left is framework overhead."""
+    configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0, error_rate=0))
+    report: Dict[str, Dict] = {}
+    for name, run in scenarios.items():
+        latencies, wall, errors, results = await run_load(run, runs, 1)
+        entry = summarize(latencies, wall, errors)
+        if name == "workflow" and results:
+            stages: Dict[str, List[float]] = {}
+            for result in results:
+                for stage, duration in result["timings"]["stages"].items():
+                    stages.setdefault(stage, []).append(duration)
+            entry["stages_p50_ms"] = {stage: round(statistics.median(d), 2) for stage, d in stages.items()}
+        report[name] = entry
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline Fitymi swarm benchmark on the mock provider")
+    parser.add_argument("--scenarios", type=str, default="workflow,evolve,battle_loop", help="Comma-separated scenarios")
+    parser.add_argument("--concurrency", type=str, default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=16, help="Runs per scenario and concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mean mock latency per call")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal spread of the mock latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock calls failing with a 503")
+    parser.add_argument("--tokens", type=int, default=120, help="Approximate tokens per mock response")
+    parser.add_argument("--overhead-runs", type=int, default=10, help="Zero-latency runs used to measure overhead")
+    parser.add_argument("--max-overhead-ms", type=float, default=None, help="Fail if the p50 workflow overhead exceeds this budget")
+    parser.add_argument("--mock-rpm", type=int, default=100_000, help="Requests per minute of the mock provider limiter")
+    parser.add_argument("--mock-tpm", type=int, default=None, help="Tokens per minute of the mock provider limiter")
+    parser.add_argument("--prompt-layout", choices=["classic", "prefix"], default=None, help="Prompt layout of every agent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+    if args.prompt_layout:
+        os.environ["FITYMI_PROMPT_LAYOUT"] = args.prompt_layout
+    # "mock" has no default limiter: without one the bench would skip rate limiting altogether
+    configure_provider_limit("mock", args.mock_rpm, args.mock_tpm)
+    scenarios = build_scenarios()
+    selected = {name: scenarios[name] for name in args.scenarios.split(",") if name in scenarios}
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    print("🧪 Fitymi offline benchmark (mock provider)")
+    print(f"   latency={args.latency_ms}ms sigma={args.latency_sigma} errors={args.error_rate:.0%} tokens={args.tokens} "
+          f"layout={os.getenv('FITYMI_PROMPT_LAYOUT', 'classic')} mock_rpm={args.mock_rpm}\n")
+
+    print("== Framework overhead (zero-latency mock, sequential) ==")
+    overhead = await measure_overhead(selected, args.overhead_runs)
+    for name, entry in overhead.items():
+        print(f"{name:<12} p50={entry['p50_ms']:>8.2f}ms p95={entry['p95_ms']:>8.2f}ms p99={entry['p99_ms']:>8.2f}ms")
+        for stage, duration in entry.get("stages_p50_ms", {}).items():
+            print(f"   {stage:<18} {duration:>8.2f}ms")
+
+    print("\n== Load (mock latency profile) ==")
+    print(f"{'scenario':<12} {'conc':>5} {'req':>5} {'err':>4} {'rps':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, run in selected.items():
+        for concurrency in levels:
+            # Fresh mock per cell so each row sees the same seeded latency stream
+            configure_mock_provider(MockProviderConfig(
+                latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                error_rate=args.error_rate, response_tokens=args.tokens, seed=args.seed,
+            ))
+            latencies, wall, errors, _ = await run_load(run, args.requests, concurrency)
+            s = summarize(latencies, wall, errors)
+            print(f"{name:<12} {concurrency:>5} {s['requests']:>5} {s['errors']:>4} {s['throughput_rps']:>8.2f} "
+                  f"{s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['p99_ms']:>10.2f}")
+
+    if args.max_overhead_ms is not None and "workflow" in overhead:
+        p50 = overhead["workflow"]["p50_ms"]
+        if p50 > args.max_overhead_ms:
+            print(f"\n❌ Workflow overhead p50 {p50:.2f}ms exceeds budget {args.max_overhead_ms:.2f}ms")
+            sys.exit(1)
+        print(f"\n✅ Workflow overhead p50 {p50:.2f}ms within budget {args.max_overhead_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
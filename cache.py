@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(provider: str, model: str, system_message: str, user_message: str,
+                   params: Optional[Dict[str, Any]] = None) -> str:
+    """Content address of an LLM call: SHA-256 over provider, model, prompts and sampling params."""
+    material = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "system": system_message,
+            "user": user_message,
+            "params": params or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class for LLM response caches.
+    Backends implement `_get`/`_set`; hit/miss accounting per agent role lives here.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def _record(self, role: str, hit: bool) -> None:
+        with self._stats_lock:
+            counters = self._stats.setdefault(role, {"hits": 0, "misses": 0})
+            counters["hits" if hit else "misses"] += 1
+
+    def get(self, key: str, role: str = "default") -> Optional[str]:
+        value = self._get(key)
+        self._record(role, value is not None)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._set(key, value)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters and hit ratio per role."""
+        with self._stats_lock:
+            report = {}
+            for role, counters in self._stats.items():
+                total = counters["hits"] + counters["misses"]
+                report[role] = {**counters, "hit_ratio": round(counters["hits"] / total, 4) if total else 0.0}
+            return report
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and (time.time() - created_at) > self.ttl
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with optional TTL."""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 10_000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self._expired(created_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """On-disk cache shared across processes and restarts. Evicts by TTL and least-recent access."""
+
+    def __init__(self, path: str = ".fitymi_cache.sqlite3", ttl: Optional[float] = None, max_entries: int = 100_000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self._expired(created_at):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_cache: Optional[ResponseCache] = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the process-wide response cache configured through the environment:
+    FITYMI_CACHE=memory|sqlite (unset disables caching), FITYMI_CACHE_TTL (seconds),
+    FITYMI_CACHE_MAX_ENTRIES and FITYMI_CACHE_PATH (sqlite only).
+    """
+    global _cache, _cache_configured
+    with _cache_lock:
+        if not _cache_configured:
+            backend = os.getenv("FITYMI_CACHE", "").lower()
+            ttl = float(os.getenv("FITYMI_CACHE_TTL")) if os.getenv("FITYMI_CACHE_TTL") else None
+            max_entries = int(os.getenv("FITYMI_CACHE_MAX_ENTRIES", "10000"))
+            if backend == "memory":
+                _cache = MemoryResponseCache(ttl=ttl, max_entries=max_entries)
+            elif backend == "sqlite":
+                _cache = SQLiteResponseCache(os.getenv("FITYMI_CACHE_PATH", ".fitymi_cache.sqlite3"), ttl=ttl, max_entries=max_entries)
+            elif backend:
+                logger.warning(f"Unknown FITYMI_CACHE backend '{backend}'. Response caching disabled.")
+            if _cache is not None:
+                logger.info(f"🗄️ LLM response cache enabled ({backend}).")
+            _cache_configured = True
+        return _cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Override the process-wide cache (e.g. in tests or batch jobs)."""
+    global _cache, _cache_configured
+    with _cache_lock:
+        _cache = cache
+        _cache_configured = True
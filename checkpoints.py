@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Pluggable persistence for stage outputs, keyed by (workflow_id, stage).
+    Values must be JSON-serialisable. Checkpoints older than `ttl` seconds are ignored,
+    so a stale failed run never leaks into a much later request with the same id.
+    """
+
+    def __init__(self, ttl: float = 86400.0):
+        self.ttl = ttl
+
+    def load(self, workflow_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save(self, workflow_id: str, stage: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def clear(self, workflow_id: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """Default store: retries inside the same process (jobs, batch rows, API clients) resume."""
+
+    def __init__(self, ttl: float = 86400.0):
+        super().__init__(ttl)
+        self._checkpoints: Dict[str, Dict[str, Tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, workflow_id: str) -> Dict[str, Any]:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            # Expired runs are dropped lazily, on any load
+            for key in [k for k, stages in self._checkpoints.items()
+                        if all(saved_at < cutoff for saved_at, _ in stages.values())]:
+                del self._checkpoints[key]
+            stages = dict(self._checkpoints.get(workflow_id, {}))
+        return {stage: json.loads(body) for stage, (saved_at, body) in stages.items() if saved_at >= cutoff}
+
+    def save(self, workflow_id: str, stage: str, value: Any) -> None:
+        body = json.dumps(value)
+        with self._lock:
+            self._checkpoints.setdefault(workflow_id, {})[stage] = (time.time(), body)
+
+    def clear(self, workflow_id: str) -> None:
+        with self._lock:
+            self._checkpoints.pop(workflow_id, None)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoints survive process restarts (e.g. a crashed nightly batch)."""
+
+    def __init__(self, path: str = ".fitymi_checkpoints.sqlite3", ttl: float = 86400.0):
+        super().__init__(ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (workflow_id TEXT NOT NULL, stage TEXT NOT NULL, "
+            "saved_at REAL NOT NULL, body TEXT NOT NULL, PRIMARY KEY (workflow_id, stage))"
+        )
+        self._conn.commit()
+
+    def load(self, workflow_id: str) -> Dict[str, Any]:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE saved_at < ?", (cutoff,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT stage, body FROM checkpoints WHERE workflow_id = ?", (workflow_id,)
+            ).fetchall()
+        return {stage: json.loads(body) for stage, body in rows}
+
+    def save(self, workflow_id: str, stage: str, value: Any) -> None:
+        body = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (workflow_id, stage, saved_at, body) VALUES (?, ?, ?, ?)",
+                (workflow_id, stage, time.time(), body),
+            )
+            self._conn.commit()
+
+    def clear(self, workflow_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE workflow_id = ?", (workflow_id,))
+            self._conn.commit()
+
+
+def checkpoint_store_from_env() -> Optional[CheckpointStore]:
+    """
+    FITYMI_CHECKPOINTS=0 disables checkpointing; FITYMI_CHECKPOINT_DB selects the SQLite store
+    (in-memory otherwise); FITYMI_CHECKPOINT_TTL is the retention in seconds.
+    """
+    if os.getenv("FITYMI_CHECKPOINTS", "1").lower() in ("0", "false", "no"):
+        return None
+    ttl = float(os.getenv("FITYMI_CHECKPOINT_TTL", "86400"))
+    path = os.getenv("FITYMI_CHECKPOINT_DB")
+    return SQLiteCheckpointStore(path, ttl=ttl) if path else MemoryCheckpointStore(ttl=ttl)
+
+
+def inputs_digest(inputs: Dict[str, Any]) -> str:
+    """Stable digest of the inputs a run's stage outputs were computed from."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class WorkflowCheckpoint:
+    """
+    Checkpoints of one workflow run, as seen by the DAG scheduler.
+    With `inputs`, the checkpoints are stored under the workflow id plus a digest of those
+    inputs: a run reusing an id with a different brief (or a client guessing another
+    client's id) never restores outputs computed for other inputs.
+    """
+
+    def __init__(self, store: CheckpointStore, workflow_id: str, inputs: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.workflow_id = workflow_id
+        self.key = f"{workflow_id}:{inputs_digest(inputs)}" if inputs is not None else workflow_id
+        self.completed = store.load(self.key)
+        self.restored: List[str] = []
+
+    def restore(self, stage: str) -> Tuple[bool, Any]:
+        if stage in self.completed:
+            self.restored.append(stage)
+            return True, self.completed[stage]
+        return False, None
+
+    def save(self, stage: str, value: Any) -> None:
+        # Checkpointing is best effort: a full disk must not fail the run it is protecting
+        try:
+            self.store.save(self.key, stage, value)
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            logger.warning(f"Checkpoint of stage '{stage}' for workflow {self.workflow_id} failed: {e}")
+
+    def clear(self) -> None:
+        self.store.clear(self.key)
@@ -0,0 +1,212 @@
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rate-limit headers of the responses received under capture_response_headers()
+_RATE_LIMIT_HEADER_PREFIXES = ("x-ratelimit-", "anthropic-ratelimit-", "retry-after")
+_captured_headers: ContextVar[Optional[Dict[str, str]]] = ContextVar("fitymi_response_headers", default=None)
+
+
+@contextmanager
+def capture_response_headers() -> Iterator[Dict[str, str]]:
+    """
+    Collects the rate-limit headers of every pooled-client response received inside the block,
+    successful ones included (the SDKs only expose them on errors), so limiters can calibrate.
+    """
+    headers: Dict[str, str] = {}
+    token = _captured_headers.set(headers)
+    try:
+        yield headers
+    finally:
+        try:
+            _captured_headers.reset(token)
+        except ValueError:
+            # A streaming generator finalised from another task: its context is gone anyway
+            pass
+
+
+async def _record_response_headers(response) -> None:
+    """httpx response hook of the pooled clients."""
+    captured = _captured_headers.get()
+    if captured is not None:
+        captured.update({k.lower(): v for k, v in response.headers.items()
+                         if k.lower().startswith(_RATE_LIMIT_HEADER_PREFIXES)})
+
+
+class PoolLimits:
+    """HTTP connection-pool settings shared by every provider client."""
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 120.0):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> "PoolLimits":
+        """Read pool limits from FITYMI_HTTP_* environment variables."""
+        return cls(
+            max_connections=int(os.getenv("FITYMI_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("FITYMI_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("FITYMI_HTTP_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("FITYMI_HTTP_TIMEOUT", "120")),
+        )
+
+
+class ProviderClientRegistry:
+    """
+    Process-wide registry of provider SDK clients, keyed by (provider, api_key).
+    Every FitymiCopyAgent with the same credentials shares one client and therefore
+    one keep-alive HTTP connection pool, instead of paying a fresh TLS handshake per node.
+    Clients are created lazily and are safe to request from worker threads.
+    """
+
+    def __init__(self, limits: Optional[PoolLimits] = None, gemini_cache_min_tokens: Optional[int] = None,
+                 gemini_cache_ttl: Optional[float] = None):
+        self.limits = limits or PoolLimits.from_env()
+        # Gemini context caching only pays off (and is only accepted) above a minimum prefix size
+        self.gemini_cache_min_tokens = gemini_cache_min_tokens if gemini_cache_min_tokens is not None \
+            else int(os.getenv("FITYMI_GEMINI_CACHE_MIN_TOKENS", "32768"))
+        self.gemini_cache_ttl = gemini_cache_ttl if gemini_cache_ttl is not None \
+            else float(os.getenv("FITYMI_GEMINI_CACHE_TTL", "3600"))
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._http_clients: List[Any] = []
+        # (api_key, model, prefix digest) -> (GenerativeModel, monotonic expiry or None)
+        self._google_models: Dict[Tuple[str, str, Optional[str]], Tuple[Any, Optional[float]]] = {}
+        self._google_key: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _new_http_client(self):
+        import httpx
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.limits.max_connections,
+                max_keepalive_connections=self.limits.max_keepalive_connections,
+                keepalive_expiry=self.limits.keepalive_expiry,
+            ),
+            timeout=self.limits.timeout,
+            event_hooks={"response": [_record_response_headers]},
+        )
+        self._http_clients.append(http_client)
+        return http_client
+
+    def get_openai(self, api_key: str):
+        with self._lock:
+            key = ("openai", api_key)
+            if key not in self._clients:
+                from openai import AsyncOpenAI
+                self._clients[key] = AsyncOpenAI(api_key=api_key, http_client=self._new_http_client())
+                logger.debug("Pooled OpenAI client created")
+            return self._clients[key]
+
+    def get_anthropic(self, api_key: str):
+        with self._lock:
+            key = ("anthropic", api_key)
+            if key not in self._clients:
+                from anthropic import AsyncAnthropic
+                self._clients[key] = AsyncAnthropic(api_key=api_key, http_client=self._new_http_client())
+                logger.debug("Pooled Anthropic client created")
+            return self._clients[key]
+
+    def get_mistral(self, api_key: str):
+        with self._lock:
+            key = ("mistral", api_key)
+            if key not in self._clients:
+                from mistralai import Mistral
+                self._clients[key] = Mistral(api_key=api_key, async_client=self._new_http_client())
+                logger.debug("Pooled Mistral client created")
+            return self._clients[key]
+
+    def configure_google(self, api_key: str) -> None:
+        """google-generativeai keeps a module-global configuration: configure it once per key."""
+        with self._lock:
+            if self._google_key != api_key:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._google_key = api_key
+                self._google_models.clear()
+                logger.debug("Google Gemini configured")
+
+    def get_google_model(self, api_key: str, model: str, system_instruction: Optional[str] = None):
+        """
+        Returns a cached GenerativeModel for the given model name. With a `system_instruction`
+        (the stable prompt prefix) the model is bound to it, and long prefixes are uploaded once
+        as a Gemini context cache that later calls reference instead of resending.
+        May perform a network call: run it off the event loop.
+        """
+        self.configure_google(api_key)
+        digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest() if system_instruction else None
+        key = (api_key, model, digest)
+        with self._lock:
+            entry = self._google_models.get(key)
+            if entry is not None and (entry[1] is None or time.monotonic() < entry[1]):
+                return entry[0]
+
+        import google.generativeai as genai
+        handle = self._create_google_context_cache(model, system_instruction) if system_instruction else None
+        if handle is not None:
+            # Refresh a little before the server-side cache expires
+            entry = (handle, time.monotonic() + self.gemini_cache_ttl * 0.9)
+        elif system_instruction:
+            entry = (genai.GenerativeModel(model, system_instruction=system_instruction), None)
+        else:
+            entry = (genai.GenerativeModel(model), None)
+        with self._lock:
+            # Concurrent first calls may both build a handle; the last one wins, the other expires by TTL
+            self._google_models[key] = entry
+        return entry[0]
+
+    def _create_google_context_cache(self, model: str, system_instruction: str):
+        """Upload `system_instruction` as a CachedContent; None if too short or unsupported."""
+        from accounting import estimate_tokens
+        if estimate_tokens(system_instruction) < self.gemini_cache_min_tokens:
+            return None
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=model if model.startswith("models/") else f"models/{model}",
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=self.gemini_cache_ttl),
+            )
+            logger.info(f"🧊 Gemini context cache created for {model}")
+            return genai.GenerativeModel.from_cached_content(cached_content=cached)
+        except Exception as e:
+            logger.warning(f"Gemini context cache unavailable for {model}, sending the prefix inline: {e}")
+            return None
+
+    async def aclose(self) -> None:
+        """Close every pooled connection. Called on FastAPI shutdown."""
+        with self._lock:
+            http_clients, self._http_clients = self._http_clients, []
+            self._clients.clear()
+            self._google_models.clear()
+            self._google_key = None
+        for http_client in http_clients:
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.warning(f"Error while closing pooled HTTP client: {e}")
+        if http_clients:
+            logger.info(f"🔌 Closed {len(http_clients)} pooled provider connection(s).")
+
+
+_registry: Optional[ProviderClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ProviderClientRegistry:
+    """Returns the process-wide client registry, creating it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ProviderClientRegistry()
+        return _registry
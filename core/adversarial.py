@@ -1,15 +1,107 @@
 import asyncio
 import logging
-from typing import List
+import os
+import re
+from typing import Callable, List, Optional
 
+from pydantic import BaseModel, Field
+
+from core.convergence import ConvergenceTracker
 from core.neural_mesh import NeuralMeshNode
+from tracing import annotate, get_tracer
 
 logger = logging.getLogger(__name__)
 
+
+class CriticLens(BaseModel):
+    """A red-team critic of the panel: its model and the angle it attacks from."""
+    name: str
+    provider: str
+    model: str
+    focus: str
+
+
+# Panel used when the arena runs more than one critic per round (first `red_team_size` lenses)
+RED_TEAM_LENSES = [
+    CriticLens(name="logic", provider="mistral", model="open-mistral-7b",
+               focus="logical gaps, unsupported claims and weak reasoning"),
+    CriticLens(name="hype", provider="google", model="gemini-1.5-flash",
+               focus="hype words, AI-sounding tropes and clichés"),
+    CriticLens(name="clarity", provider="openai", model="gpt-3.5-turbo",
+               focus="an unclear value proposition, jargon and a weak call to action"),
+    CriticLens(name="audience", provider="anthropic", model="claude-3-haiku-20240307",
+               focus="ignored objections and a mismatch with the target audience"),
+]
+
+
+class Flaw(BaseModel):
+    """One attack on the copy; `lenses` lists every critic that raised it."""
+    text: str
+    severity: int = Field(default=3, ge=1, le=5)
+    lenses: List[str] = Field(default_factory=list)
+
+
+_FLAW_LINE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*(?:\[\s*(?:severity\s*)?([1-5])(?:\s*/\s*5)?\s*\]\s*)?(.+)$", re.I)
+_NO_FLAWS = ("no major flaws", "flawless")
+
+
+def parse_flaws(critique: str, lens: str = "") -> List[Flaw]:
+    """
+    Numbered or bulleted lines of a critique, with their `[severity N]` tag (3 if missing).
+    Without such lines the critique is one flaw of default severity, unless it declares the
+    copy flawless ("no major flaws" in a line-less answer, not inside a listed flaw).
+    """
+    lenses = [lens] if lens else []
+    flaws = []
+    for line in critique.splitlines():
+        match = _FLAW_LINE.match(line)
+        if match and len(match.group(2).strip()) > 10:
+            flaws.append(Flaw(text=match.group(2).strip(), severity=int(match.group(1) or 3), lenses=lenses))
+    if flaws:
+        return flaws
+    text = " ".join(critique.split())
+    if not text or any(marker in text.lower() for marker in _NO_FLAWS):
+        return []
+    return [Flaw(text=text, lenses=lenses)]
+
+
+def _words(text: str) -> set:
+    return {w for w in re.findall(r"[a-zà-ù]+", text.lower()) if len(w) > 3}
+
+
+def merge_flaws(flaws: List[Flaw], similarity: float = 0.5) -> List[Flaw]:
+    """
+    Deduplicate critiques across critics: flaws whose word sets overlap (Jaccard) above
+    `similarity` are merged, keeping the highest severity and every lens that raised them.
+    Most severe (then most corroborated) first.
+    """
+    merged: List[Flaw] = []
+    signatures: List[set] = []
+    for flaw in sorted(flaws, key=lambda f: -f.severity):
+        words = _words(flaw.text)
+        for existing, signature in zip(merged, signatures):
+            union = words | signature
+            if union and len(words & signature) / len(union) >= similarity:
+                existing.lenses = sorted(set(existing.lenses) | set(flaw.lenses))
+                break
+        else:
+            merged.append(flaw.model_copy())
+            signatures.append(words)
+    return sorted(merged, key=lambda f: (-f.severity, -len(f.lenses)))
+
+
 class AdversarialArena:
-    """Implement Adversarial Co-Evolution (Red Team vs Blue Team)."""
-    
-    def __init__(self):
+    """
+    Implement Adversarial Co-Evolution (Red Team vs Blue Team).
+    With `red_team_size` > 1 each round runs a panel of critics concurrently (one per lens of
+    RED_TEAM_LENSES), merges their deduplicated flaws and hands them to a single Blue Team
+    revision; the round loop stops once no merged flaw reaches `min_severity`.
+    """
+
+    def __init__(self, red_team_size: Optional[int] = None, min_severity: Optional[int] = None):
+        self.red_team_size = max(1, min(len(RED_TEAM_LENSES), red_team_size if red_team_size is not None
+                                        else int(os.getenv("FITYMI_RED_TEAM_SIZE", "1"))))
+        self.min_severity = min_severity if min_severity is not None else int(os.getenv("FITYMI_RED_TEAM_MIN_SEVERITY", "3"))
         # Red Team: Uses fast but aggressive logic to find flaws
         self.red_team = NeuralMeshNode(
             name="Red Team Critic",
@@ -22,6 +114,23 @@ class AdversarialArena:
                 "top 3 lethal flaws."
             )
         )
+        self.red_panel: List[NeuralMeshNode] = []
+        if self.red_team_size > 1:
+            self.red_panel = [
+                NeuralMeshNode(
+                    name=f"Red Team Critic ({lens.name})",
+                    provider=lens.provider,
+                    model=lens.model,
+                    role_prompt=(
+                        f"You are a Red Team Marketing Critic focused on {lens.focus}. Attack the provided "
+                        "copy from that angle only; you do not fix it. List at most 3 flaws, one per line, "
+                        "formatted as '1. [severity N] flaw' with N from 1 (cosmetic) to 5 (lethal). "
+                        "If there is nothing worth fixing, answer 'No major flaws'."
+                    ),
+                    role="red_team"
+                )
+                for lens in RED_TEAM_LENSES[:self.red_team_size]
+            ]
         
         # Blue Team: Uses Deep Reasoning to fix flaws and improve
         self.blue_team = NeuralMeshNode(
@@ -35,38 +144,121 @@ class AdversarialArena:
             )
         )
 
-    async def battle_loop(self, initial_copy: str, context: str, max_rounds: int = 3) -> str:
-        """Runs the zero-sum game between Red and Blue teams."""
+    async def red_panel_attack(self, current_copy: str, context: str) -> List[Flaw]:
+        """One concurrent attack by every critic of the panel; returns the merged flaws."""
+        attack_prompt = f"Context: {context}\n\nCopy to attack:\n{current_copy}\n\nList vulnerabilities."
+        critiques = await asyncio.gather(*(node.fire(attack_prompt, "Attack the copy.") for node in self.red_panel),
+                                         return_exceptions=True)
+        flaws: List[Flaw] = []
+        failures = []
+        for lens, critique in zip(RED_TEAM_LENSES, critiques):
+            if isinstance(critique, Exception):
+                logger.warning(f"Red Team critic '{lens.name}' failed: {critique}")
+                failures.append(critique)
+                continue
+            flaws.extend(parse_flaws(critique, lens.name))
+        if len(failures) == len(critiques):
+            raise failures[0]
+        return merge_flaws(flaws)
+
+    async def battle_loop(self, initial_copy: str, context: str, max_rounds: Optional[int] = None,
+                          should_continue: Optional[Callable[[], bool]] = None,
+                          convergence: Optional[ConvergenceTracker] = None) -> str:
+        """
+        Runs the zero-sum game between Red and Blue teams.
+        `should_continue` is asked before each round (e.g. a budget gate). `max_rounds` defaults
+        to 3 with a single critic and to 2 with a panel, which covers more flaws per round.
+        The loop also stops once a Blue Team revision barely differs from the copy it revised
+        (`convergence`, ConvergenceTracker.from_env() by default): another round would only
+        attack the same text again.
+        """
+        if max_rounds is None:
+            max_rounds = 3 if self.red_team_size == 1 else 2
+        convergence = convergence if convergence is not None else ConvergenceTracker.from_env()
+        convergence.observe(text=initial_copy)
+        if self.red_panel:
+            return await self._panel_battle_loop(initial_copy, context, max_rounds, should_continue, convergence)
         logger.info(f"⚔️ Starting Adversarial Battle Loop (Max {max_rounds} rounds)...")
         current_copy = initial_copy
         
         for round_num in range(1, max_rounds + 1):
-            logger.info(f"🥊 Round {round_num} / {max_rounds}")
-            
-            # Red Team Attacks
-            attack_prompt = f"Context: {context}\n\nCopy to attack:\n{current_copy}\n\nList vulnerabilities."
-            critiques = await self.red_team.fire(attack_prompt, "Attack the copy.")
-            
-            # Early stopping heuristic 
-            # If the critic cannot find 3 flaws easily or praises it, break the loop.
-            critique_lower = critiques.lower()
-            if "no major flaws" in critique_lower or "flawless" in critique_lower or len(critiques.split('\n')) < 2:
-                logger.info("🛡️ Blue Team reached invincibility (Early Stopping). No lethal flaws found.")
+            if should_continue is not None and not should_continue():
+                logger.info(f"⏹️ Arena stopped before round {round_num}.")
                 break
-                
-            logger.info(f"🔴 Red Team Critique:\n{critiques[:200]}...")
-            
-            # Blue Team Defends
-            defend_prompt = f"Context: {context}\n\nCurrent Copy:\n{current_copy}\n\nCritiques to resolve:\n{critiques}\n\nProvide the revised copy."
-            revised_copy = await self.blue_team.fire(defend_prompt, "Enhance the copy to survive attacks.")
-            
-            # Basic validation to ensure Blue team didn't output conversational filler
-            if len(revised_copy) < 20: 
-                logger.warning("Blue team output was too short, keeping previous copy.")
+            logger.info(f"🥊 Round {round_num} / {max_rounds}")
+            with get_tracer().span("arena.round", round=round_num):
+                # Red Team Attacks
+                attack_prompt = f"Context: {context}\n\nCopy to attack:\n{current_copy}\n\nList vulnerabilities."
+                critiques = await self.red_team.fire(attack_prompt, "Attack the copy.")
+
+                # Early stopping heuristic 
+                # If the critic cannot find 3 flaws easily or praises it, break the loop.
+                critique_lower = critiques.lower()
+                if "no major flaws" in critique_lower or "flawless" in critique_lower or len(critiques.split('\n')) < 2:
+                    logger.info("🛡️ Blue Team reached invincibility (Early Stopping). No lethal flaws found.")
+                    break
+
+                logger.info(f"🔴 Red Team Critique:\n{critiques[:200]}...")
+
+                # Blue Team Defends
+                defend_prompt = f"Context: {context}\n\nCurrent Copy:\n{current_copy}\n\nCritiques to resolve:\n{critiques}\n\nProvide the revised copy."
+                revised_copy = await self.blue_team.fire(defend_prompt, "Enhance the copy to survive attacks.")
+
+                # Basic validation to ensure Blue team didn't output conversational filler
+                if len(revised_copy) < 20: 
+                    logger.warning("Blue team output was too short, keeping previous copy.")
+                    break
+
+                current_copy = revised_copy
+                logger.info(f"🔵 Blue Team Defense generated. Copy length updated.")
+
+                if convergence.observe(text=revised_copy):
+                    annotate(converged=convergence.reason)
+                    logger.info(f"🛡️ Copy converged after round {round_num}, stopping the arena.")
+                    break
+
+        logger.info("🏁 Battle Loop concluded.")
+        return current_copy
+
+    async def _panel_battle_loop(self, initial_copy: str, context: str, max_rounds: int,
+                                 should_continue: Optional[Callable[[], bool]],
+                                 convergence: ConvergenceTracker) -> str:
+        logger.info(f"⚔️ Starting Adversarial Battle Loop with {len(self.red_panel)} critics (Max {max_rounds} rounds)...")
+        current_copy = initial_copy
+
+        for round_num in range(1, max_rounds + 1):
+            if should_continue is not None and not should_continue():
+                logger.info(f"⏹️ Arena stopped before round {round_num}.")
                 break
-                
-            current_copy = revised_copy
-            logger.info(f"🔵 Blue Team Defense generated. Copy length updated.")
-            
+            logger.info(f"🥊 Round {round_num} / {max_rounds}")
+            with get_tracer().span("arena.round", round=round_num, critics=len(self.red_panel)):
+                flaws = await self.red_panel_attack(current_copy, context)
+                severity = max((f.severity for f in flaws), default=0)
+                annotate(flaws=len(flaws), severity=severity)
+
+                # Early stopping on the merged severity: nothing left that the panel rates as serious
+                if severity < self.min_severity:
+                    logger.info(f"🛡️ Blue Team reached invincibility (Early Stopping). Max severity {severity}.")
+                    break
+
+                critiques = "\n".join(f"{i}. [severity {f.severity}] {f.text} (raised by: {', '.join(f.lenses)})"
+                                       for i, f in enumerate(flaws, 1))
+                logger.info(f"🔴 Red Team Panel: {len(flaws)} merged flaw(s), max severity {severity}")
+
+                defend_prompt = f"Context: {context}\n\nCurrent Copy:\n{current_copy}\n\nCritiques to resolve:\n{critiques}\n\nProvide the revised copy."
+                revised_copy = await self.blue_team.fire(defend_prompt, "Enhance the copy to survive attacks.")
+
+                if len(revised_copy) < 20:
+                    logger.warning("Blue team output was too short, keeping previous copy.")
+                    break
+
+                current_copy = revised_copy
+                logger.info(f"🔵 Blue Team Defense generated. Copy length updated.")
+
+                if convergence.observe(text=revised_copy):
+                    annotate(converged=convergence.reason)
+                    logger.info(f"🛡️ Copy converged after round {round_num}, stopping the arena.")
+                    break
+
         logger.info("🏁 Battle Loop concluded.")
         return current_copy
@@ -0,0 +1,128 @@
+import logging
+import os
+import re
+import zlib
+from typing import List, Optional, Sequence, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p
+_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """Word k-shingles of the normalised text (the whole text if it has fewer than k words)."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def jaccard(a: str, b: str, k: int = 3) -> float:
+    """Exact Jaccard similarity of the shingle sets of two texts (1.0 for two empty texts)."""
+    sa, sb = shingles(a, k), shingles(b, k)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def mean_pairwise_similarity(texts: Sequence[str], k: int = 3) -> float:
+    """Mean pairwise shingle similarity of a set of copies (1.0 = all identical)."""
+    pairs = [(i, j) for i in range(len(texts)) for j in range(i + 1, len(texts))]
+    if not pairs:
+        return 1.0
+    return sum(jaccard(texts[i], texts[j], k) for i, j in pairs) / len(pairs)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles: `num_perm` minimum hash values per text whose
+    agreement rate estimates the Jaccard similarity. Fixed-size and comparable in O(num_perm),
+    so many copies can be compared or indexed without keeping their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, k: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.k = k
+        rng = np.random.default_rng(seed)
+        # 32-bit coefficients over 32-bit shingle hashes: a*x + b never overflows uint64
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _hash(shingle: str) -> int:
+        # Stable across processes, unlike hash()
+        return zlib.crc32(shingle.encode("utf-8"))
+
+    def signature(self, text: str) -> np.ndarray:
+        values = np.array([self._hash(s) for s in shingles(text, self.k)] or [0], dtype=np.uint64)
+        hashed = (np.outer(values, self._a) + self._b) % np.uint64(_PRIME)
+        return hashed.min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        return float(np.mean(sig_a == sig_b))
+
+
+class ConvergenceTracker:
+    """
+    Stop test shared by the iterative loops (evolution generations, arena rounds).
+    Feed it the copy (and, when there is one, the score) after every step; `observe` returns
+    True once the copy stops changing (shingle similarity with the previous step at or above
+    `similarity_threshold`) or, for `patience` consecutive steps, the score lands within
+    `min_improvement` of the best score so far. A step that clearly regresses neither counts
+    towards nor resets the plateau: the loops are not elitist and may still recover.
+    `reason` explains the stop.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.9, min_improvement: float = 0.01, patience: int = 1,
+                 enabled: bool = True):
+        self.similarity_threshold = similarity_threshold
+        self.min_improvement = min_improvement
+        self.patience = patience
+        self.enabled = enabled
+        self.texts: List[str] = []
+        self.scores: List[float] = []
+        self.similarities: List[float] = []
+        self.reason: Optional[str] = None
+        self._best: Optional[float] = None
+        self._stalled = 0
+
+    @classmethod
+    def from_env(cls) -> "ConvergenceTracker":
+        """FITYMI_CONVERGENCE (default on), FITYMI_CONVERGENCE_SIMILARITY, FITYMI_CONVERGENCE_MIN_GAIN, FITYMI_CONVERGENCE_PATIENCE."""
+        return cls(
+            similarity_threshold=float(os.getenv("FITYMI_CONVERGENCE_SIMILARITY", "0.9")),
+            min_improvement=float(os.getenv("FITYMI_CONVERGENCE_MIN_GAIN", "0.01")),
+            patience=int(os.getenv("FITYMI_CONVERGENCE_PATIENCE", "1")),
+            enabled=os.getenv("FITYMI_CONVERGENCE", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def observe(self, text: Optional[str] = None, score: Optional[float] = None) -> bool:
+        """Record one step; True if the loop has converged and should stop."""
+        if text is not None:
+            if self.texts:
+                similarity = jaccard(self.texts[-1], text)
+                self.similarities.append(similarity)
+                if self.enabled and similarity >= self.similarity_threshold:
+                    self.reason = f"copy stable (similarity {similarity:.2f})"
+            self.texts.append(text)
+
+        if score is not None:
+            self.scores.append(score)
+            if self._best is not None:
+                gain = score - self._best
+                if gain >= self.min_improvement:
+                    self._stalled = 0
+                elif gain > -self.min_improvement:
+                    self._stalled += 1
+                if self.enabled and self.reason is None and self._stalled >= self.patience:
+                    self.reason = f"score plateau (best {self._best:.3f}, gain {gain:+.3f})"
+            self._best = score if self._best is None else max(self._best, score)
+
+        if self.reason is not None:
+            logger.info(f"📉 Converged: {self.reason}")
+            return True
+        return False
@@ -0,0 +1,92 @@
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.convergence import MinHasher
+
+logger = logging.getLogger(__name__)
+
+
+class GenomeIndex:
+    """
+    Per-run near-duplicate index over genome contents: MinHash signatures bucketed by LSH bands
+    (`bands` x `num_perm / bands` rows), so a lookup only compares the few genomes sharing a band.
+    Genomes are near-duplicates when their estimated shingle similarity is >= `threshold`.
+    Scored genomes are recorded, so a later near-duplicate reuses the earlier score instead of
+    going back to the selector.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self._signatures: List[np.ndarray] = []
+        self._genomes: List = []
+
+    @classmethod
+    def from_env(cls) -> Optional["GenomeIndex"]:
+        """FITYMI_GENOME_DEDUP_THRESHOLD (default 0.85); 0 disables deduplication."""
+        threshold = float(os.getenv("FITYMI_GENOME_DEDUP_THRESHOLD", "0.85"))
+        return cls(threshold=threshold) if threshold > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._genomes)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(b, signature[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+    def _match(self, signature: np.ndarray, signatures: List[np.ndarray], candidates) -> Optional[int]:
+        best, best_similarity = None, self.threshold
+        for i in candidates:
+            similarity = self.hasher.similarity(signature, signatures[i])
+            if similarity >= best_similarity:
+                best, best_similarity = i, similarity
+        return best
+
+    def lookup(self, content: str):
+        """The recorded genome most similar to `content` above the threshold, or None."""
+        signature = self.hasher.signature(content)
+        candidates = {i for key in self._band_keys(signature) for i in self._buckets.get(key, ())}
+        match = self._match(signature, self._signatures, candidates)
+        return self._genomes[match] if match is not None else None
+
+    def record(self, genomes: List) -> None:
+        """Index scored genomes for the rest of the run."""
+        for genome in genomes:
+            signature = self.hasher.signature(genome.content)
+            index = len(self._genomes)
+            self._signatures.append(signature)
+            self._genomes.append(genome)
+            for key in self._band_keys(signature):
+                self._buckets[key].append(index)
+
+    def dedupe(self, genomes: List) -> Tuple[List, List]:
+        """
+        Split a generation into (fresh, carried): near-duplicates of an already scored genome are
+        replaced by a copy of it, score included; near-duplicates within the generation collapse
+        into their first occurrence. Only `fresh` needs scoring.
+        """
+        fresh, carried = [], []
+        fresh_signatures: List[np.ndarray] = []
+        for genome in genomes:
+            previous = self.lookup(genome.content)
+            if previous is not None:
+                if all(c.id != previous.id for c in carried):
+                    carried.append(previous.model_copy())
+                logger.info(f"♻️ Genome {genome.id} matches scored genome {previous.id}: score carried forward.")
+                continue
+            signature = self.hasher.signature(genome.content)
+            twin = self._match(signature, fresh_signatures, range(len(fresh_signatures)))
+            if twin is not None:
+                logger.info(f"♻️ Genome {genome.id} collapsed into near-duplicate {fresh[twin].id}.")
+                continue
+            fresh.append(genome)
+            fresh_signatures.append(signature)
+        return fresh, carried
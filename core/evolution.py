@@ -1,10 +1,17 @@
 import asyncio
 import logging
 import json
+import os
 import random
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel, Field
 
+from cache import get_response_cache
+from tracing import annotate, get_tracer
+from core.convergence import ConvergenceTracker, mean_pairwise_similarity
+from core.dedup import GenomeIndex
+from core.prefilter import GenomePrefilter
 from core.neural_mesh import NeuralMeshNode
 
 logger = logging.getLogger(__name__)
@@ -18,29 +25,90 @@ class CopyGenome(BaseModel):
     conversion_genes: List[str] = Field(default_factory=list)
     fitness_score: float = 0.0
 
+class MutatorIsland(BaseModel):
+    """One sub-population of the island model: the mutator model and temperature it evolves with."""
+    name: str
+    provider: str
+    model: str
+    temperature: float
+
+
+# Islands used by the island model (first `islands` entries); different models and temperatures
+# explore different regions of the copy space, migration shares the best finds
+MUTATOR_ISLANDS = [
+    MutatorIsland(name="mistral-focused", provider="mistral", model="open-mistral-7b", temperature=0.7),
+    MutatorIsland(name="gemini-creative", provider="google", model="gemini-1.5-flash", temperature=1.0),
+    MutatorIsland(name="gpt-balanced", provider="openai", model="gpt-3.5-turbo", temperature=0.9),
+    MutatorIsland(name="mistral-wild", provider="mistral", model="open-mistral-7b", temperature=1.0),
+]
+
+MUTATOR_ROLE_PROMPT = "You are an Evolutionary Mutation Engine. You take a seed copy and produce strictly format-adherent variations."
+
+
+def _strip_code_fences(raw: str) -> str:
+    """Clean up json format if wrapped in markdown."""
+    clean_json = raw.strip()
+    if clean_json.startswith("```"):
+        lines = clean_json.split("\n")
+        if lines[0].startswith("```"): lines = lines[1:]
+        if lines and lines[-1].startswith("```"): lines = lines[:-1]
+        clean_json = "\n".join(lines).strip()
+    return clean_json
+
 class EvolutionEngine:
-    """Handles the Darwinian evolution of copy."""
-    def __init__(self):
+    """
+    Handles the Darwinian evolution of copy.
+    With `islands` > 1 (FITYMI_EVOLUTION_ISLANDS) it runs the island model: one sub-population
+    per entry of MUTATOR_ISLANDS evolves concurrently with its own mutator, and every
+    `migration_interval` generations each island's elite migrates to the next island (ring).
+    """
+    def __init__(self, batch_scoring: bool = True, islands: Optional[int] = None, migration_interval: Optional[int] = None,
+                 prefilter: Optional[GenomePrefilter] = None):
+        # Grade a whole generation in one structured selector request instead of one call per genome
+        self.batch_scoring = batch_scoring
+        # Local screening: only the most promising candidates reach the paid selector
+        self.prefilter = prefilter if prefilter is not None else GenomePrefilter.from_env()
+        self.islands = max(1, min(len(MUTATOR_ISLANDS), islands if islands is not None
+                                  else int(os.getenv("FITYMI_EVOLUTION_ISLANDS", "1"))))
+        self.migration_interval = max(1, migration_interval if migration_interval is not None
+                                      else int(os.getenv("FITYMI_EVOLUTION_MIGRATION_INTERVAL", "2")))
         # The Fast Scout Mutator
         self.mutator_node = NeuralMeshNode(
             name="Mistral-7B Mutator",
             provider="mistral",
             model="open-mistral-7b", 
-            role_prompt="You are an Evolutionary Mutation Engine. You take a seed copy and produce strictly format-adherent variations."
+            role_prompt=MUTATOR_ROLE_PROMPT
         )
+        self.island_nodes: List[NeuralMeshNode] = []
+        if self.islands > 1:
+            self.island_nodes = [
+                NeuralMeshNode(
+                    name=f"Island Mutator ({island.name})",
+                    provider=island.provider,
+                    model=island.model,
+                    role_prompt=MUTATOR_ROLE_PROMPT,
+                    temperature=island.temperature,
+                    role="mutator"
+                )
+                for island in MUTATOR_ISLANDS[:self.islands]
+            ]
         # The Selection Filter
         self.selector_node = NeuralMeshNode(
             name="Gemini-Flash Selector",
             provider="google",
             model="gemini-1.5-flash",
-            role_prompt="You are an AI Fitness Evaluator. You score variations based on impact, clarity, and conversion potential. Respond ONLY with valid JSON."
+            role_prompt="You are an AI Fitness Evaluator. You score variations based on impact, clarity, and conversion potential. Respond ONLY with valid JSON.",
+            # Scoring is a pure function of the genome: identical genomes are served from cache
+            cache=get_response_cache(),
+            role="selector"
         )
 
-    async def mutate(self, seed_content: str, num_variants: int = 3, task_context: str = "") -> List[CopyGenome]:
+    async def mutate(self, seed_content: str, num_variants: int = 3, task_context: str = "",
+                     mutator: Optional[NeuralMeshNode] = None) -> List[CopyGenome]:
         logger.info(f"🧬 Mutating seed into {num_variants} variations...")
         task = f"Generate {num_variants} distinct, highly creative variations of this copy. Output them separated by '===VAR==='.\nTask constraints: {task_context}"
         
-        raw_variants = await self.mutator_node.fire(seed_content, task)
+        raw_variants = await (mutator or self.mutator_node).fire(seed_content, task)
         # Parse output
         variants_texts = [v.strip() for v in raw_variants.split("===VAR===") if len(v.strip()) > 10]
         
@@ -54,31 +122,80 @@ class EvolutionEngine:
             
         return genomes
 
+    async def _evaluate_single(self, genome: CopyGenome, target_audience: str) -> CopyGenome:
+        task = f"""Evaluate this copy for audience: '{target_audience}'. 
+Return ONLY a JSON object: {{"emotional_impact": float, "clarity": float, "brand_alignment": float, "overall_score": float}} where values are 0.0 to 1.0."""
+        result = await self.selector_node.fire(genome.content, task)
+        try:
+            scores = json.loads(_strip_code_fences(result))
+            genome.fitness_score = scores.get("overall_score", 0.5)
+        except Exception as e:
+            logger.warning(f"Failed to parse fitness JSON: {e}")
+            genome.fitness_score = 0.1 # Penalty
+        return genome
+
+    async def _evaluate_batch(self, genomes: List[CopyGenome], target_audience: str) -> List[CopyGenome]:
+        """
+        Grades all genomes in one structured request. Genomes whose score is missing or
+        malformed in the batch answer are re-scored individually.
+        """
+        blocks = [f"--- [GENOME {i}] ---\n{g.content}" for i, g in enumerate(genomes)]
+        task = f"""Evaluate each of the {len(genomes)} copies above for audience: '{target_audience}'. 
+Return ONLY a JSON array with one object per genome, in order: [{{"genome": int, "emotional_impact": float, "clarity": float, "brand_alignment": float, "overall_score": float}}] where scores are 0.0 to 1.0 and "genome" is the GENOME number."""
+        result = await self.selector_node.fire("\n\n".join(blocks), task)
+
+        scored: Dict[int, float] = {}
+        try:
+            parsed = json.loads(_strip_code_fences(result))
+            if isinstance(parsed, dict):
+                parsed = parsed.get("scores", parsed.get("genomes", []))
+            for position, item in enumerate(parsed):
+                if not isinstance(item, dict):
+                    continue
+                index = item.get("genome", position)
+                score = item.get("overall_score")
+                if isinstance(index, int) and 0 <= index < len(genomes) and isinstance(score, (int, float)):
+                    scored[index] = float(score)
+        except Exception as e:
+            logger.warning(f"Failed to parse batched fitness JSON: {e}")
+
+        for index, score in scored.items():
+            genomes[index].fitness_score = score
+
+        missing = [g for i, g in enumerate(genomes) if i not in scored]
+        if missing:
+            logger.warning(f"Batched scoring left {len(missing)} genome(s) unscored. Falling back to single calls.")
+            await asyncio.gather(*[self._evaluate_single(g, target_audience) for g in missing])
+        return genomes
+
     async def evaluate_fitness(self, genomes: List[CopyGenome], target_audience: str) -> List[CopyGenome]:
         logger.info(f"⚖️ Evaluating fitness of {len(genomes)} genomes...")
-        
-        async def evaluate_single(genome: CopyGenome):
-            task = f"""Evaluate this copy for audience: '{target_audience}'. 
-Return ONLY a JSON object: {{"emotional_impact": float, "clarity": float, "brand_alignment": float, "overall_score": float}} where values are 0.0 to 1.0."""
-            result = await self.selector_node.fire(genome.content, task)
-            try:
-                # Clean up json format if wrapped in markdown
-                clean_json = result.strip()
-                if clean_json.startswith("```"):
-                    lines = clean_json.split("\n")
-                    if lines[0].startswith("```"): lines = lines[1:]
-                    if lines[-1].startswith("```"): lines = lines[:-1]
-                    clean_json = "\n".join(lines).strip()
-                scores = json.loads(clean_json)
-                genome.fitness_score = scores.get("overall_score", 0.5)
-            except Exception as e:
-                logger.warning(f"Failed to parse fitness JSON: {e}")
-                genome.fitness_score = 0.1 # Penalty
-            return genome
-
-        evaluated = await asyncio.gather(*[evaluate_single(g) for g in genomes])
+
+        if self.batch_scoring and len(genomes) > 1:
+            evaluated = await self._evaluate_batch(genomes, target_audience)
+        else:
+            evaluated = await asyncio.gather(*[self._evaluate_single(g, target_audience) for g in genomes])
         return sorted(list(evaluated), key=lambda x: x.fitness_score, reverse=True)
 
+    async def _score_generation(self, variants: List[CopyGenome], parent: str, target_audience: str,
+                                max_words: Optional[int], index: Optional[GenomeIndex]) -> List[CopyGenome]:
+        """
+        Rank a generation: near-duplicates of genomes scored earlier in the run reuse their score
+        (`index`), the rest is screened by the prefilter and only the survivors are sent to the selector.
+        """
+        fresh, carried = index.dedupe(variants) if index is not None else (variants, [])
+        candidates = self.prefilter.select(fresh, parent=parent, max_words=max_words) if fresh else []
+        scored = await self.evaluate_fitness(candidates, target_audience) if candidates else []
+        if index is not None:
+            index.record(scored)
+        annotate(scored=len(candidates), carried=len(carried))
+        return sorted(scored + carried, key=lambda g: g.fitness_score, reverse=True)
+
+    @staticmethod
+    def diversity(genomes: List[CopyGenome]) -> float:
+        """Diversity of a generation: 1 - mean pairwise shingle similarity (0.0 = all identical)."""
+        return round(1.0 - mean_pairwise_similarity([g.content for g in genomes]), 3) if len(genomes) > 1 else 0.0
+
     def crossover(self, parent1: CopyGenome, parent2: CopyGenome) -> CopyGenome:
         logger.info(f"🔀 Performing crossover between {parent1.id} and {parent2.id}...")
         
@@ -94,29 +211,163 @@ Return ONLY a JSON object: {{"emotional_impact": float, "clarity": float, "brand
         
         return child
 
-    async def evolve(self, seed_copy: str, target_audience: str, task_context: str = "", generations: int = 3, pop_size: int = 3) -> CopyGenome:
+    async def evolve(self, seed_copy: str, target_audience: str, task_context: str = "", generations: int = 3, pop_size: int = 3,
+                     should_continue: Optional[Callable[[], bool]] = None,
+                     convergence: Optional[ConvergenceTracker] = None, max_words: Optional[int] = None) -> CopyGenome:
+        """
+        Runs up to `generations` mutate/score/select rounds from `seed_copy`.
+        `should_continue` is asked before each generation (e.g. a budget gate); returning
+        False stops the loop. The loop also stops once
+        `convergence` (ConvergenceTracker.from_env() by default) sees the top genome stop
+        changing or its fitness plateau. Candidates are deduplicated against the genomes already
+        scored in the run and screened by `self.prefilter` (with the `max_words` limit of the
+        brief) before LLM scoring. Selection is not elitist, so the best genome scored over the
+        whole run is returned, not the top of the last generation.
+        """
+        convergence = convergence if convergence is not None else ConvergenceTracker.from_env()
+        index = GenomeIndex.from_env()
+        if self.island_nodes:
+            return await self._evolve_islands(seed_copy, target_audience, task_context, generations, pop_size,
+                                              should_continue, convergence, max_words, index)
         logger.info(f"🔄 Starting evolution loop for {generations} generations...")
         
         # Generation 0
         current_pop = [CopyGenome(id="seed", content=seed_copy)]
+        best: Optional[CopyGenome] = None
+        convergence.observe(text=seed_copy)
         
         for gen in range(1, generations + 1):
+            if should_continue is not None and not should_continue():
+                logger.info(f"⏹️ Evolution stopped before generation {gen}.")
+                break
             logger.info(f"--- Generation {gen} ---")
+            with get_tracer().span("evolution.generation", generation=gen) as span:
+                # Mutate top performer
+                new_variants = await self.mutate(current_pop[0].content, num_variants=pop_size, task_context=task_context)
+
+                # Add crossover child if we have multiple parents from previous gen
+                if len(current_pop) >= 2:
+                    child = self.crossover(current_pop[0], current_pop[1])
+                    new_variants.append(child)
+
+                # Evaluate the new, locally promising variants
+                scored_pop = await self._score_generation(new_variants, current_pop[0].content, target_audience, max_words, index)
+                diversity = self.diversity(new_variants)
+
+                # Environmental Selection (Survival of the fittest)
+                current_pop = scored_pop[:2]
+                if best is None or current_pop[0].fitness_score > best.fitness_score:
+                    best = current_pop[0]
+                converged = convergence.observe(text=current_pop[0].content, score=current_pop[0].fitness_score)
+                if span is not None:
+                    span.set(population=len(new_variants), diversity=diversity, top_score=current_pop[0].fitness_score)
+                    if converged:
+                        span.set(converged=convergence.reason)
+
+            logger.info(f"🏆 Gen {gen} Top Score: {current_pop[0].fitness_score} (diversity {diversity})")
+            if converged:
+                logger.info(f"⏹️ Evolution converged after generation {gen}.")
+                break
             
-            # Mutate top performer
-            new_variants = await self.mutate(current_pop[0].content, num_variants=pop_size, task_context=task_context)
-            
-            # Add crossover child if we have multiple parents from previous gen
-            if len(current_pop) >= 2:
-                child = self.crossover(current_pop[0], current_pop[1])
-                new_variants.append(child)
-                
-            # Evaluate all new variants
-            scored_pop = await self.evaluate_fitness(new_variants, target_audience)
-            
-            # Environmental Selection (Survival of the fittest)
-            current_pop = scored_pop[:2] 
-            
-            logger.info(f"🏆 Gen {gen} Top Score: {current_pop[0].fitness_score}")
-            
-        return current_pop[0]
+        return best if best is not None else current_pop[0]
+
+    def active_islands(self, generation: int = 0) -> List[int]:
+        """
+        Islands that run the next generation. Each island costs one request to its mutator's
+        provider and one to the selector's, whatever its population size, so islands are admitted
+        in turn (rotating with `generation`, so dormant islands catch up) while those providers
+        still have rate-limit headroom: a throttled provider runs fewer islands instead of
+        queueing their calls. At least one island always runs.
+        """
+        headroom = {}
+        for node in self.island_nodes + [self.selector_node]:
+            if node.limiter is not None and node.provider not in headroom:
+                headroom[node.provider] = node.limiter.headroom()
+        count = len(self.island_nodes)
+        active = []
+        for island in ((generation + i) % count for i in range(count)):
+            needed = Counter([self.island_nodes[island].provider, self.selector_node.provider])
+            if active and any(headroom.get(provider, calls) < calls for provider, calls in needed.items()):
+                continue
+            for provider, calls in needed.items():
+                if provider in headroom:
+                    headroom[provider] -= calls
+            active.append(island)
+        return sorted(active)
+
+    async def _evolve_island(self, island: int, population: List[CopyGenome], num_variants: int,
+                             target_audience: str, task_context: str, max_words: Optional[int] = None,
+                             index: Optional[GenomeIndex] = None) -> Tuple[List[CopyGenome], List[CopyGenome]]:
+        """
+        One generation of one island: mutate its best genome, cross its two best, keep the top 2.
+        Returns the survivors and the variants the generation produced.
+        """
+        with get_tracer().span("evolution.island", island=MUTATOR_ISLANDS[island].name) as span:
+            new_variants = await self.mutate(population[0].content, num_variants=num_variants,
+                                             task_context=task_context, mutator=self.island_nodes[island])
+            if len(population) >= 2:
+                new_variants.append(self.crossover(population[0], population[1]))
+            scored = await self._score_generation(new_variants, population[0].content, target_audience, max_words, index)
+            if span is not None:
+                span.set(population=len(new_variants), top_score=scored[0].fitness_score)
+            return scored[:2], new_variants
+
+    def migrate(self, populations: List[List[CopyGenome]]) -> None:
+        """Ring migration: each island's elite replaces the weakest survivor of the next island."""
+        elites = [population[0] for population in populations]
+        for i, population in enumerate(populations):
+            migrant = elites[i - 1].model_copy()
+            if len(population) >= 2:
+                population[-1] = migrant
+            else:
+                population.append(migrant)
+            population.sort(key=lambda g: g.fitness_score, reverse=True)
+
+    async def _evolve_islands(self, seed_copy: str, target_audience: str, task_context: str, generations: int,
+                              pop_size: int, should_continue: Optional[Callable[[], bool]],
+                              convergence: ConvergenceTracker, max_words: Optional[int] = None,
+                              index: Optional[GenomeIndex] = None) -> CopyGenome:
+        logger.info(f"🏝️ Starting island evolution: {len(self.island_nodes)} islands, {generations} generations...")
+        populations = [[CopyGenome(id="seed", content=seed_copy)] for _ in self.island_nodes]
+        # Best genome scored so far on any island: a later generation may regress
+        best: Optional[CopyGenome] = None
+        convergence.observe(text=seed_copy)
+
+        for gen in range(1, generations + 1):
+            if should_continue is not None and not should_continue():
+                logger.info(f"⏹️ Evolution stopped before generation {gen}.")
+                break
+            logger.info(f"--- Generation {gen} ({len(populations)} islands) ---")
+            with get_tracer().span("evolution.generation", generation=gen, islands=len(populations)) as span:
+                active = self.active_islands(gen - 1)
+                if len(active) < len(populations):
+                    logger.info(f"🚦 Generation {gen}: {len(active)}/{len(populations)} islands active (rate-limit headroom).")
+                outcomes = await asyncio.gather(*(
+                    self._evolve_island(i, populations[i], pop_size, target_audience, task_context, max_words, index)
+                    for i in active
+                ))
+                for i, (survivors, _) in zip(active, outcomes):
+                    populations[i] = survivors
+                diversity = self.diversity([g for _, variants in outcomes for g in variants])
+                # Only islands that ran this generation tell whether the copy is still moving: a dormant
+                # island's unchanged elite would look like a stable copy and stop the run
+                top = max((populations[i][0] for i in active), key=lambda g: g.fitness_score)
+                if gen % self.migration_interval == 0 and gen < generations:
+                    self.migrate(populations)
+                    logger.info(f"🛶 Generation {gen}: elites migrated between islands.")
+
+                if best is None or top.fitness_score > best.fitness_score:
+                    best = top
+                converged = convergence.observe(text=top.content, score=top.fitness_score)
+                if span is not None:
+                    span.set(population=sum(len(variants) for _, variants in outcomes), active_islands=len(active),
+                             diversity=diversity, top_score=top.fitness_score)
+                    if converged:
+                        span.set(converged=convergence.reason)
+
+            logger.info(f"🏆 Gen {gen} Top Score: {top.fitness_score} (diversity {diversity})")
+            if converged:
+                logger.info(f"⏹️ Evolution converged after generation {gen}.")
+                break
+
+        return best if best is not None else populations[0][0]
@@ -1,42 +1,206 @@
 import asyncio
+import os
+import re
 import time
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Mapping
 
 from agent import FitymiCopyAgent, FitymiPayload
+from cache import ResponseCache
+from accounting import estimate_tokens
+from tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse provider reset/retry durations: '12', '1.5', '250ms', '6m0s', '1h2m3.5s'."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = re.fullmatch(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?", value)
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds, millis = (float(g) if g else 0.0 for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds + millis / 1000
+
+
 class RateLimiter:
-    """Async Rate Limiter using Token Bucket algorithm."""
-    def __init__(self, rate: int, per: float):
-        self.rate = rate
+    """
+    Async Rate Limiter using Token Bucket algorithm, event-driven and adaptive.
+    - Waiters queue on a fair lock and sleep for the exact time until their turn:
+      FIFO order, no polling, no thundering-herd wakeups.
+    - Optional tokens-per-period bucket alongside the requests bucket.
+    - AIMD: the request rate grows additively on success and halves on 429,
+      never above the account limit advertised in rate-limit headers.
+    """
+    def __init__(self, rate: int, per: float, tokens_per_period: Optional[int] = None,
+                 min_rate: float = 1.0, additive_increase: float = 1.0):
         self.per = per
-        self.capacity = rate
-        self.tokens = rate
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.additive_increase = additive_increase
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.token_capacity = float(tokens_per_period) if tokens_per_period else None
+        self.token_budget = self.token_capacity
+        self.blocked_until = 0.0
         self.last_update = time.monotonic()
         self.lock = asyncio.Lock()
 
-    async def acquire(self):
-        while True:
-            async with self.lock:
-                now = time.monotonic()
-                elapsed = now - self.last_update
-                self.tokens = min(self.capacity, self.tokens + elapsed * (self.rate / self.per))
-                self.last_update = now
+    @classmethod
+    def from_env(cls, prefix: str, default_rpm: int) -> "RateLimiter":
+        """Reads FITYMI_<PREFIX>_RPM and FITYMI_<PREFIX>_TPM (tokens per minute, optional)."""
+        rpm = int(os.getenv(f"FITYMI_{prefix}_RPM", str(default_rpm)))
+        tpm = os.getenv(f"FITYMI_{prefix}_TPM")
+        return cls(rpm, 60.0, tokens_per_period=int(tpm) if tpm else None)
 
-                if self.tokens >= 1:
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.last_update
+        self.last_update = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * (self.rate / self.per))
+        if self.token_capacity is not None:
+            self.token_budget = min(self.token_capacity, self.token_budget + elapsed * (self.token_capacity / self.per))
+
+    def _time_until_available(self, now: float, cost: float) -> float:
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) * self.per / self.rate)
+        if self.token_capacity is not None and cost > 0 and self.token_budget < cost:
+            wait = max(wait, (cost - self.token_budget) * self.per / self.token_capacity)
+        return wait
+
+    async def acquire(self, tokens: int = 0):
+        """Wait for a request slot and, if a token budget is configured, `tokens` of budget."""
+        cost = float(min(tokens, self.token_capacity)) if self.token_capacity is not None else 0.0
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._time_until_available(now, cost)
+                if wait <= 0:
                     self.tokens -= 1
+                    if self.token_capacity is not None:
+                        self.token_budget -= cost
                     return
-            await asyncio.sleep(0.1)
+                # Head of the FIFO sleeps for the exact deficit; the others wait on the lock
+                await asyncio.sleep(wait)
+
+    def headroom(self) -> float:
+        """Request slots available right now (bucket fill after refill), 0 while paused by a 429."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return 0.0
+        elapsed = max(0.0, now - self.last_update)
+        return min(self.capacity, self.tokens + elapsed * (self.rate / self.per))
+
+    def record_usage(self, actual_tokens: int, reserved_tokens: int = 0) -> None:
+        """Settle the difference between the reserved estimate and the real token usage."""
+        if self.token_capacity is not None:
+            self.token_budget -= (actual_tokens - reserved_tokens)
+
+    def on_success(self) -> None:
+        """Additive increase back towards the account limit."""
+        self.rate = min(self.max_rate, self.rate + self.additive_increase)
+        self.capacity = max(1.0, self.rate)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease on a 429, plus a hard pause when the provider says how long."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"🚦 Rate limited: adapting to {self.rate:.1f} req/{self.per:.0f}s"
+                       + (f", pausing {retry_after:.1f}s" if retry_after else ""))
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Calibrate against rate-limit response headers (OpenAI `x-ratelimit-*`,
+        Anthropic `anthropic-ratelimit-*`, generic `retry-after`).
+        """
+        h = {k.lower(): v for k, v in headers.items()}
+        limit = h.get("x-ratelimit-limit-requests") or h.get("anthropic-ratelimit-requests-limit")
+        if limit and limit.isdigit():
+            # The advertised limit is the real account tier: scale to the limiter's period
+            self.max_rate = float(limit) * (self.per / 60.0)
+            self.rate = min(self.rate, self.max_rate)
+        token_limit = h.get("x-ratelimit-limit-tokens") or h.get("anthropic-ratelimit-tokens-limit")
+        if token_limit and token_limit.isdigit():
+            self.token_capacity = float(token_limit) * (self.per / 60.0)
+            self.token_budget = min(self.token_budget if self.token_budget is not None else self.token_capacity, self.token_capacity)
+        remaining_tokens = h.get("x-ratelimit-remaining-tokens") or h.get("anthropic-ratelimit-tokens-remaining")
+        if remaining_tokens and remaining_tokens.isdigit() and self.token_budget is not None:
+            self.token_budget = min(self.token_budget, float(remaining_tokens))
+        remaining = h.get("x-ratelimit-remaining-requests") or h.get("anthropic-ratelimit-requests-remaining")
+        if remaining is not None and remaining.strip() == "0":
+            reset = _parse_duration(h.get("x-ratelimit-reset-requests", "")) if h.get("x-ratelimit-reset-requests") else None
+            if reset:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+        retry_after = _parse_duration(h["retry-after"]) if h.get("retry-after") else None
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def report_outcome(self, exc: Optional[BaseException] = None, headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Feed one request outcome to AIMD: success grows the rate, a 429 halves it and honours its headers.
+        `headers` are the rate-limit headers of a successful response, when the client captured them.
+        """
+        if exc is None:
+            if headers:
+                self.observe_headers(headers)
+            self.on_success()
+            return
+        headers = _rate_limit_details(exc)
+        if headers is not None:
+            self.observe_headers(headers)
+            retry_after = headers.get("retry-after") or headers.get("Retry-After")
+            self.on_rate_limited(_parse_duration(retry_after) if retry_after else None)
+
 
-# Global limiters
+def _rate_limit_details(exc: BaseException) -> Optional[Mapping[str, str]]:
+    """Returns response headers ({} if unknown) when `exc` is a provider 429, else None."""
+    response = getattr(exc, "response", None) or getattr(exc, "raw_response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None) or getattr(exc, "code", None)
+    if status == 429 or type(exc).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return dict(getattr(response, "headers", None) or {})
+    return None
+
+
+# Global limiters (override with FITYMI_<PROVIDER>_RPM / FITYMI_<PROVIDER>_TPM)
 # Gemini API: 60 RPM free tier
-GEMINI_LIMITER = RateLimiter(60, 60.0)
+GEMINI_LIMITER = RateLimiter.from_env("GEMINI", 60)
 # Mistral API: Can be stricter on free tier, set to 1 req/sec safe limit
-MISTRAL_LIMITER = RateLimiter(60, 60.0)
+MISTRAL_LIMITER = RateLimiter.from_env("MISTRAL", 60)
 # OpenAI/Anthropic fallback limiters
-OPENAI_LIMITER = RateLimiter(100, 60.0)
+OPENAI_LIMITER = RateLimiter.from_env("OPENAI", 100)
+ANTHROPIC_LIMITER = RateLimiter.from_env("ANTHROPIC", 50)
+
+PROVIDER_LIMITERS = {
+    "google": GEMINI_LIMITER,
+    "mistral": MISTRAL_LIMITER,
+    "openai": OPENAI_LIMITER,
+    "anthropic": ANTHROPIC_LIMITER,
+}
+
+
+def configure_provider_limit(provider: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> RateLimiter:
+    """
+    Replace the shared limiter of `provider` (e.g. from CLI flags); nodes pick it up on their next call.
+    A limit left None keeps the provider's current one (env or default; 60 RPM and no TPM for a new provider).
+    """
+    current = PROVIDER_LIMITERS.get(provider)
+    if rpm is None:
+        rpm = round(current.max_rate * 60.0 / current.per) if current is not None else 60
+    if tpm is None and current is not None and current.token_capacity is not None:
+        tpm = round(current.token_capacity * 60.0 / current.per)
+    limiter = RateLimiter(rpm, 60.0, tokens_per_period=tpm)
+    PROVIDER_LIMITERS[provider] = limiter
+    logger.info(f"🚦 Rate limit for {provider}: {rpm} RPM" + (f", {tpm} TPM" if tpm else ""))
+    return limiter
+
 
 class NeuralMeshNode:
     """
@@ -44,42 +208,69 @@ class NeuralMeshNode:
     Capable of receiving a signal, processing it via its LLM agent,
     and optionally propagating it to connected nodes.
     """
-    def __init__(self, name: str, provider: str, model: str, role_prompt: str):
+    def __init__(self, name: str, provider: str, model: str, role_prompt: str,
+                 cache: Optional[ResponseCache] = None, role: Optional[str] = None,
+                 temperature: Optional[float] = None):
         self.name = name
-        self.agent = FitymiCopyAgent(provider=provider, model=model)
+        # Every routed attempt (retries, hedges, fallbacks) acquires and reports to its own provider limiter
+        self.agent = FitymiCopyAgent(provider=provider, model=model, cache=cache, role=role or name,
+                                     temperature=temperature, limiters=PROVIDER_LIMITERS)
         self.role_prompt = role_prompt
         self.connections: List['NeuralMeshNode'] = []
         self.activation_threshold = 0.7
-        self.provider = provider
+        # The agent may have been rerouted (FITYMI_PROVIDER_OVERRIDE): throttle on what it actually calls
+        self.provider = self.agent.provider
         
-    async def _wait_for_rate_limit(self):
-        if self.provider == "google":
-            await GEMINI_LIMITER.acquire()
-        elif self.provider == "mistral":
-            await MISTRAL_LIMITER.acquire()
-        elif self.provider == "openai":
-            await OPENAI_LIMITER.acquire()
+    @property
+    def limiter(self) -> Optional[RateLimiter]:
+        return PROVIDER_LIMITERS.get(self.provider)
 
     def connect(self, node: 'NeuralMeshNode'):
         """Connect this node to downstream nodes."""
         self.connections.append(node)
 
-    async def process(self, input_signal: str, task: str, constraints: Optional[Dict[str, Any]] = None) -> str:
-        """Internal processing function for this node."""
-        logger.info(f"🕸️ [Mesh Node: {self.name}] Processing signal...")
-        await self._wait_for_rate_limit()
-        
+    def _build_payload(self, input_signal: str, task: str) -> FitymiPayload:
         # Customize payload depending on what the node does
-        payload = FitymiPayload(
+        return FitymiPayload(
             system_prompt=self.role_prompt,
             user_context=input_signal,
             task_definition=task,
             verification_protocol="Ensure high quality and deep reasoning. Follow the constraints.",
             aeo_shielding="Output the result in plain format or markdown without conversational filler."
         )
-        
-        response = await self.agent.execute(payload)
-        return response.raw_output
+
+    def _span_attributes(self, prompt_tokens: int) -> Dict[str, Any]:
+        return {"node": self.name, "provider": self.provider, "model": self.agent.model,
+                "role": self.agent.role, "prompt_tokens": prompt_tokens}
+
+    async def process(self, input_signal: str, task: str, constraints: Optional[Dict[str, Any]] = None) -> str:
+        """Internal processing function for this node."""
+        logger.info(f"🕸️ [Mesh Node: {self.name}] Processing signal...")
+        prompt_tokens = estimate_tokens(self.role_prompt, input_signal, task)
+        with get_tracer().span("node.process", **self._span_attributes(prompt_tokens)) as span:
+            # Rate limiting happens per routed attempt inside the agent
+            response = await self.agent.execute(self._build_payload(input_signal, task))
+            usage = response.usage
+            if span is not None:
+                if usage.calls:
+                    span.set(prompt_tokens=usage.prompt_tokens, cached_tokens=usage.cached_tokens,
+                             response_tokens=usage.completion_tokens)
+                else:
+                    span.set(response_tokens=estimate_tokens(response.raw_output))
+            return response.raw_output
+
+    async def process_stream(self, input_signal: str, task: str) -> AsyncIterator[str]:
+        """Streaming variant of `process`: yields output chunks as they are decoded."""
+        logger.info(f"🕸️ [Mesh Node: {self.name}] Streaming signal...")
+        prompt_tokens = estimate_tokens(self.role_prompt, input_signal, task)
+        with get_tracer().span("node.process", streaming=True, **self._span_attributes(prompt_tokens)) as span:
+            # Rate limiting happens inside the agent, after the cache lookup
+            chunks: List[str] = []
+            async for chunk in self.agent.execute_stream(self._build_payload(input_signal, task)):
+                chunks.append(chunk)
+                yield chunk
+            if span is not None:
+                span.set(response_tokens=estimate_tokens("".join(chunks)))
 
     async def fire(self, input_signal: str, task: str, constraints: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -0,0 +1,98 @@
+import logging
+import os
+import re
+from typing import Any, List, Optional, Tuple
+
+from aeo_validator import AEOValidator
+from core.convergence import jaccard
+
+logger = logging.getLogger(__name__)
+
+# A well-formed copy ends on sentence punctuation (optionally closed by quotes, brackets or emphasis)
+_COMPLETE_ENDING = re.compile(r"[.!?…][\"'”’»)\]*_]*\s*$")
+
+
+class GenomePrefilter:
+    """
+    Local, zero-cost screening of candidate genomes before the paid LLM selector.
+    Candidates are rejected when they fail `AEOValidator.validate_structure`, fall outside the
+    word limits (`max_words` from the constraints, plus `word_slack`), or are near-duplicates
+    (shingle similarity >= `duplicate_threshold`) of the parent or of a better candidate.
+    Survivors are ranked by semantic density and sentence completeness (crossover splices
+    cut sentences in half) and only the best `keep` go on to LLM scoring.
+    """
+
+    def __init__(self, keep: int = 3, min_words: int = 5, word_slack: float = 0.1,
+                 duplicate_threshold: float = 0.9, enabled: bool = True):
+        self.keep = max(1, keep)
+        self.min_words = min_words
+        self.word_slack = word_slack
+        self.duplicate_threshold = duplicate_threshold
+        self.enabled = enabled
+        self.validator = AEOValidator()
+
+    @classmethod
+    def from_env(cls) -> "GenomePrefilter":
+        """FITYMI_PREFILTER (default on), FITYMI_PREFILTER_KEEP, FITYMI_PREFILTER_DUPLICATE."""
+        return cls(
+            keep=int(os.getenv("FITYMI_PREFILTER_KEEP", "3")),
+            duplicate_threshold=float(os.getenv("FITYMI_PREFILTER_DUPLICATE", "0.9")),
+            enabled=os.getenv("FITYMI_PREFILTER", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def rejection(self, text: str, parent: Optional[str] = None, max_words: Optional[int] = None) -> Optional[str]:
+        """Why a candidate must not reach the selector, or None if it passes the hard checks."""
+        words = len(text.split())
+        if words < self.min_words:
+            return f"too short ({words} words)"
+        if max_words and words > max_words * (1 + self.word_slack):
+            return f"too long ({words} > {max_words} words)"
+        is_valid, message = self.validator.validate_structure(text)
+        if not is_valid:
+            return message
+        if parent is not None and jaccard(text, parent) >= self.duplicate_threshold:
+            return "near-duplicate of the parent"
+        return None
+
+    def local_score(self, text: str) -> float:
+        """Cheap quality proxy in [0, 1]: semantic density, halved for a copy cut mid-sentence."""
+        density = self.validator.calculate_semantic_density(text)
+        completeness = 1.0 if _COMPLETE_ENDING.search(text) else 0.5
+        return (0.5 + 0.5 * density) * completeness
+
+    def select(self, genomes: List, parent: Optional[str] = None, max_words: Optional[Any] = None) -> List:
+        """
+        Genomes worth an LLM score, best local score first. Never empty for a non-empty input:
+        if every candidate is rejected, the best-ranked one is kept so the generation can advance.
+        """
+        if not self.enabled or not genomes:
+            return list(genomes)
+        try:
+            # Constraints from CSV batches arrive as strings
+            max_words = int(max_words) if max_words else None
+        except (TypeError, ValueError):
+            max_words = None
+        ranked: List[Tuple[bool, float, int]] = []
+        for i, genome in enumerate(genomes):
+            reason = self.rejection(genome.content, parent, max_words)
+            if reason is not None:
+                logger.info(f"🧹 Prefilter rejected {genome.id}: {reason}")
+            ranked.append((reason is None, self.local_score(genome.content), i))
+        ranked.sort(key=lambda r: (not r[0], -r[1], r[2]))
+
+        survivors = []
+        for passed, _, i in ranked:
+            if not passed:
+                continue
+            twin = next((kept for kept in survivors
+                         if jaccard(genomes[i].content, kept.content) >= self.duplicate_threshold), None)
+            if twin is not None:
+                logger.info(f"🧹 Prefilter rejected {genomes[i].id}: near-duplicate of {twin.id}")
+                continue
+            survivors.append(genomes[i])
+            if len(survivors) == self.keep:
+                break
+        if not survivors:
+            survivors = [genomes[ranked[0][2]]]
+        logger.info(f"🧹 Prefilter: {len(survivors)}/{len(genomes)} genomes sent to LLM scoring.")
+        return survivors
@@ -1,18 +1,93 @@
 import asyncio
 import logging
-from typing import List
+import os
+import re
+from typing import Callable, Dict, List, Optional
 
+import numpy as np
+
+from aeo_validator import AEOValidator
 from core.neural_mesh import NeuralMeshNode
+from embeddings import EmbeddingFunction, HashingTfidfEmbedder
 
 logger = logging.getLogger(__name__)
 
+# How the observer picks a state: "echo" (the LLM writes the chosen text back), "index" (the LLM
+# answers with the state number only) or "local" (embedding + AEO ranking, LLM index only on a close call)
+COLLAPSE_MODES = ("echo", "index", "local")
+
+# Tones of the superimposed states (FITYMI_QUANTUM_TONES overrides, comma-separated)
+QUANTUM_TONES = ["Emotional", "Rational", "Urgent"]
+
 class QuantumCopyState:
     """Holds superimposed versions of the copy until collapse."""
     def __init__(self, states: List[str]):
         self.states = states
-        
+
+
+class QuantumStateGenerator:
+    """
+    Generates the superimposed states with one concurrent call per tone, so the stage costs
+    one short completion of wall time instead of one triple-length completion. A tone whose
+    answer is empty or unusable is asked again up to `retries` times; provider errors are already
+    retried (and failed over) by the node's router, so a tone whose call still fails is dropped
+    straight away. Generation returns as soon as `min_states` states exist (all tones by default):
+    the collapse starts without waiting for the slowest tone, whose calls are cancelled.
+    """
+    def __init__(self, tones: Optional[List[str]] = None, retries: Optional[int] = None,
+                 min_states: Optional[int] = None):
+        env_tones = [t.strip() for t in os.getenv("FITYMI_QUANTUM_TONES", "").split(",") if t.strip()]
+        self.tones = tones or env_tones or list(QUANTUM_TONES)
+        self.retries = retries if retries is not None else int(os.getenv("FITYMI_QUANTUM_RETRIES", "1"))
+        min_states = min_states if min_states is not None else int(os.getenv("FITYMI_QUANTUM_MIN_STATES", "0"))
+        self.min_states = max(1, min(len(self.tones), min_states)) if min_states > 0 else len(self.tones)
+        self.node = NeuralMeshNode(
+            name="State Generator", provider="openai", model="gpt-4o",
+            role_prompt=(
+                "You rewrite marketing copy as ONE variation in the requested tone, keeping its facts, "
+                "offer and call to action. Output ONLY the rewritten copy."
+            ),
+            role="state_generator"
+        )
+
+    async def _generate_state(self, tone: str, copy: str) -> Optional[str]:
+        for attempt in range(1, self.retries + 2):
+            try:
+                state = (await self.node.fire(f"Tone: {tone}\n\nCopy:\n{copy}", f"Rewrite the copy in a {tone} tone.")).strip()
+            except Exception as e:
+                # The router already spent its retries and fallbacks on this call
+                logger.warning(f"🌌 {tone} state failed: {e}")
+                return None
+            if len(state) > 10:
+                return state
+            logger.warning(f"🌌 {tone} state came back empty (attempt {attempt}).")
+        return None
+
+    async def generate(self, copy: str) -> List[str]:
+        """The states in tone order; `[copy]` if every tone failed."""
+        tasks: Dict[asyncio.Task, int] = {
+            asyncio.create_task(self._generate_state(tone, copy)): i for i, tone in enumerate(self.tones)
+        }
+        states: Dict[int, str] = {}
+        pending = set(tasks)
+        try:
+            while pending and len(states) < self.min_states:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        states[tasks[task]] = task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        if pending:
+            logger.info(f"🌌 {len(states)} states ready: collapsing without the {len(pending)} slower tone(s).")
+        return [states[i] for i in sorted(states)] or [copy]
+
+
 class ObserverNode(NeuralMeshNode):
-    def __init__(self):
+    def __init__(self, index_only: bool = False):
+        answer = ("Answer ONLY with the number of that variation." if index_only else
+                  "Output exactly that variation and nothing else.")
         super().__init__(
             name="Gemini-Pro Observer",
             provider="google",
@@ -20,34 +95,106 @@ class ObserverNode(NeuralMeshNode):
             role_prompt=(
                 "You are the Quantum Observer. You receive multiple variations of a text and a "
                 "specific, late-binding context. Your job is to select the SINGLE best variation "
-                "that perfectly matches the context. Output exactly that variation and nothing else. "
+                f"that perfectly matches the context. {answer} "
                 "Do not explain your choice."
             )
         )
 
 class WaveFunctionCollapse:
-    """Collapses the quantum state into a final copy based on observer context."""
-    def __init__(self):
-        self.observer = ObserverNode()
+    """
+    Collapses the quantum state into a final copy based on observer context.
+    `mode` (FITYMI_COLLAPSE_MODE) selects how: see COLLAPSE_MODES. The index and local modes
+    never make the observer echo a whole state back; the local mode escalates to the LLM only
+    when its two best states are closer than `margin` (FITYMI_COLLAPSE_MARGIN).
+    """
+    def __init__(self, mode: Optional[str] = None, margin: Optional[float] = None,
+                 embedder: Optional[EmbeddingFunction] = None):
+        self.mode = (mode or os.getenv("FITYMI_COLLAPSE_MODE") or "echo").lower()
+        if self.mode not in COLLAPSE_MODES:
+            raise ValueError(f"Collapse mode '{self.mode}' not supported. Supported modes: {list(COLLAPSE_MODES)}")
+        self.margin = margin if margin is not None else float(os.getenv("FITYMI_COLLAPSE_MARGIN", "0.05"))
+        self.observer = ObserverNode(index_only=self.mode != "echo")
+        self.embedder = embedder or HashingTfidfEmbedder()
+        self.validator = AEOValidator()
 
-    async def observe(self, quantum_state: QuantumCopyState, final_context: str) -> str:
-        logger.info(f"🌌 Collapsing Wave Function from {len(quantum_state.states)} states...")
-        
-        # If there's only one state, no need to collapse.
-        if len(quantum_state.states) == 1:
-            logger.info("Only one state present, auto-collapsing.")
-            return quantum_state.states[0]
-            
-        # Build prompt
+    def rank_states(self, states: List[str], final_context: str) -> List[float]:
+        """
+        Local score of each state: cosine similarity to the late-binding context, plus a bonus
+        for semantic density and a penalty for broken structure (AEOValidator).
+        """
+        vectors = self.embedder([final_context] + states)
+        similarities = vectors[1:] @ vectors[0]
+        scores = []
+        for state, similarity in zip(states, similarities):
+            is_valid, _ = self.validator.validate_structure(state)
+            scores.append(float(similarity) + 0.25 * self.validator.calculate_semantic_density(state)
+                          - (0.0 if is_valid else 0.5))
+        return scores
+
+    def _observer_prompt(self, states: List[str], final_context: str) -> str:
         prompt_parts = [f"FINAL CONTEXT/CONSTRAINTS: {final_context}\n\n== SUPERIMPOSED STATES =="]
-        for i, state in enumerate(quantum_state.states):
+        for i, state in enumerate(states):
             # Removing markdown format wrappers if they exist in state
             clean_state = state.strip('`').replace('markdown\n', '')
             prompt_parts.append(f"\n--- [STATE {i+1}] ---\n{clean_state}\n")
-            
-        prompt_parts.append("\nCollapse the wave function. Output ONLY the text of the best state for the context.")
+        if self.mode == "echo":
+            prompt_parts.append("\nCollapse the wave function. Output ONLY the text of the best state for the context.")
+        else:
+            prompt_parts.append(f"\nCollapse the wave function. Answer ONLY with the number of the best state (1-{len(states)}).")
+        return "\n".join(prompt_parts)
+
+    async def _observe_index(self, states: List[str], final_context: str, fallback: int) -> int:
+        """State picked by the observer's numeric answer; `fallback` if the answer is not a valid state number."""
+        answer = await self.observer.fire(self._observer_prompt(states, final_context), "Select the best state.")
+        match = re.search(r"\d+", answer)
+        if match and 1 <= int(match.group()) <= len(states):
+            return int(match.group()) - 1
+        logger.warning(f"Observer answered '{answer[:40]}', not a state number: using the local ranking.")
+        return fallback
+
+    async def observe(self, quantum_state: QuantumCopyState, final_context: str,
+                      on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Selects the state that best fits `final_context`.
+        When `on_token` is given, the observer output is streamed to it chunk by chunk
+        (in the index and local modes, the chosen state is sent as a single chunk).
+        """
+        logger.info(f"🌌 Collapsing Wave Function from {len(quantum_state.states)} states...")
+        states = quantum_state.states
         
-        collapsed_copy = await self.observer.fire("\n".join(prompt_parts), "Select the best state.")
+        # If there's only one state, no need to collapse.
+        if len(states) == 1:
+            logger.info("Only one state present, auto-collapsing.")
+            if on_token is not None:
+                on_token(states[0])
+            return states[0]
+
+        if self.mode != "echo":
+            scores = self.rank_states(states, final_context)
+            order = list(np.argsort(scores)[::-1])
+            margin = scores[order[0]] - scores[order[1]]
+            if self.mode == "local" and margin >= self.margin:
+                chosen = int(order[0])
+                logger.info(f"✨ Wave function collapsed locally on state {chosen + 1} (margin {margin:.3f}).")
+            else:
+                if self.mode == "local":
+                    logger.info(f"🌌 Local margin {margin:.3f} below {self.margin}: escalating to the observer.")
+                chosen = await self._observe_index(states, final_context, fallback=int(order[0]))
+                logger.info(f"✨ Wave function collapsed on state {chosen + 1}.")
+            collapsed_copy = states[chosen].strip('`').replace('markdown\n', '').strip()
+            if on_token is not None:
+                on_token(collapsed_copy)
+            return collapsed_copy
+
+        prompt = self._observer_prompt(states, final_context)
+        if on_token is None:
+            collapsed_copy = await self.observer.fire(prompt, "Select the best state.")
+        else:
+            chunks = []
+            async for chunk in self.observer.process_stream(prompt, "Select the best state."):
+                chunks.append(chunk)
+                on_token(chunk)
+            collapsed_copy = "".join(chunks)
         
         # Clean output
         collapsed_copy = collapsed_copy.strip('`').replace('markdown\n', '').strip()
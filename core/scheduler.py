@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from accounting import stage_scope
+from checkpoints import WorkflowCheckpoint
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+EventListener = Callable[[Dict[str, Any]], None]
+
+
+class StageTiming(BaseModel):
+    """Wall-clock window of a single stage, relative to the start of the run."""
+    name: str
+    depends_on: List[str] = Field(default_factory=list)
+    start_ms: float
+    end_ms: float
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+
+class PipelineStage:
+    """A node of the workflow graph: an async callable plus the stages it waits for."""
+    def __init__(self, name: str, func: StageFunc, depends_on: Optional[List[str]] = None, checkpoint: bool = False):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+        # Persist the (JSON-serialisable) result so a retried run can skip the stage
+        self.checkpoint = checkpoint
+
+
+class DAGScheduler:
+    """
+    Async scheduler for a Direct Acyclic Graph of pipeline stages.
+    Every stage starts as soon as all of its dependencies have completed, so
+    independent branches (memory retrieval, node warm-up, speculative work)
+    overlap instead of waiting on serial awaits.
+    With a `checkpoint`, stages added with `checkpoint=True` are saved as they complete and
+    restored (without waiting for their dependencies) when the same workflow runs again.
+    """
+
+    def __init__(self, listener: Optional[EventListener] = None, checkpoint: Optional[WorkflowCheckpoint] = None):
+        # Optional callback receiving {"event": ..., "data": {...}} on stage start/end/error
+        self.listener = listener
+        self.checkpoint = checkpoint
+        self.stages: Dict[str, PipelineStage] = {}
+        self.timings: Dict[str, StageTiming] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def add_stage(self, name: str, func: StageFunc, depends_on: Optional[List[str]] = None, checkpoint: bool = False) -> None:
+        """Register a stage. `func` receives a dict with the results of its dependencies."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already registered.")
+        self.stages[name] = PipelineStage(name, func, depends_on, checkpoint)
+
+    def _emit(self, event: str, **data: Any) -> None:
+        if self.listener is not None:
+            self.listener({"event": event, "data": data})
+
+    def _topological_order(self) -> List[str]:
+        """Validate the graph (unknown dependencies, cycles) and return a topological order."""
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'.")
+
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle detected in workflow graph at stage '{name}'.")
+            state[name] = 1
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(self) -> Dict[str, Any]:
+        """Execute the graph and return the result of every stage keyed by name."""
+        order = self._topological_order()
+        self.timings = {}
+        self._started_at = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: PipelineStage) -> Any:
+            if stage.checkpoint and self.checkpoint is not None:
+                restored, value = self.checkpoint.restore(stage.name)
+                if restored:
+                    now = (time.perf_counter() - self._started_at) * 1000
+                    self.timings[stage.name] = StageTiming(name=stage.name, depends_on=stage.depends_on, start_ms=now, end_ms=now)
+                    self._emit("stage_restored", stage=stage.name)
+                    logger.info(f"♻️ Stage '{stage.name}' restored from checkpoint")
+                    return value
+            if stage.depends_on:
+                await asyncio.gather(*[tasks[dep] for dep in stage.depends_on])
+            inputs = {dep: tasks[dep].result() for dep in stage.depends_on}
+            start = time.perf_counter()
+            self._emit("stage_start", stage=stage.name)
+            try:
+                with get_tracer().span("stage", stage=stage.name), stage_scope(stage.name):
+                    result = await stage.func(inputs)
+            except Exception as e:
+                self._emit("stage_error", stage=stage.name, error=str(e))
+                raise
+            finally:
+                end = time.perf_counter()
+                self.timings[stage.name] = StageTiming(
+                    name=stage.name,
+                    depends_on=stage.depends_on,
+                    start_ms=(start - self._started_at) * 1000,
+                    end_ms=(end - self._started_at) * 1000,
+                )
+            if stage.checkpoint and self.checkpoint is not None:
+                self.checkpoint.save(stage.name, result)
+            self._emit("stage_end", stage=stage.name, duration_ms=round(self.timings[stage.name].duration_ms, 2))
+            return result
+
+        for name in order:
+            tasks[name] = asyncio.create_task(run_stage(self.stages[name]), name=f"stage:{name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self._finished_at = time.perf_counter()
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Returns the chain of stages that gated the end of the run and its latency (ms).
+        Walks back from the last stage to finish, always following the dependency that
+        completed last, i.e. the one the stage was actually waiting on.
+        """
+        if not self.timings:
+            return [], 0.0
+
+        current = max(self.timings.values(), key=lambda t: t.end_ms)
+        path = [current.name]
+        while current.depends_on:
+            current = max((self.timings[d] for d in current.depends_on), key=lambda t: t.end_ms)
+            path.append(current.name)
+        path.reverse()
+        return path, sum(self.timings[name].duration_ms for name in path)
+
+    def report(self) -> Dict[str, Any]:
+        """Per-stage durations plus critical-path and wall-clock latency of the last run."""
+        path, path_ms = self.critical_path()
+        wall_ms = 0.0
+        if self._started_at is not None and self._finished_at is not None:
+            wall_ms = (self._finished_at - self._started_at) * 1000
+        return {
+            "stages": {name: round(t.duration_ms, 2) for name, t in self.timings.items()},
+            "critical_path": path,
+            "critical_path_ms": round(path_ms, 2),
+            "wall_time_ms": round(wall_ms, 2),
+        }
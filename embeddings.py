@@ -0,0 +1,66 @@
+import hashlib
+import re
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+# Any callable mapping N texts to an (N, dim) float32 matrix of L2-normalised rows
+EmbeddingFunction = Callable[[Sequence[str]], np.ndarray]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class HashingTfidfEmbedder:
+    """
+    Offline embedding function based on the hashing trick.
+    Unigrams and bigrams are hashed into `dim` signed buckets with sublinear TF weighting.
+    IDF weights are optional: call `fit` on a reference corpus to learn them; afterwards
+    they stay frozen so previously stored vectors remain comparable.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: tuple = (1, 2), idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.idf = idf
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        features: List[str] = []
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            features.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return features
+
+    def _bucket(self, feature: str) -> tuple:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, (1.0 if (value >> 63) & 1 else -1.0)
+
+    def _term_frequencies(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        # Sublinear TF keeps repeated boilerplate from dominating
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+    def fit(self, corpus: Sequence[str]) -> "HashingTfidfEmbedder":
+        """Learn smoothed IDF weights per hash bucket from `corpus`."""
+        document_frequency = np.zeros(self.dim, dtype=np.float32)
+        for text in corpus:
+            buckets = {self._bucket(f)[0] for f in self._features(text)}
+            document_frequency[list(buckets)] += 1
+        self.idf = (np.log((1 + len(corpus)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.stack([self._term_frequencies(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        if self.idf is not None:
+            matrix = matrix * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
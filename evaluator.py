@@ -1,8 +1,110 @@
+import asyncio
+import json
 import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
 from agent import FitymiCopyAgent, FitymiPayload
+from cache import get_response_cache
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - FITYMI JUDGE - %(message)s")
 
+_NUMBER = r"(\d+(?:\.\d+)?)"
+# "0.72", "72%", "7/10", "8.5 / 10": score-looking numbers of an answer
+_SCORE_RE = re.compile(_NUMBER + r"\s*(%|/\s*10\b|/\s*100\b)?")
+# Scale bounds ("on a scale of 0 to 1", "between 0.0 and 1.0", "0.35 out of 1.0") are not scores
+_BOUND_BEFORE_RE = re.compile(r"(?:\bto|\bfrom|\bbetween|\band|\bout\s+of|\bscale\s+of|\d\s*[-–])\s*$", re.IGNORECASE)
+_BOUND_AFTER_RE = re.compile(r"\s*(?:to\b|and\b|[-–]\s*\d)", re.IGNORECASE)
+# "[DRAFT 2] 0.7", "Draft 2: 70%", "2) 0.7" when a batch answer is not valid JSON
+_DRAFT_LINE_RE = re.compile(r"^\W*(?:draft\s*)?(\d+)\W*?(?:score\s*)?[:=\-\)\]]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+def _strip_code_fences(raw: str) -> str:
+    clean = raw.strip()
+    if clean.startswith("```"):
+        lines = clean.split("\n")[1:]
+        if lines and lines[-1].startswith("```"):
+            lines = lines[:-1]
+        clean = "\n".join(lines).strip()
+    return clean
+
+
+def _normalise(value: float, unit: Optional[str] = None) -> Optional[float]:
+    if unit == "%" or (unit and "100" in unit):
+        value /= 100
+    elif unit:
+        value /= 10
+    return value if 0.0 <= value <= 1.0 else None
+
+
+def parse_score(raw: Any) -> Optional[float]:
+    """
+    A 0-1 score from a judge answer: a bare number, a JSON number or object with a score field,
+    a percentage or an "x/10" rating inside prose. In prose, scale bounds are skipped and the
+    first decimal, percentage or rating wins over bare integers ("Draft 1 scores 0.8" is 0.8);
+    a bare 0 or 1 is only used when nothing better is found. None when nothing score-like is found.
+    """
+    if isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        return _normalise(float(raw))
+    if isinstance(raw, dict):
+        for key in ("score", "overall_score", "probability"):
+            if key in raw:
+                return parse_score(raw[key])
+        return None
+    if not isinstance(raw, str):
+        return None
+    text = _strip_code_fences(raw)
+    try:
+        return parse_score(json.loads(text))
+    except (json.JSONDecodeError, ValueError):
+        pass
+    bare: Optional[float] = None
+    for match in _SCORE_RE.finditer(text):
+        if _BOUND_BEFORE_RE.search(text, 0, match.start()) or _BOUND_AFTER_RE.match(text, match.end()):
+            continue
+        unit = match.group(2).replace(" ", "") if match.group(2) else None
+        # Skip numbers that cannot be a score ("3 drafts", "2024")
+        score = _normalise(float(match.group(1)), unit)
+        if score is None:
+            continue
+        if unit or "." in match.group(1):
+            return score
+        bare = score
+    return bare
+
+
+def parse_scores(raw: str, count: int) -> Dict[int, float]:
+    """
+    Scores of a batch answer, keyed by draft number (0-based). Accepts a JSON array of objects
+    ({"draft": i, "score": x}) or of bare numbers, optionally wrapped in an object, and falls
+    back to one "draft: score" line per draft. Items that cannot be read are left out.
+    """
+    text = _strip_code_fences(raw)
+    scores: Dict[int, float] = {}
+    try:
+        parsed = json.loads(text)
+        if isinstance(parsed, dict):
+            parsed = next((v for v in parsed.values() if isinstance(v, list)), [])
+        if isinstance(parsed, list):
+            for position, item in enumerate(parsed):
+                index = position
+                if isinstance(item, dict):
+                    index = next((item[k] for k in ("draft", "id", "index", "genome") if k in item), position)
+                score = parse_score(item)
+                if isinstance(index, int) and 0 <= index < count and score is not None:
+                    scores[index] = score
+            return scores
+    except json.JSONDecodeError:
+        pass
+    for match in _DRAFT_LINE_RE.finditer(text):
+        index, score = int(match.group(1)), parse_score(match.group(2))
+        if 0 <= index < count and score is not None:
+            scores.setdefault(index, score)
+    return scores
+
 class AutonomousEvaluator:
     """
     Fitymi Phase 4: Autonomous Evaluation (LLM-as-a-Judge) and RLAIF.
@@ -10,9 +112,14 @@ class AutonomousEvaluator:
     If the score is below the threshold, it triggers a recursive rewrite.
     """
 
-    def __init__(self, provider: str = "openai", model: str = "gpt-4o"):
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o", batch_size: Optional[int] = None,
+                 samples: Optional[int] = None, concurrency: Optional[int] = None):
         logging.info(f"⚖️ Initializing LLM-as-a-Judge ({model}).")
-        self.judge_agent = FitymiCopyAgent(provider=provider, model=model)
+        self.judge_agent = FitymiCopyAgent(provider=provider, model=model, cache=get_response_cache(), role="judge")
+        # evaluate_many: drafts per request, self-consistency samples per draft, requests in flight
+        self.batch_size = max(1, batch_size or int(os.getenv("FITYMI_JUDGE_BATCH_SIZE", "10")))
+        self.samples = max(1, samples or int(os.getenv("FITYMI_JUDGE_SAMPLES", "1")))
+        self.concurrency = max(1, concurrency or int(os.getenv("FITYMI_JUDGE_CONCURRENCY", "4")))
 
     async def evaluate_copy(self, draft: str, target_audience: str, goal: str) -> float:
         """
@@ -47,13 +154,93 @@ class AutonomousEvaluator:
         
         response = await self.judge_agent.execute(payload)
         
-        try:
-            score = float(response.raw_output.strip())
-            logging.info(f"🏆 Autonomous Eval Score: {score}/1.0")
-            return score
-        except ValueError:
-            logging.error("Failed to parse evaluation score. Defaulting to 0.5")
+        score = parse_score(response.raw_output)
+        if score is None:
+            logging.error(f"Failed to parse evaluation score from '{response.raw_output[:80]}'. Defaulting to 0.5")
             return 0.5
+        logging.info(f"🏆 Autonomous Eval Score: {score}/1.0")
+        return score
+
+    async def _judge_batch(self, drafts: Sequence[str], target_audience: str, goal: str,
+                           sample: int = 0, samples: int = 1, retry: bool = False) -> Dict[int, float]:
+        """One structured request scoring `drafts`; returns the scores it could parse."""
+        blocks = "\n\n".join(f"--- [DRAFT {i}] ---\n{draft}" for i, draft in enumerate(drafts))
+        # Distinct samples must not be served from the same response-cache entry
+        sample_note = f"\n(Independent evaluation #{sample + 1} of {samples}.)" if samples > 1 else ""
+        # Nor may a retry: the cached unparsable answer would come straight back
+        if retry:
+            sample_note += ('\nYour previous answer could not be parsed. Reply with the JSON array and nothing else, '
+                            'e.g. [{"draft": 0, "score": 0.42}].')
+        prompt = f"""
+        You are a highly analytical AI simulating the target audience: {target_audience}.
+        Your goal is to be extremely skeptical of marketing copy.
+
+        Evaluate each of the {len(drafts)} drafts below against the goal: {goal}.
+        Will it make you take action? Does it sound like AI or a real human?
+
+        {blocks}
+
+        Return ONLY a JSON array with one object per draft, in order: [{{"draft": int, "score": float}}]
+        where "draft" is the DRAFT number and "score" is the probability of conversion between 0.0 and 1.0.
+        0.0 = Absolute trash, clear AI writing, no conversion. 1.0 = Masterpiece, human-sounding, immediate conversion.{sample_note}
+        """
+        payload = FitymiPayload(
+            system_prompt="You are an uncompromising, skeptical marketing judge.",
+            user_context=prompt,
+            task_definition="Score every draft.",
+            verification_protocol="Ensure only the JSON array is outputted, with one entry per draft.",
+            aeo_shielding="Provide raw JSON without markdown or extra text."
+        )
+        response = await self.judge_agent.execute(payload)
+        return parse_scores(response.raw_output, len(drafts))
+
+    async def _judge_chunk(self, drafts: Sequence[str], target_audience: str, goal: str, sample: int, samples: int,
+                           semaphore: asyncio.Semaphore) -> Dict[int, float]:
+        """Score a chunk; drafts left unparsed are retried once, in a single smaller request."""
+        async with semaphore:
+            try:
+                scores = await self._judge_batch(drafts, target_audience, goal, sample, samples)
+            except Exception as e:
+                logging.warning(f"Judge batch failed: {e}")
+                scores = {}
+            missing = [i for i in range(len(drafts)) if i not in scores]
+            if missing:
+                logging.warning(f"Judge left {len(missing)}/{len(drafts)} drafts unparsed. Retrying only those.")
+                try:
+                    retried = await self._judge_batch([drafts[i] for i in missing], target_audience, goal, sample, samples,
+                                                      retry=True)
+                except Exception as e:
+                    logging.warning(f"Judge retry failed: {e}")
+                    retried = {}
+                scores.update({missing[j]: score for j, score in retried.items()})
+        return scores
+
+    async def evaluate_many(self, drafts: Sequence[str], target_audience: str, goal: str,
+                            samples: Optional[int] = None) -> List[Optional[float]]:
+        """
+        Scores many drafts with `batch_size` drafts per request instead of one call each.
+        With `samples` > 1 (self-consistency) every chunk is judged that many times concurrently
+        and each draft gets the mean of its parsed scores. A draft no sample could score is None.
+        """
+        samples = max(1, samples or self.samples)
+        logging.info(f"🧪 Judging {len(drafts)} drafts in batches of {self.batch_size} ({samples} sample(s))...")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        starts = list(range(0, len(drafts), self.batch_size))
+        jobs = [(start, sample) for start in starts for sample in range(samples)]
+        results = await asyncio.gather(*(
+            self._judge_chunk(drafts[start:start + self.batch_size], target_audience, goal, sample, samples, semaphore)
+            for start, sample in jobs
+        ))
+
+        collected: List[List[float]] = [[] for _ in drafts]
+        for (start, _), scores in zip(jobs, results):
+            for offset, score in scores.items():
+                collected[start + offset].append(score)
+        final = [round(sum(s) / len(s), 4) if s else None for s in collected]
+        unscored = sum(score is None for score in final)
+        if unscored:
+            logging.error(f"Failed to score {unscored}/{len(drafts)} drafts.")
+        return final
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,377 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+TERMINAL_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    request: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Worker process running the job, and the last renewal of its lease
+    owner: Optional[str] = None
+    heartbeat_at: Optional[float] = None
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity (mapped to HTTP 429)."""
+
+
+class JobStore:
+    """Pluggable persistence for job state."""
+
+    def save(self, job: Job) -> None:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    def list_by_status(self, status: JobStatus) -> List[Job]:
+        raise NotImplementedError
+
+    def claim(self, job_id: str, owner: str) -> Optional[Job]:
+        """Atomically move a QUEUED job to RUNNING under `owner`; None if it is no longer queued."""
+        raise NotImplementedError
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        """Renew `owner`'s lease on a RUNNING job; False if the job is no longer running under it."""
+        raise NotImplementedError
+
+    def expire(self, cutoff: float) -> List[Job]:
+        """Mark FAILED the RUNNING jobs whose lease was last renewed before `cutoff`, and return them."""
+        raise NotImplementedError
+
+    def finish(self, job: Job, owner: str) -> bool:
+        """Store the final state of a job still RUNNING under `owner`; False (nothing written) if its lease is gone."""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """Volatile store, mostly useful for tests and single-shot scripts."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job.model_copy()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job else None
+
+    def list_by_status(self, status: JobStatus) -> List[Job]:
+        return [job.model_copy() for job in self._jobs.values() if job.status == status]
+
+    def claim(self, job_id: str, owner: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                return None
+            now = time.time()
+            job = job.model_copy(update={"status": JobStatus.RUNNING, "owner": owner, "started_at": now, "heartbeat_at": now})
+            self._jobs[job_id] = job
+            return job.model_copy()
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JobStatus.RUNNING or job.owner != owner:
+                return False
+            job.heartbeat_at = time.time()
+            return True
+
+    def expire(self, cutoff: float) -> List[Job]:
+        expired = []
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == JobStatus.RUNNING and (job.heartbeat_at or 0.0) < cutoff:
+                    job.status = JobStatus.FAILED
+                    job.error = f"Worker {job.owner} stopped renewing its lease."
+                    job.finished_at = time.time()
+                    expired.append(job.model_copy())
+        return expired
+
+    def finish(self, job: Job, owner: str) -> bool:
+        with self._lock:
+            current = self._jobs.get(job.id)
+            if current is None or current.status != JobStatus.RUNNING or current.owner != owner:
+                return False
+            self._jobs[job.id] = job.model_copy()
+            return True
+
+
+class SQLiteJobStore(JobStore):
+    """Default store: job state survives restarts and is visible to every worker process."""
+
+    def __init__(self, path: str = ".fitymi_jobs.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "created_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        # Lease columns, added in place to stores created before them
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, created_at, owner, heartbeat_at, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.status.value, job.created_at, job.owner, job.heartbeat_at, job.model_dump_json()),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def list_by_status(self, status: JobStatus) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM jobs WHERE status = ? ORDER BY created_at", (status.value,)
+            ).fetchall()
+        return [Job.model_validate_json(row[0]) for row in rows]
+
+    def claim(self, job_id: str, owner: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM jobs WHERE id = ? AND status = ?",
+                                     (job_id, JobStatus.QUEUED.value)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            job = Job.model_validate_json(row[0]).model_copy(
+                update={"status": JobStatus.RUNNING, "owner": owner, "started_at": now, "heartbeat_at": now})
+            # The status guard makes the claim atomic across worker processes sharing the database
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, body = ? WHERE id = ? AND status = ?",
+                (job.status.value, owner, now, job.model_dump_json(), job_id, JobStatus.QUEUED.value),
+            ).rowcount
+            self._conn.commit()
+        return job if claimed else None
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        with self._lock:
+            renewed = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time(), job_id, JobStatus.RUNNING.value, owner),
+            ).rowcount
+            self._conn.commit()
+        return bool(renewed)
+
+    def expire(self, cutoff: float) -> List[Job]:
+        expired = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body, heartbeat_at FROM jobs WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (JobStatus.RUNNING.value, cutoff),
+            ).fetchall()
+            for body, heartbeat_at in rows:
+                job = Job.model_validate_json(body)
+                job.status = JobStatus.FAILED
+                job.error = f"Worker {job.owner} stopped renewing its lease."
+                job.finished_at = time.time()
+                # Skipped if the owner renewed (or another worker expired it) since the select
+                if self._conn.execute(
+                    "UPDATE jobs SET status = ?, body = ? WHERE id = ? AND status = ? AND heartbeat_at IS ?",
+                    (job.status.value, job.model_dump_json(), job.id, JobStatus.RUNNING.value, heartbeat_at),
+                ).rowcount:
+                    expired.append(job)
+            self._conn.commit()
+        return expired
+
+    def finish(self, job: Job, owner: str) -> bool:
+        with self._lock:
+            # Expired or cancelled by another worker process since it was claimed: leave that state alone
+            finished = self._conn.execute(
+                "UPDATE jobs SET status = ?, body = ? WHERE id = ? AND status = ? AND owner = ?",
+                (job.status.value, job.model_dump_json(), job.id, JobStatus.RUNNING.value, owner),
+            ).rowcount
+            self._conn.commit()
+        return bool(finished)
+
+
+class JobManager:
+    """
+    Bounded in-process job queue drained by a fixed pool of workflow workers.
+    `submit` never blocks: when the queue is full it raises QueueFullError so the API
+    can answer 429 instead of holding the connection open.
+    Several API processes may share one store: a job is claimed atomically before it runs,
+    and running jobs hold a lease renewed every `lease_seconds / 3`. Only jobs whose lease
+    expired (their worker died) are failed on recovery.
+    """
+
+    def __init__(self, runner: JobRunner, store: Optional[JobStore] = None,
+                 max_queue_size: int = 100, num_workers: int = 2, lease_seconds: float = 60.0):
+        self.runner = runner
+        self.store = store or MemoryJobStore()
+        self.max_queue_size = max_queue_size
+        self.num_workers = num_workers
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+
+    @classmethod
+    def from_env(cls, runner: JobRunner) -> "JobManager":
+        """FITYMI_JOB_WORKERS, FITYMI_JOB_QUEUE_SIZE, FITYMI_JOB_DB and FITYMI_JOB_LEASE configure the manager."""
+        return cls(
+            runner,
+            store=SQLiteJobStore(os.getenv("FITYMI_JOB_DB", ".fitymi_jobs.sqlite3")),
+            max_queue_size=int(os.getenv("FITYMI_JOB_QUEUE_SIZE", "100")),
+            num_workers=int(os.getenv("FITYMI_JOB_WORKERS", "2")),
+            lease_seconds=float(os.getenv("FITYMI_JOB_LEASE", "60")),
+        )
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        # Jobs of a dead worker cannot be resumed mid-flight; live workers keep renewing theirs
+        self._expire_leases()
+        # Queued jobs are re-admitted: whichever worker process claims one first runs it
+        for job in self.store.list_by_status(JobStatus.QUEUED):
+            try:
+                self._queue.put_nowait(job.id)
+            except asyncio.QueueFull:
+                logger.warning(f"📬 Queue full: job {job.id} left for another worker.")
+                break
+
+        self._workers = [asyncio.create_task(self._worker(i), name=f"job-worker-{i}") for i in range(self.num_workers)]
+        self._heartbeat = asyncio.create_task(self._renew_leases(), name="job-heartbeat")
+        logger.info(f"📬 Job manager started: {self.num_workers} worker(s), queue size {self.max_queue_size}.")
+
+    async def stop(self) -> None:
+        for task in list(self._running.values()):
+            task.cancel()
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+    def _expire_leases(self) -> None:
+        for job in self.store.expire(time.time() - self.lease_seconds):
+            logger.warning(f"⚠️ Job {job.id} failed: {job.error}")
+
+    async def _renew_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for job_id, task in list(self._running.items()):
+                if not self.store.renew(job_id, self.owner):
+                    # Cancelled (or expired) from another worker process: stop and leave the store as is
+                    self._cancelled.add(job_id)
+                    task.cancel()
+            self._expire_leases()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, request: Dict[str, Any]) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager not started.")
+        if self._queue.full():
+            raise QueueFullError(f"Job queue full ({self.max_queue_size} pending).")
+        job = Job(request=request)
+        self.store.save(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.store.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelled.add(job_id)
+            task.cancel()
+        # Unconditional: the owning worker, here or in another process, sees it and drops its result
+        job.status = JobStatus.CANCELLED
+        job.finished_at = time.time()
+        self.store.save(job)
+        return job
+
+    def _finish(self, job: Job, status: JobStatus, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if not self.store.finish(job, self.owner):
+            current = self.store.get(job.id)
+            logger.warning(f"⚠️ Job {job.id} lease lost ({current.status.value if current else 'deleted'}): "
+                           f"{status.value} outcome dropped.")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.claim(job_id, self.owner)
+                # Cancelled while waiting in the queue, or claimed by another worker process
+                if job is None:
+                    continue
+
+                task = asyncio.create_task(self.runner(job.request))
+                self._running[job_id] = task
+                try:
+                    result = await task
+                    self._finish(job, JobStatus.SUCCEEDED, result=json.loads(json.dumps(result, default=str)))
+                    logger.info(f"✅ Job {job_id} completed.")
+                except asyncio.CancelledError:
+                    if job_id in self._cancelled:
+                        # Cancelled through cancel(): the store already says so
+                        self._cancelled.discard(job_id)
+                        continue
+                    raise
+                except Exception as e:
+                    logger.error(f"Job {job_id} failed: {e}")
+                    self._finish(job, JobStatus.FAILED, error=str(e))
+                finally:
+                    self._running.pop(job_id, None)
+            finally:
+                self._queue.task_done()
@@ -1,17 +1,92 @@
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embeddings import EmbeddingFunction, HashingTfidfEmbedder
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - FITYMI MEMORY - %(message)s")
 
 class MemoryNode:
     """Represents a discrete piece of knowledge in the GraphRAG Vector DB."""
-    def __init__(self, node_id: str, content: str, metadata: Dict[str, Any], embedding: Optional[List[float]] = None):
+    def __init__(self, node_id: str, content: str, metadata: Dict[str, Any], embedding: Optional[Sequence[float]] = None):
         self.node_id = node_id
         self.content = content
         self.metadata = metadata
         self.embedding = embedding
 
+class VectorIndex:
+    """
+    Local dense vector index: a contiguous float32 matrix (one L2-normalised row per node)
+    searched with a single matrix-vector product. Metadata fields used for pre-filtering
+    are dictionary-encoded into integer columns so filters are vectorized masks as well.
+    """
+
+    FILTER_FIELDS = ("brand", "target", "type")
+    _MISSING = -1
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        self.matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._codes = {f: np.full(initial_capacity, self._MISSING, dtype=np.int32) for f in self.FILTER_FIELDS}
+        self._vocab: Dict[str, Dict[Any, int]] = {f: {} for f in self.FILTER_FIELDS}
+
+    def _grow(self) -> None:
+        capacity = self.matrix.shape[0] * 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        self.matrix = matrix
+        for field, column in self._codes.items():
+            grown = np.full(capacity, self._MISSING, dtype=np.int32)
+            grown[:self.size] = column[:self.size]
+            self._codes[field] = grown
+
+    def add(self, vector: np.ndarray, metadata: Dict[str, Any]) -> int:
+        """Append a vector and return its row number."""
+        if self.size == self.matrix.shape[0]:
+            self._grow()
+        row = self.size
+        self.matrix[row] = vector
+        for field in self.FILTER_FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                self._codes[field][row] = self._vocab[field].setdefault(value, len(self._vocab[field]))
+        self.size += 1
+        return row
+
+    def _mask(self, filters: Dict[str, Any], optional_fields: Sequence[str]) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in filters.items():
+            if value is None:
+                continue
+            column = self._codes[field][:self.size]
+            code = self._vocab[field].get(value, -2)
+            matches = column == code
+            if field in optional_fields:
+                # Nodes without this field apply to every value (e.g. brand-wide facts for any target)
+                matches |= column == self._MISSING
+            mask &= matches
+        return mask
+
+    def search(self, query: np.ndarray, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+               optional_fields: Sequence[str] = ("target",)) -> List[Tuple[int, float]]:
+        """Cosine top-k over rows matching `filters`. Returns (row, score) pairs, best first."""
+        if self.size == 0 or k <= 0:
+            return []
+        candidates = np.flatnonzero(self._mask(filters or {}, optional_fields))
+        if candidates.size == 0:
+            return []
+        scores = self.matrix[candidates] @ query
+        if candidates.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(candidates.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
 class NexusMemoryCore:
     """
     Fitymi Phase 2: Dynamic RAG & Long-Term Brand Memory.
@@ -19,15 +94,50 @@ class NexusMemoryCore:
     to retrieve Tone of Voice, past high-converting angles, and explicit brand constraints dynamically.
     """
 
-    def __init__(self, db_provider: str = "chromadb"):
+    def __init__(self, db_provider: str = "chromadb", embedder: Optional[EmbeddingFunction] = None,
+                 embedding_dim: int = 512, storage_path: Optional[str] = None):
         self.db_provider = db_provider
+        # Pluggable local embedding function; the default works fully offline
+        self.embedder = embedder or HashingTfidfEmbedder(dim=embedding_dim)
         self.vector_store: List[MemoryNode] = []
+        self.index: Optional[VectorIndex] = None
+        self.storage_path = storage_path
+        # retrieve_context runs in worker threads while add_nodes may grow the index: the in-memory
+        # index rows and vector_store must only be read and mutated together (the persistent index locks itself)
+        self._lock = threading.Lock()
         logging.info(f"🧠 Initializing Nexus Memory Core with {self.db_provider} backend.")
+        if storage_path:
+            # Persistent mode: nodes live in an append-only log + memory-mapped matrix on disk
+            from memory_store import PersistentVectorIndex
+            self.index = PersistentVectorIndex(storage_path, dim=self.embedder(["dim probe"]).shape[1])
+            logging.info(f"💾 Brand memory mapped from {storage_path} ({self.index.size} nodes).")
+            if self.index.size:
+                return
         self._bootstrap_memory()
 
+    def add_nodes(self, nodes: List[MemoryNode]) -> None:
+        """Embed (in one batch) and index nodes. A precomputed `node.embedding` is used as-is."""
+        if not nodes:
+            return
+        to_embed = [n for n in nodes if n.embedding is None]
+        if to_embed:
+            vectors = self.embedder([n.content for n in to_embed])
+            for node, vector in zip(to_embed, vectors):
+                node.embedding = vector
+        if self.storage_path:
+            self.index.add_nodes(nodes, np.stack([np.asarray(n.embedding, dtype=np.float32) for n in nodes]))
+            return
+        with self._lock:
+            for node in nodes:
+                vector = np.asarray(node.embedding, dtype=np.float32)
+                if self.index is None:
+                    self.index = VectorIndex(dim=vector.shape[0])
+                self.index.add(vector, node.metadata)
+                self.vector_store.append(node)
+
     def _bootstrap_memory(self):
         """Populates the database with some initial enterprise brand knowledge."""
-        self.vector_store.extend([
+        self.add_nodes([
             MemoryNode(
                 node_id="tov_001",
                 content="Our brand voice is authoritative but empathetic. We do not use jargon unless necessary. We avoid words like '혁신적인' (innovative).",
@@ -45,22 +155,29 @@ class NexusMemoryCore:
             )
         ])
 
-    def retrieve_context(self, brand: str, target: str, query: str = "") -> str:
+    def search(self, query: str, k: int = 5, brand: Optional[str] = None, target: Optional[str] = None,
+               node_type: Optional[str] = None) -> List[Tuple[MemoryNode, float]]:
+        """Cosine top-k over nodes pre-filtered by brand, target (nodes without one match any) and type."""
+        if self.index is None:
+            return []
+        query_vector = self.embedder([query])[0]
+        filters = {"brand": brand, "target": target, "type": node_type}
+        if self.storage_path:
+            return self.index.search_nodes(query_vector, k=k, filters=filters)
+        with self._lock:
+            hits = self.index.search(query_vector, k=k, filters=filters)
+            return [(self.vector_store[row], score) for row, score in hits]
+
+    def retrieve_context(self, brand: str, target: str, query: str = "", k: int = 5) -> str:
         """
         Retrieves top-k relevant nodes from the Vector DB / GraphRAG based on semantic similarity to the query.
-        (Using a deterministic mock retrieval for this Phase 2 architectural test).
         """
         logging.info(f"🔍 Retrieving GraphRAG context for Brand: {brand} | Target: {target}")
         
-        # In a real implementation, we would embed the query and compute cosine similarity.
-        # Here we mock the semantic matching.
-        relevant_nodes = [
-            node for node in self.vector_store 
-            if node.metadata.get("brand") == brand
-        ]
+        relevant_nodes = self.search(f"{query} {target}".strip(), k=k, brand=brand, target=target)
         
         context_blocks = []
-        for node in relevant_nodes:
+        for node, _score in relevant_nodes:
             context_blocks.append(f"[{node.metadata['type'].upper()}]: {node.content}")
             
         compiled_context = "\n".join(context_blocks)
@@ -76,7 +193,7 @@ class NexusMemoryCore:
             content=f"Campaign {campaign_id} using '{angle_used}' achieved a success score of {success_score}/1.0.",
             metadata={"type": "historical_performance", "score": success_score}
         )
-        self.vector_store.append(new_node)
+        self.add_nodes([new_node])
         logging.info(f"📈 Memory Updated. Continuous learning reinforced with score: {success_score}")
         
 if __name__ == "__main__":
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: single-process locking only
+    fcntl = None
+
+from memory import MemoryNode, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _id_hash(node_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class PersistentVectorIndex(VectorIndex):
+    """
+    Disk-backed VectorIndex shared by every worker process.
+
+    Layout of `path/`:
+      CURRENT              name of the live generation directory
+      gen-NNNNN/
+        meta.json          embedding dimension
+        vocab.json         dictionary encoding of the filter fields
+        nodes.jsonl        append-only node log (content + metadata)
+        offsets.i64        byte offset of each node record (its size defines the committed row count)
+        ids.i64            node-id hashes, used to mask superseded rows until compaction
+        vectors.f32        row-major float32 embedding matrix
+        filters.i32        brand/target/type codes, one row per node
+
+    Startup only maps the files (O(1), nothing is read or re-embedded); pages are shared
+    read-only across processes through the OS page cache. Node records are read on demand
+    for search hits only, through a log handle kept open per mapped generation.
+    Compaction rewrites live rows into a new generation and flips CURRENT; the previous
+    generation is only deleted by the next compaction, and readers holding it keep their
+    maps and log handle, so rows found before another process compacted stay readable.
+    """
+
+    def __init__(self, path: str, dim: int, compaction_threshold: float = 0.3):
+        self.root = Path(path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.compaction_threshold = compaction_threshold
+        # _write_lock serialises writers in this process (the file lock covers other processes);
+        # _swap_lock guards the mapped arrays while they are searched or re-mapped
+        self._write_lock = threading.Lock()
+        self._swap_lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._generation: Optional[str] = None
+        self._live: Optional[np.ndarray] = None
+        self._log = None
+        self.size = 0
+        with self._file_lock():
+            if not (self.root / "CURRENT").exists():
+                self._init_generation("gen-00000")
+                self._write_current("gen-00000")
+        self.refresh()
+
+    # --- files -----------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self):
+        with self._write_lock:
+            with open(self.root / ".lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _init_generation(self, name: str) -> Path:
+        gen = self.root / name
+        gen.mkdir(parents=True, exist_ok=True)
+        (gen / "meta.json").write_text(json.dumps({"dim": self.dim}))
+        (gen / "vocab.json").write_text(json.dumps({f: {} for f in self.FILTER_FIELDS}))
+        for filename in ("nodes.jsonl", "offsets.i64", "ids.i64", "vectors.f32", "filters.i32"):
+            (gen / filename).touch()
+        return gen
+
+    def _write_current(self, name: str) -> None:
+        tmp = self.root / "CURRENT.tmp"
+        tmp.write_text(name)
+        os.replace(tmp, self.root / "CURRENT")
+
+    def _gen_dir(self) -> Path:
+        return self.root / self._generation
+
+    @staticmethod
+    def _map(path: Path, dtype, shape) -> np.ndarray:
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def refresh(self) -> None:
+        """Re-map the files if another process appended rows or compacted the store."""
+        generation = (self.root / "CURRENT").read_text().strip()
+        gen = self.root / generation
+        count = os.path.getsize(gen / "offsets.i64") // 8
+        if generation == self._generation and count == self.size:
+            return
+        with self._swap_lock:
+            meta = json.loads((gen / "meta.json").read_text())
+            if meta["dim"] != self.dim:
+                raise ValueError(f"Memory store at {self.root} holds {meta['dim']}-d embeddings, embedder produces {self.dim}-d.")
+            self._generation = generation
+            self.size = count
+            self.matrix = self._map(gen / "vectors.f32", np.float32, (count, self.dim))
+            self._offsets = self._map(gen / "offsets.i64", np.int64, (count,))
+            self._ids = self._map(gen / "ids.i64", np.int64, (count,))
+            filters = self._map(gen / "filters.i32", np.int32, (count, len(self.FILTER_FIELDS)))
+            self._codes = {f: filters[:, i] for i, f in enumerate(self.FILTER_FIELDS)}
+            self._vocab = json.loads((gen / "vocab.json").read_text())
+            self._live = None
+            if self._log is None or self._log.name != str(gen / "nodes.jsonl"):
+                # An open handle outlives the deletion of its generation directory
+                previous, self._log = self._log, open(gen / "nodes.jsonl", "rb")
+                if previous is not None:
+                    previous.close()
+
+    # --- writes ----------------------------------------------------------------
+
+    def add_nodes(self, nodes: List[MemoryNode], vectors: np.ndarray) -> List[int]:
+        """
+        Append nodes and their vectors and return their rows (valid until the next compaction);
+        a node id written again supersedes the older row.
+        """
+        with self._file_lock():
+            self.refresh()
+            first_row = self.size
+            gen = self._gen_dir()
+            # Drop bytes left behind by a writer that crashed before committing its offsets
+            for filename, row_bytes in (("vectors.f32", 4 * self.dim), ("filters.i32", 4 * len(self.FILTER_FIELDS)), ("ids.i64", 8)):
+                if os.path.getsize(gen / filename) != self.size * row_bytes:
+                    os.truncate(gen / filename, self.size * row_bytes)
+            vocab = json.loads((gen / "vocab.json").read_text())
+            vocab_changed = False
+            codes = np.full((len(nodes), len(self.FILTER_FIELDS)), self._MISSING, dtype=np.int32)
+            for row, node in enumerate(nodes):
+                for i, field in enumerate(self.FILTER_FIELDS):
+                    value = node.metadata.get(field)
+                    if value is None:
+                        continue
+                    key = str(value)
+                    if key not in vocab[field]:
+                        vocab[field][key] = len(vocab[field])
+                        vocab_changed = True
+                    codes[row, i] = vocab[field][key]
+            if vocab_changed:
+                tmp = gen / "vocab.json.tmp"
+                tmp.write_text(json.dumps(vocab))
+                os.replace(tmp, gen / "vocab.json")
+
+            offsets = []
+            with open(gen / "nodes.jsonl", "ab") as log:
+                for node in nodes:
+                    offsets.append(log.tell())
+                    record = {"node_id": node.node_id, "content": node.content, "metadata": node.metadata}
+                    log.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            with open(gen / "vectors.f32", "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(gen / "filters.i32", "ab") as f:
+                f.write(codes.tobytes())
+            with open(gen / "ids.i64", "ab") as f:
+                f.write(np.array([_id_hash(n.node_id) for n in nodes], dtype=np.int64).tobytes())
+            # Offsets are written last: their length is the committed row count
+            with open(gen / "offsets.i64", "ab") as f:
+                f.write(np.array(offsets, dtype=np.int64).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self.refresh()
+        self.maybe_compact()
+        return list(range(first_row, first_row + len(nodes)))
+
+    def add(self, vector: np.ndarray, metadata: Dict[str, Any]) -> int:
+        """VectorIndex.add: the row is persisted as a content-less node with a generated id."""
+        node = MemoryNode(f"vector_{uuid.uuid4().hex}", "", dict(metadata))
+        return self.add_nodes([node], np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+
+    # --- reads -----------------------------------------------------------------
+
+    def search(self, query: np.ndarray, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+               optional_fields: Sequence[str] = ("target",)) -> List[Tuple[int, float]]:
+        with self._swap_lock:
+            return super().search(query, k=k, filters=filters, optional_fields=optional_fields)
+
+    def _mask(self, filters: Dict[str, Any], optional_fields) -> np.ndarray:
+        # Vocabulary keys are stored as strings in vocab.json
+        mask = super()._mask({f: (str(v) if v is not None else None) for f, v in filters.items()}, optional_fields)
+        return mask & self.live_mask()
+
+    def live_mask(self) -> np.ndarray:
+        """Rows not superseded by a later write of the same node id."""
+        if self._live is None or self._live.shape[0] != self.size:
+            live = np.zeros(self.size, dtype=bool)
+            if self.size:
+                _, first_from_end = np.unique(self._ids[::-1], return_index=True)
+                live[self.size - 1 - first_from_end] = True
+            self._live = live
+        return self._live
+
+    def search_nodes(self, query: np.ndarray, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+                     optional_fields: Sequence[str] = ("target",)) -> List[Tuple[MemoryNode, float]]:
+        """Search and materialise the hits against one consistent generation."""
+        self.refresh()
+        with self._swap_lock:
+            hits = self.search(query, k=k, filters=filters, optional_fields=optional_fields)
+            return [(self.get_node(row), score) for row, score in hits]
+
+    def get_node(self, row: int) -> MemoryNode:
+        """Read one node record from the log (only search hits are ever materialised)."""
+        with self._swap_lock:
+            self._log.seek(int(self._offsets[row]))
+            record = json.loads(self._log.readline())
+        return MemoryNode(record["node_id"], record["content"], record["metadata"], embedding=self.matrix[row])
+
+    # --- compaction ------------------------------------------------------------
+
+    def dead_ratio(self) -> float:
+        return 0.0 if self.size == 0 else 1.0 - float(self.live_mask().sum()) / self.size
+
+    def compact(self) -> None:
+        """Rewrite live rows into a fresh generation and switch CURRENT to it atomically."""
+        with self._file_lock():
+            self.refresh()
+            live_rows = np.flatnonzero(self.live_mask())
+            old_gen = self._gen_dir()
+            number = int(self._generation.split("-")[1]) + 1
+            new_name = f"gen-{number:05d}"
+            new_gen = self._init_generation(new_name)
+            shutil.copy(old_gen / "vocab.json", new_gen / "vocab.json")
+
+            offsets = []
+            with open(old_gen / "nodes.jsonl", "rb") as src, open(new_gen / "nodes.jsonl", "wb") as dst:
+                for row in live_rows:
+                    src.seek(int(self._offsets[row]))
+                    offsets.append(dst.tell())
+                    dst.write(src.readline())
+            filters = np.stack([self._codes[f][live_rows] for f in self.FILTER_FIELDS], axis=1).astype(np.int32)
+            (new_gen / "vectors.f32").write_bytes(np.ascontiguousarray(self.matrix[live_rows], dtype=np.float32).tobytes())
+            (new_gen / "filters.i32").write_bytes(np.ascontiguousarray(filters).tobytes())
+            (new_gen / "ids.i64").write_bytes(np.ascontiguousarray(self._ids[live_rows]).tobytes())
+            (new_gen / "offsets.i64").write_bytes(np.array(offsets, dtype=np.int64).tobytes())
+
+            self._write_current(new_name)
+            self.refresh()
+            # The generation just replaced stays on disk for processes that read CURRENT before the
+            # switch; older ones can go (their readers still hold their maps and log handle)
+            for stale in self.root.glob("gen-*"):
+                if stale.name not in (new_name, old_gen.name):
+                    shutil.rmtree(stale, ignore_errors=True)
+            logger.info(f"🗜️ Memory store compacted: {len(live_rows)} live node(s) in {new_name}.")
+
+    def maybe_compact(self) -> None:
+        """Start a background compaction when enough rows have been superseded."""
+        if self.dead_ratio() < self.compaction_threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self._compact_safely, name="memory-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def _compact_safely(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Memory store compaction failed: {e}")
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from typing import AsyncIterator, Optional, Set
+
+from pydantic import BaseModel
+
+from accounting import estimate_tokens
+
+
+class MockProviderConfig(BaseModel):
+    """Latency, failure and size profile of the offline mock provider."""
+    latency_ms: float = 50.0
+    latency_sigma: float = 0.3     # lognormal spread around latency_ms (0 = fixed latency)
+    error_rate: float = 0.0
+    response_tokens: int = 120
+    tokens_per_second: float = 400.0  # decode speed used when streaming
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "MockProviderConfig":
+        """FITYMI_MOCK_LATENCY_MS, _LATENCY_SIGMA, _ERROR_RATE, _TOKENS, _TOKENS_PER_SECOND, _SEED."""
+        return cls(
+            latency_ms=float(os.getenv("FITYMI_MOCK_LATENCY_MS", "50")),
+            latency_sigma=float(os.getenv("FITYMI_MOCK_LATENCY_SIGMA", "0.3")),
+            error_rate=float(os.getenv("FITYMI_MOCK_ERROR_RATE", "0")),
+            response_tokens=int(os.getenv("FITYMI_MOCK_TOKENS", "120")),
+            tokens_per_second=float(os.getenv("FITYMI_MOCK_TOKENS_PER_SECOND", "400")),
+            seed=int(os.getenv("FITYMI_MOCK_SEED", "0")),
+        )
+
+
+class MockProviderError(Exception):
+    """Simulated provider outage; carries a 503 so the routing layer treats it as transient."""
+    status_code = 503
+
+
+_WORDS = (
+    "teams ship faster when security stops being a bottleneck. automated posture checks "
+    "catch drift before auditors do. your engineers reclaim twenty hours every week. "
+    "no agents to install and no dashboards to babysit. see the risk, fix the risk, prove it. "
+    "book a demo and watch your cloud posture improve in real time."
+).split()
+
+
+class MockLLM:
+    """
+    Deterministic stand-in for a provider SDK.
+    Response *content* depends only on (seed, prompt), so identical prompts give identical
+    answers; latency and failures are drawn from a seeded stream to model a realistic
+    distribution. Answers follow the formats the swarm parses (JSON scores, floats,
+    '===VAR===' variants, observer echoes), so the whole pipeline runs offline.
+    """
+
+    def __init__(self, config: Optional[MockProviderConfig] = None):
+        self.config = config or MockProviderConfig.from_env()
+        self._rng = random.Random(self.config.seed)
+        self.calls = 0
+        self._prefixes: Set[bytes] = set()
+
+    def cached_tokens(self, system_message: str) -> int:
+        """Simulated provider prompt cache: a system message seen before is served from cache."""
+        digest = hashlib.sha256(system_message.encode("utf-8")).digest()
+        if digest in self._prefixes:
+            return estimate_tokens(system_message)
+        self._prefixes.add(digest)
+        return 0
+
+    def _content_rng(self, system_message: str, user_message: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.config.seed}|{system_message}|{user_message}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "little"))
+
+    def _prose(self, rng: random.Random, tokens: int) -> str:
+        words = [rng.choice(_WORDS) for _ in range(max(5, tokens))]
+        sentences, i = [], 0
+        while i < len(words):
+            # Varied sentence lengths keep the AEO burstiness heuristics realistic
+            n = rng.randint(4, 18)
+            chunk = words[i:i + n]
+            sentences.append(" ".join(chunk).capitalize().rstrip(".") + ".")
+            i += n
+        return " ".join(sentences)
+
+    def render(self, system_message: str, user_message: str) -> str:
+        """Produce the templated answer for a prompt."""
+        rng = self._content_rng(system_message, user_message)
+        # The master framework reference is boilerplate, not the task; depending on the prompt
+        # layout it closes either the user or the system message
+        prompt = "\n".join(part.split("Master Framework Reference:")[0] for part in (system_message, user_message))
+        tokens = self.config.response_tokens
+
+        if "JSON array" in prompt and "[DRAFT " in prompt:
+            count = len(re.findall(r"\[DRAFT \d+\]", prompt))
+            return json.dumps([{"draft": i, "score": round(rng.uniform(0.4, 0.95), 3)} for i in range(count)])
+        if "JSON array" in prompt:
+            count = len(re.findall(r"\[GENOME \d+\]", prompt)) or 1
+            return json.dumps([{"genome": i, "overall_score": round(rng.uniform(0.3, 0.95), 3)} for i in range(count)])
+        if "JSON object" in prompt or "valid JSON" in prompt:
+            return json.dumps({
+                "emotional_impact": round(rng.uniform(0.3, 0.95), 3),
+                "clarity": round(rng.uniform(0.3, 0.95), 3),
+                "brand_alignment": round(rng.uniform(0.3, 0.95), 3),
+                "overall_score": round(rng.uniform(0.3, 0.95), 3),
+            })
+        if "single float" in prompt or "exact float" in prompt:
+            return f"{rng.uniform(0.4, 0.95):.2f}"
+        if "Collapse the wave function" in prompt:
+            states = re.findall(r"--- \[STATE \d+\] ---\n(.*?)(?=\n--- \[STATE|\nCollapse the wave function)", prompt, re.S)
+            if "number of the best state" in prompt:
+                return str(rng.randint(1, max(1, len(states))))
+            return rng.choice(states).strip() if states else self._prose(rng, tokens)
+        if "===VAR===" in prompt:
+            match = re.search(r"(?:Generate|exactly) (\d+)", prompt)
+            count = int(match.group(1)) if match else 3
+            return "\n===VAR===\n".join(self._prose(rng, tokens // max(1, count) + 10) for _ in range(count))
+        if "vulnerabilit" in prompt.lower() or "Attack" in prompt:
+            # Panel critics are asked to rate each flaw
+            rated = "[severity N]" in prompt
+            return "\n".join(f"{i}. {f'[severity {rng.randint(1, 5)}] ' if rated else ''}{self._prose(rng, 12)}" for i in range(1, 4))
+        return f"> **AEO Summary:** {self._prose(rng, 20)}\n\n{self._prose(rng, tokens)}"
+
+    def _sample_latency(self) -> float:
+        if self.config.latency_ms <= 0:
+            return 0.0
+        if self.config.latency_sigma <= 0:
+            return self.config.latency_ms / 1000
+        return self._rng.lognormvariate(0, self.config.latency_sigma) * self.config.latency_ms / 1000
+
+    async def complete(self, system_message: str, user_message: str) -> str:
+        self.calls += 1
+        latency = self._sample_latency()
+        fail = self._rng.random() < self.config.error_rate
+        await asyncio.sleep(latency)
+        if fail:
+            raise MockProviderError("Mock provider simulated 503")
+        return self.render(system_message, user_message)
+
+    async def stream(self, system_message: str, user_message: str) -> AsyncIterator[str]:
+        self.calls += 1
+        # Time to first token, then a steady decode rate
+        await asyncio.sleep(self._sample_latency())
+        if self._rng.random() < self.config.error_rate:
+            raise MockProviderError("Mock provider simulated 503")
+        words = self.render(system_message, user_message).split(" ")
+        delay = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(words):
+            if delay:
+                await asyncio.sleep(delay)
+            yield word if i == 0 else " " + word
+
+
+_mock: Optional[MockLLM] = None
+
+
+def get_mock_provider() -> MockLLM:
+    global _mock
+    if _mock is None:
+        _mock = MockLLM()
+    return _mock
+
+
+def configure_mock_provider(config: MockProviderConfig) -> MockLLM:
+    """Replace the process-wide mock with a new latency/error profile."""
+    global _mock
+    _mock = MockLLM(config)
+    return _mock
@@ -1,19 +1,25 @@
 import asyncio
 import logging
 import json
+import os
 from enum import Enum
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Callable
+from pydantic import BaseModel, Field, field_validator
 
 from agent import FitymiCopyAgent, FitymiPayload
+from cache import get_response_cache
 from memory import NexusMemoryCore
 from aeo_validator import AEOValidator
 from evaluator import AutonomousEvaluator
 
 from core.evolution import EvolutionEngine
 from core.adversarial import AdversarialArena
-from core.quantum import QuantumCopyState, WaveFunctionCollapse
-from core.neural_mesh import NeuralMeshNode
+from core.quantum import QuantumCopyState, QuantumStateGenerator, WaveFunctionCollapse
+from core.scheduler import DAGScheduler
+from tracing import get_tracer
+from accounting import UsageLedger, usage_scope
+from template_registry import DEFAULT_FRAMEWORK, validate_framework
+from checkpoints import CheckpointStore, WorkflowCheckpoint, checkpoint_store_from_env
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - FITYMI NEXUS - %(message)s")
 
@@ -29,6 +35,18 @@ class NexusContext(BaseModel):
     goal: str
     task_type: str
     constraints: Dict[str, Any]
+    # Per-request spend caps; when set, optional swarm work is trimmed to stay within them
+    token_budget: Optional[int] = Field(default=None, gt=0, description="Max prompt + completion tokens")
+    cost_budget_usd: Optional[float] = Field(default=None, gt=0, description="Max spend in USD (see accounting.MODEL_PRICING)")
+    # Reference framework for the strategist, copywriter and critic (see template_registry)
+    framework: str = DEFAULT_FRAMEWORK
+    # Runs sharing an id and the same brief resume from each other's checkpointed stages (see checkpoints.py)
+    workflow_id: Optional[str] = Field(default=None, min_length=1, max_length=200)
+
+    @field_validator("framework")
+    @classmethod
+    def _known_framework(cls, value: str) -> str:
+        return validate_framework(value)
 
 class FitymiNexus:
     """
@@ -40,12 +58,23 @@ class FitymiNexus:
     4. Quantum Collapse: Wave function collapse based on specific user contexts.
     """
 
-    def __init__(self, primary_provider: str = "openai", primary_model: str = "gpt-4o"):
+    # Share of the request budget that may be spent by the time each optional phase starts a step:
+    # evolution generations, arena rounds, then the quantum states (skipped entirely past its share)
+    BUDGET_SHARES = {"evolution": 0.5, "arena": 0.75, "states": 0.85}
+
+    def __init__(self, primary_provider: str = "openai", primary_model: str = "gpt-4o", speculative_states: bool = False,
+                 checkpoints: Optional[CheckpointStore] = None):
         self.primary_provider = primary_provider
         self.primary_model = primary_model
+        # Start generating quantum states from the evolved genome while the arena runs.
+        # The speculative states are used only if the arena leaves the copy untouched.
+        self.speculative_states = speculative_states
+        # Stage outputs of runs with a `workflow_id`, so a retry skips what already completed
+        self.checkpoints = checkpoints if checkpoints is not None else checkpoint_store_from_env()
         
         # 🧠 PHASE 2: LONG-TERM BRAND MEMORY (Vector DB / GraphRAG)
-        self.memory = NexusMemoryCore()
+        # Persisted and shared across workers when FITYMI_MEMORY_DIR is set
+        self.memory = NexusMemoryCore(storage_path=os.getenv("FITYMI_MEMORY_DIR"))
         
         # 🟢 DYNAMIC MoA ROUTING IMPLEMENTATION
         # Strategist needs high reasoning
@@ -53,18 +82,20 @@ class FitymiNexus:
         # Critic needs rigorous adherence to rules
         
         self.agents = {
-            AgentRole.STRATEGIST: FitymiCopyAgent(provider="google", model="gemini-1.5-pro"),
+            # Strategist output depends only on the brief: serve repeated briefs from cache
+            AgentRole.STRATEGIST: FitymiCopyAgent(provider="google", model="gemini-1.5-pro", cache=get_response_cache(), role="strategist"),
             AgentRole.COPYWRITER: FitymiCopyAgent(provider="google", model="gemini-1.5-flash"),
             AgentRole.CRITIC: FitymiCopyAgent(provider="google", model="gemini-1.5-pro"),
         }
 
 
-    async def _run_strategist(self, ctx: NexusContext) -> str:
+    async def _run_strategist(self, ctx: NexusContext, historical_context: Optional[str] = None) -> str:
         logging.info("🧠 Running Strategist Agent...")
         agent = self.agents[AgentRole.STRATEGIST]
         
-        # 🧠 Retrieve Long-Term Memory (RAG)
-        historical_context = self.memory.retrieve_context(brand=ctx.brand, target=ctx.target_audience)
+        # 🧠 Retrieve Long-Term Memory (RAG), unless the caller already did
+        if historical_context is None:
+            historical_context = self.memory.retrieve_context(brand=ctx.brand, target=ctx.target_audience, query=f"{ctx.product} {ctx.goal}")
         
         # Strategist focuses on the psychological angle
         prompt = f"""
@@ -89,7 +120,8 @@ class FitymiNexus:
             user_context=prompt,
             task_definition="Provide the psychological strategy for the copy.",
             verification_protocol="Ensure the strategy matches human-first and zero-hype principles.",
-            aeo_shielding="Output the strategy clearly without markdown code block formatting."
+            aeo_shielding="Output the strategy clearly without markdown code block formatting.",
+            framework=ctx.framework
         )
         
         response = await agent.execute(payload)
@@ -118,7 +150,8 @@ class FitymiNexus:
             user_context=prompt,
             task_definition=f"Write the {ctx.task_type}.",
             verification_protocol="Check word count and readability. No hype words.",
-            aeo_shielding="Output only the final copy formatted in professional markdown."
+            aeo_shielding="Output only the final copy formatted in professional markdown.",
+            framework=ctx.framework
         )
         
         response = await agent.execute(payload)
@@ -158,81 +191,199 @@ class FitymiNexus:
             user_context=prompt,
             task_definition="Review, critique, and provide the final polished copy.",
             verification_protocol="Ensure no AI-watermarks, correct burstiness, and absolute adherence to strategy.",
-            aeo_shielding="Provide the final output in Markdown format."
+            aeo_shielding="Provide the final output in Markdown format.",
+            framework=ctx.framework
         )
         
         response = await agent.execute(payload)
         return response.raw_output
 
-    async def execute_workflow(self, context: NexusContext) -> Dict[str, Any]:
+    def _build_state_generator(self) -> QuantumStateGenerator:
+        return QuantumStateGenerator()
+
+    async def _generate_states(self, state_generator: QuantumStateGenerator, copy: str) -> List[str]:
+        return await state_generator.generate(copy)
+
+    def _build_workflow(self, context: NexusContext, on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        ledger: Optional[UsageLedger] = None, checkpoint: Optional[WorkflowCheckpoint] = None) -> DAGScheduler:
         """
-        Executes the Cognitive Swarm Intelligent Pipeline.
+        Expresses the swarm pipeline as a dependency graph.
+        Node construction (clients, judge) and memory retrieval have no
+        upstream dependencies and overlap with the Strategist round-trip.
+        With a budgeted `ledger`, evolution and arena stop early and the quantum
+        states are skipped once their share of the budget is spent.
+        The LLM stages are checkpointed: with a `checkpoint` holding their output, they are
+        restored instead of re-run.
         """
-        logging.info(f"🚀 Starting Fitymi Swarm Intelligence for: {context.task_type}")
-        
+        dag = DAGScheduler(listener=on_event, checkpoint=checkpoint)
+        ledger = ledger or UsageLedger()
+
+        def states_affordable(stage: str, state_generator: QuantumStateGenerator) -> bool:
+            # One state call per tone plus the observer collapse
+            if ledger.gate(stage, self.BUDGET_SHARES["states"], calls_per_step=len(state_generator.tones) + 1)():
+                return True
+            logging.warning(f"💸 Budget: skipping {stage}, the copy collapses as is.")
+            return False
+
+        def emit(event: str, **data: Any) -> None:
+            if on_event is not None:
+                on_event({"event": event, "data": data})
+
+        # --- Independent warm-up branches ---
+        async def memory_stage(_):
+            return await asyncio.to_thread(
+                self.memory.retrieve_context, brand=context.brand, target=context.target_audience,
+                query=f"{context.product} {context.goal}"
+            )
+
+        dag.add_stage("memory", memory_stage)
+        dag.add_stage("evolution_setup", lambda _: asyncio.to_thread(EvolutionEngine))
+        dag.add_stage("arena_setup", lambda _: asyncio.to_thread(AdversarialArena))
+        dag.add_stage("states_setup", lambda _: asyncio.to_thread(self._build_state_generator))
+        dag.add_stage("collapse_setup", lambda _: asyncio.to_thread(WaveFunctionCollapse))
+        dag.add_stage("judge_setup", lambda _: asyncio.to_thread(AutonomousEvaluator))
+
         # Step 1: Strategist constructs the base angle
-        strategy = await self._run_strategist(context)
-        logging.info(f"✅ Strategy Output Generated.")
-        
+        async def strategist_stage(deps):
+            strategy = await self._run_strategist(context, historical_context=deps["memory"])
+            logging.info("✅ Strategy Output Generated.")
+            emit("stage_output", stage="strategist", output=strategy)
+            return strategy
+
+        dag.add_stage("strategist", strategist_stage, depends_on=["memory"], checkpoint=True)
+
         # Step 2: Seed Copy (Generation 0)
-        seed_copy = await self._run_copywriter(context, strategy)
-        logging.info(f"🌱 Generation 0 (Seed Copy) Created.")
-        
+        async def copywriter_stage(deps):
+            seed_copy = await self._run_copywriter(context, deps["strategist"])
+            logging.info("🌱 Generation 0 (Seed Copy) Created.")
+            emit("stage_output", stage="copywriter", output=seed_copy)
+            return seed_copy
+
+        dag.add_stage("copywriter", copywriter_stage, depends_on=["strategist"], checkpoint=True)
+
         # Step 3: Genetic Evolution
-        logging.info("🧬 Initiating Evolution Engine...")
-        evolution = EvolutionEngine()
-        task_ctx = f"Strategy: {strategy}\nConstraints: {json.dumps(context.constraints)}"
-        best_genome = await evolution.evolve(
-            seed_copy=seed_copy,
-            target_audience=context.target_audience,
-            task_context=task_ctx,
-            generations=3,
-            pop_size=3
-        )
-        logging.info("🌟 Evolution Complete: Top Genome Selected.")
-        
+        async def evolution_stage(deps):
+            logging.info("🧬 Initiating Evolution Engine...")
+            task_ctx = f"Strategy: {deps['strategist']}\nConstraints: {json.dumps(context.constraints)}"
+            engine = deps["evolution_setup"]
+            best_genome = await engine.evolve(
+                seed_copy=deps["copywriter"],
+                target_audience=context.target_audience,
+                task_context=task_ctx,
+                generations=3,
+                pop_size=3,
+                max_words=context.constraints.get("max_words"),
+                # A generation is one mutator and one selector call per island
+                should_continue=ledger.gate("evolution", self.BUDGET_SHARES["evolution"], calls_per_step=2 * engine.islands)
+            )
+            logging.info("🌟 Evolution Complete: Top Genome Selected.")
+            emit("stage_output", stage="evolution", output=best_genome.content)
+            return best_genome.content
+
+        dag.add_stage("evolution", evolution_stage, depends_on=["strategist", "copywriter", "evolution_setup"], checkpoint=True)
+
         # Step 4: Adversarial Co-Evolution
-        logging.info("⚔️ Entering Adversarial Arena...")
-        arena = AdversarialArena()
-        battle_ctx = f"Brand: {context.brand}. Target: {context.target_audience}. Goal: {context.goal}."
-        battle_tested_copy = await arena.battle_loop(
-            initial_copy=best_genome.content,
-            context=battle_ctx,
-            max_rounds=3
-        )
-        
-        # Step 5: Quantum Superposition & Collapse
-        logging.info("🌌 Preparing Quantum States...")
-        state_generator = NeuralMeshNode(
-            name="State Generator", provider="openai", model="gpt-4o",
-            role_prompt="Generate exactly 3 variations of this text: 1) Emotional, 2) Rational, 3) Urgent. Separate them ONLY with '===VAR==='."
-        )
-        raw_states = await state_generator.fire(battle_tested_copy, "Generate 3 states based on the copy.")
-        states = [s.strip() for s in raw_states.split("===VAR===") if len(s.strip()) > 10]
-        if not states:
-            states = [battle_tested_copy]
-            
-        quantum_state = QuantumCopyState(states=states)
-        
-        collapse_engine = WaveFunctionCollapse()
-        final_context = f"Goal constraints: {json.dumps(context.constraints)}. Audience: {context.target_audience}"
-        final_copy = await collapse_engine.observe(quantum_state, final_context)
-        
+        async def arena_stage(deps):
+            logging.info("⚔️ Entering Adversarial Arena...")
+            battle_ctx = f"Brand: {context.brand}. Target: {context.target_audience}. Goal: {context.goal}."
+            arena = deps["arena_setup"]
+            battle_tested_copy = await arena.battle_loop(
+                initial_copy=deps["evolution"],
+                context=battle_ctx,
+                # A round is one call per red-team critic plus the blue-team revision
+                should_continue=ledger.gate("arena", self.BUDGET_SHARES["arena"], calls_per_step=arena.red_team_size + 1)
+            )
+            emit("stage_output", stage="arena", output=battle_tested_copy)
+            return battle_tested_copy
+
+        dag.add_stage("arena", arena_stage, depends_on=["evolution", "arena_setup"], checkpoint=True)
+
+        # Step 5: Quantum Superposition, optionally speculated in parallel with the arena
+        if self.speculative_states:
+            async def speculative_states_stage(deps):
+                if not states_affordable("speculative_states", deps["states_setup"]):
+                    return [deps["evolution"]]
+                logging.info("🔮 Speculating Quantum States on the evolved genome...")
+                return await self._generate_states(deps["states_setup"], deps["evolution"])
+
+            dag.add_stage("speculative_states", speculative_states_stage, depends_on=["evolution", "states_setup"], checkpoint=True)
+
+        async def states_stage(deps):
+            battle_tested_copy = deps["arena"]
+            if "speculative_states" in deps and battle_tested_copy == deps["evolution"]:
+                logging.info("🔮 Arena kept the evolved copy: reusing speculative Quantum States.")
+                return deps["speculative_states"]
+            if not states_affordable("states", deps["states_setup"]):
+                return [battle_tested_copy]
+            logging.info("🌌 Preparing Quantum States...")
+            return await self._generate_states(deps["states_setup"], battle_tested_copy)
+
+        states_deps = ["arena", "evolution", "states_setup"]
+        if self.speculative_states:
+            states_deps.append("speculative_states")
+        dag.add_stage("states", states_stage, depends_on=states_deps, checkpoint=True)
+
+        async def collapse_stage(deps):
+            final_context = f"Goal constraints: {json.dumps(context.constraints)}. Audience: {context.target_audience}"
+            # Final-copy tokens are streamed to the listener as the observer decodes them
+            on_token = (lambda text: emit("token", text=text)) if on_event is not None else None
+            return await deps["collapse_setup"].observe(QuantumCopyState(states=deps["states"]), final_context, on_token=on_token)
+
+        dag.add_stage("collapse", collapse_stage, depends_on=["states", "collapse_setup"], checkpoint=True)
+
         # Optional Verification loop to ensure standard compliance
-        evaluator = AutonomousEvaluator()
-        score = await evaluator.evaluate_copy(final_copy, context.target_audience, context.goal)
-        
-        # Update long-term Brand Consciousness Memory
-        self.memory.update_learning("swarm_run_latest", score, "Swarm Evolved Angle")
-        
+        async def evaluator_stage(deps):
+            return await deps["judge_setup"].evaluate_copy(deps["collapse"], context.target_audience, context.goal)
+
+        dag.add_stage("evaluator", evaluator_stage, depends_on=["collapse", "judge_setup"])
+
+        return dag
+
+    async def execute_workflow(self, context: NexusContext, on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Executes the Cognitive Swarm Intelligent Pipeline as a DAG of concurrent stages.
+        `on_event` receives per-stage events and the final-copy tokens as they stream.
+        """
+        logging.info(f"🚀 Starting Fitymi Swarm Intelligence for: {context.task_type}")
+
+        ledger = UsageLedger(token_budget=context.token_budget, cost_budget_usd=context.cost_budget_usd)
+        checkpoint = None
+        if context.workflow_id and self.checkpoints is not None:
+            checkpoint = WorkflowCheckpoint(self.checkpoints, context.workflow_id, inputs=context.model_dump(
+                include={"brand", "target_audience", "product", "goal", "task_type", "constraints", "framework"}))
+            if checkpoint.completed:
+                logging.info(f"♻️ Resuming workflow {context.workflow_id}: {', '.join(checkpoint.completed)} already done")
+        dag = self._build_workflow(context, on_event=on_event, ledger=ledger, checkpoint=checkpoint)
+        # Root span of the run: every stage, node call and limiter wait below is its child.
+        # The ledger scope collects the token usage of every LLM call, per stage.
+        with get_tracer().span("workflow", brand=context.brand, task_type=context.task_type) as span, usage_scope(ledger):
+            results = await dag.run()
+        score = results["evaluator"]
+        if checkpoint is not None:
+            # The run completed: its checkpoints have served their purpose
+            checkpoint.clear()
+
+        # Update long-term Brand Consciousness Memory (off the loop: the persistent store locks and fsyncs)
+        await asyncio.to_thread(self.memory.update_learning, "swarm_run_latest", score, "Swarm Evolved Angle")
+
+        timings = dag.report()
+        logging.info(f"⏱️ Critical path: {' -> '.join(timings['critical_path'])} ({timings['critical_path_ms']:.0f}ms)")
+        usage = ledger.report()
+        logging.info(f"🪙 Usage: {usage['total']['total_tokens']} tokens, ${usage['total']['cost_usd']:.4f}")
+
         return {
-            "strategy": strategy,
-            "seed_copy": seed_copy,
-            "post_evolution": best_genome.content,
-            "post_adversarial": battle_tested_copy,
-            "final_copy": final_copy,
+            "strategy": results["strategist"],
+            "seed_copy": results["copywriter"],
+            "post_evolution": results["evolution"],
+            "post_adversarial": results["arena"],
+            "final_copy": results["collapse"],
             "final_score": score,
-            "quantum_states": states
+            "quantum_states": results["states"],
+            "timings": timings,
+            "usage": usage,
+            "trace_id": span.trace_id if span is not None else None,
+            "workflow_id": context.workflow_id,
+            "restored_stages": checkpoint.restored if checkpoint is not None else []
         }
 
 if __name__ == "__main__":
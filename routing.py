@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+Attempt = Callable[[], Awaitable[Any]]
+# Runs before a route's deadline and latency window: local waits (rate limiting) are not provider time
+Acquire = Callable[[str], Awaitable[None]]
+
+
+class RoutingPolicy(BaseModel):
+    """How a FitymiCopyAgent call is retried, hedged and failed over."""
+    deadline: Optional[float] = Field(default=60.0, description="Seconds allowed per provider attempt")
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 2.0
+    fallbacks: List[str] = Field(default_factory=list, description="'provider/model' routes tried in order")
+
+    @classmethod
+    def from_env(cls) -> "RoutingPolicy":
+        """FITYMI_CALL_DEADLINE, FITYMI_MAX_RETRIES, FITYMI_HEDGE, FITYMI_HEDGE_PERCENTILE, FITYMI_FALLBACKS."""
+        deadline = os.getenv("FITYMI_CALL_DEADLINE", "60")
+        return cls(
+            deadline=float(deadline) if deadline else None,
+            max_retries=int(os.getenv("FITYMI_MAX_RETRIES", "2")),
+            hedge=os.getenv("FITYMI_HEDGE", "0").lower() in ("1", "true", "yes"),
+            hedge_percentile=float(os.getenv("FITYMI_HEDGE_PERCENTILE", "0.95")),
+            fallbacks=[r.strip() for r in os.getenv("FITYMI_FALLBACKS", "").split(",") if r.strip()],
+        )
+
+
+class CircuitBreaker:
+    """
+    Per-route breaker: opens after `failure_threshold` consecutive failures, rejects calls
+    for `reset_timeout` seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot after an attempt that settled nothing (cancelled or non-transient)."""
+        self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to decide when to hedge."""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < 10:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+_state_lock = threading.Lock()
+
+
+def get_breaker(route: str) -> CircuitBreaker:
+    with _state_lock:
+        return _breakers.setdefault(route, CircuitBreaker())
+
+
+def get_latency_tracker(route: str) -> LatencyTracker:
+    with _state_lock:
+        return _latencies.setdefault(route, LatencyTracker())
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx are worth retrying; everything else is not."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    response = getattr(exc, "response", None) or getattr(exc, "raw_response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    name = type(exc).__name__
+    return any(marker in name for marker in (
+        "Timeout", "Connection", "RateLimit", "ServiceUnavailable", "InternalServerError",
+        "ResourceExhausted", "DeadlineExceeded",
+    ))
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderRouter:
+    """
+    Executes one logical LLM call over an ordered list of routes ('provider/model').
+    Each route gets a per-attempt deadline and jittered exponential-backoff retries on
+    transient errors; routes with an open circuit are skipped. With hedging enabled, a
+    backup request to the next route fires once the primary exceeds its latency percentile,
+    and the first successful answer wins. An optional `acquire` hook (the provider rate limiter)
+    runs before each attempt's deadline starts, so local queueing never times out an attempt,
+    trips a breaker or skews the latency percentiles.
+    """
+
+    def __init__(self, policy: RoutingPolicy):
+        self.policy = policy
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.policy.backoff_max, self.policy.backoff_base * (2 ** attempt)))
+        retry_after = _retry_after(exc)
+        return max(delay, min(retry_after, self.policy.backoff_max)) if retry_after else delay
+
+    async def _timed(self, route: str, attempt: Attempt, acquire: Optional[Acquire] = None) -> Any:
+        breaker = get_breaker(route)
+        try:
+            if acquire is not None:
+                await acquire(route)
+            start = time.perf_counter()
+            if self.policy.deadline:
+                result = await asyncio.wait_for(attempt(), timeout=self.policy.deadline)
+            else:
+                result = await attempt()
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if is_transient(e):
+                breaker.record_failure()
+            raise
+        finally:
+            # A probe that is cancelled or fails non-transiently must not keep the breaker half-open forever
+            breaker.release_probe()
+        breaker.record_success()
+        get_latency_tracker(route).record(time.perf_counter() - start)
+        return result
+
+    def _hedge_delay(self, route: str) -> float:
+        observed = get_latency_tracker(route).percentile(self.policy.hedge_percentile)
+        return max(self.policy.hedge_min_delay, observed) if observed is not None else self.policy.hedge_min_delay
+
+    async def _hedged(self, primary: str, backup: Optional[str], attempts: Dict[str, Attempt],
+                      acquire: Optional[Acquire] = None) -> Any:
+        primary_task = asyncio.ensure_future(self._timed(primary, attempts[primary], acquire))
+        if backup is None:
+            return await primary_task
+
+        done, _ = await asyncio.wait({primary_task}, timeout=self._hedge_delay(primary))
+        if done or not get_breaker(backup).allow():
+            return await primary_task
+
+        logger.warning(f"⏱️ {primary} slower than p{int(self.policy.hedge_percentile * 100)}: hedging on {backup}")
+        annotate(hedged=True)
+        backup_task = asyncio.ensure_future(self._timed(backup, attempts[backup], acquire))
+        pending = {primary_task, backup_task}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, routes: List[str], attempts: Dict[str, Attempt], acquire: Optional[Acquire] = None) -> Any:
+        """
+        Run the call over `routes` (primary first). `attempts[route]` performs one request;
+        `acquire(route)`, when given, is awaited before each attempt, outside its deadline.
+        """
+        last_error: Optional[BaseException] = None
+        retries = 0
+        for position, route in enumerate(routes):
+            if not get_breaker(route).allow():
+                logger.warning(f"🔌 Circuit open for {route}, skipping.")
+                continue
+            backup = None
+            if self.policy.hedge:
+                backup = next((r for r in routes[position + 1:] if get_breaker(r).state == "closed"), None)
+
+            for retry in range(self.policy.max_retries + 1):
+                try:
+                    result = await self._hedged(route, backup, attempts, acquire)
+                    annotate(retries=retries, route=route)
+                    return result
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if not is_transient(e) or retry == self.policy.max_retries:
+                        break
+                    retries += 1
+                    delay = self._backoff(retry, e)
+                    logger.warning(f"🔁 {route} transient error ({e!r}), retry {retry + 1}/{self.policy.max_retries} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    if not get_breaker(route).allow():
+                        break
+            if position + 1 < len(routes):
+                logger.warning(f"↪️ Falling back from {route} after: {last_error!r}")
+
+        annotate(retries=retries)
+        if last_error is None:
+            raise RuntimeError(f"No route available: circuits open for {routes}")
+        raise last_error
@@ -3,7 +3,10 @@ import asyncio
 import sys
 import json
 from pathlib import Path
+from typing import Dict, List, Optional
 from nexus import FitymiNexus, NexusContext
+from batch import BatchRunner, load_batch
+from core.neural_mesh import configure_provider_limit
 
 
 def read_brief_file(brief_path: str) -> str:
@@ -35,16 +38,67 @@ def read_brief_file(brief_path: str) -> str:
         return f.read()
 
 
+def parse_limits(values: Optional[List[str]], flag: str) -> Dict[str, int]:
+    """Parse repeated `provider=N` flags (e.g. --rpm openai=500 --rpm google=120)."""
+    limits = {}
+    for value in values or []:
+        provider, _, amount = value.partition("=")
+        if not provider or not amount.isdigit():
+            raise ValueError(f"Invalid {flag} value '{value}', expected provider=N")
+        limits[provider.strip().lower()] = int(amount)
+    return limits
+
+
+async def run_batch(args) -> None:
+    """Run every brief of --batch through one shared Nexus, streaming results to --output."""
+    rpm, tpm = parse_limits(args.rpm, "--rpm"), parse_limits(args.tpm, "--tpm")
+    for provider in set(rpm) | set(tpm):
+        # A dimension without a flag keeps the provider's configured limit
+        configure_provider_limit(provider, rpm.get(provider), tpm.get(provider))
+
+    defaults = {"brand": args.brand, "target_audience": args.audience, "product": args.product, "goal": args.goal}
+    if args.task:
+        defaults["task_type"] = args.task
+
+    print(f"🚀 Initializing Fitymi Nexus Swarm Intelligence (batch: {args.batch}, concurrency {args.concurrency})...")
+    runner = BatchRunner(FitymiNexus(), Path(args.output), concurrency=args.concurrency,
+                         resume=not args.no_resume, defaults=defaults)
+    stats = await runner.run(load_batch(Path(args.batch)))
+
+    print("\n" + "="*50)
+    print(f"📦 Batch completed: {stats['ok']} ok, {stats['error']} failed, {stats['skipped']} skipped")
+    print(f"📄 Results: {args.output}")
+    print("="*50 + "\n")
+    if stats["error"]:
+        sys.exit(1)
+
+
 async def main():
-    parser.add_argument("--task", type=str, required=True, help="Es: 'Landing Page B2B'")
+    parser = argparse.ArgumentParser(description="Fitymi Nexus CLI: single brief or batch mode")
+    parser.add_argument("--task", type=str, default=None, help="Es: 'Landing Page B2B' (required without --batch)")
     parser.add_argument("--brand", type=str, default="Unspecified Brand", help="Brand name")
     parser.add_argument("--audience", type=str, default="General Audience", help="Target audience")
     parser.add_argument("--product", type=str, default="Unspecified Product", help="Product being advertised")
     parser.add_argument("--goal", type=str, default="Conversion", help="Main goal of the copy")
     parser.add_argument("--brief", type=str, default=None, help="Brief content as a string")
     parser.add_argument("--brief_path", type=str, default=None, help="Path to a brief file (takes precedence over --brief)")
+    parser.add_argument("--batch", type=str, default=None, help="JSONL or CSV of briefs, or a directory of brief files")
+    parser.add_argument("--output", type=str, default="fitymi_batch_results.jsonl", help="JSONL file receiving batch results")
+    parser.add_argument("--concurrency", type=int, default=4, help="Workflows in flight in batch mode")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess every row instead of skipping completed ones")
+    parser.add_argument("--rpm", action="append", default=None, help="Per-provider requests/minute, e.g. openai=500 (repeatable)")
+    parser.add_argument("--tpm", action="append", default=None, help="Per-provider tokens/minute, e.g. openai=200000 (repeatable)")
     args = parser.parse_args()
 
+    if args.batch:
+        try:
+            await run_batch(args)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+    if not args.task:
+        parser.error("--task is required unless --batch is given")
     # Determine brief content
     brief_content = ""
     if args.brief_path:
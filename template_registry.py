@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The framework every agent falls back to when a payload names none
+DEFAULT_FRAMEWORK = "master_framework"
+
+# Markdown files at the repository root that are documentation, not frameworks
+_NOT_FRAMEWORKS = {"README.md"}
+
+
+class _Entry:
+    def __init__(self, path: Path):
+        self.path = path
+        self.content = ""
+        self.stamp: Optional[tuple] = None  # (mtime_ns, size) of the loaded content
+        self.checked_at = float("-inf")
+
+
+class TemplateRegistry:
+    """
+    In-memory store of the prompt frameworks (the *.md files at the repository root, named by
+    their lower-cased stem, e.g. `ad_copy_facebook`) and of the UI templates.
+    Files are read once; afterwards a lookup is a dict access, plus a `stat` at most every
+    `check_interval` seconds to pick up edits (mtime invalidation), so LLM calls never block
+    the event loop on disk reads.
+    """
+
+    def __init__(self, root: Optional[Path] = None, check_interval: float = 2.0):
+        self.root = Path(root) if root else Path(__file__).parent
+        self.check_interval = check_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._frameworks: List[str] = []
+        self._lock = threading.Lock()
+        self.discover()
+        self.register("dashboard", self.root / "templates" / "index.html")
+        for name in list(self._entries):
+            self.get(name)
+
+    @classmethod
+    def from_env(cls) -> "TemplateRegistry":
+        """FITYMI_TEMPLATE_DIR (default: the repository root) and FITYMI_TEMPLATE_CHECK_INTERVAL (seconds)."""
+        root = os.getenv("FITYMI_TEMPLATE_DIR")
+        return cls(root=Path(root) if root else None,
+                   check_interval=float(os.getenv("FITYMI_TEMPLATE_CHECK_INTERVAL", "2")))
+
+    def discover(self) -> List[str]:
+        """Register every framework markdown file under `root`; returns the framework names."""
+        for path in sorted(self.root.glob("*.md"), key=lambda p: p.name.lower()):
+            if path.name not in _NOT_FRAMEWORKS:
+                name = path.stem.lower()
+                self.register(name, path)
+                if name not in self._frameworks:
+                    self._frameworks.append(name)
+        logger.info(f"📚 Template registry: {len(self._frameworks)} framework(s) in {self.root}")
+        return list(self._frameworks)
+
+    def register(self, name: str, path: Path) -> None:
+        with self._lock:
+            self._entries[name] = _Entry(Path(path))
+
+    def frameworks(self) -> List[str]:
+        return list(self._frameworks)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def get(self, name: str) -> str:
+        """Content of template `name`, reloaded if the file changed. Unknown names raise KeyError."""
+        entry = self._entries[name]
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return entry.content
+        with self._lock:
+            if now - entry.checked_at >= self.check_interval:
+                self._refresh(name, entry)
+                entry.checked_at = now
+        return entry.content
+
+    def _refresh(self, name: str, entry: _Entry) -> None:
+        try:
+            stat = entry.path.stat()
+        except FileNotFoundError:
+            if entry.stamp is not None or entry.checked_at == float("-inf"):
+                logger.warning(f"Template '{name}' not found at {entry.path}, using empty content")
+            entry.content, entry.stamp = "", None
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != entry.stamp:
+            entry.content = entry.path.read_text(encoding="utf-8")
+            if entry.stamp is not None:
+                logger.info(f"🔄 Template '{name}' reloaded from {entry.path}")
+            entry.stamp = stamp
+
+
+def validate_framework(name: str) -> str:
+    """Pydantic validator helper: reject framework names the registry does not know."""
+    registry = get_template_registry()
+    if name not in registry.frameworks():
+        raise ValueError(f"Unknown framework '{name}'. Available frameworks: {registry.frameworks()}")
+    return name
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Returns the process-wide template registry, loading it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry.from_env()
+        return _registry
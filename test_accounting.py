@@ -0,0 +1,237 @@
+"""
+Unit tests for token/cost accounting and per-request budgets.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from accounting import TokenUsage, UsageLedger, record_usage, stage_scope, usage_scope
+from agent import FitymiCopyAgent, FitymiPayload
+from mock_provider import MockProviderConfig, configure_mock_provider
+from routing import RoutingPolicy
+
+
+def _payload() -> FitymiPayload:
+    return FitymiPayload(
+        system_prompt="System",
+        user_context="Brief",
+        task_definition="Task",
+        verification_protocol="Verify",
+        aeo_shielding="Shield",
+    )
+
+
+class TestUsageLedger:
+    """Tests for UsageLedger and BudgetGate."""
+
+    def test_pricing_uses_model_table(self):
+        """Test that cost is computed from the per-million-token prices."""
+        usage = TokenUsage(prompt_tokens=1_000_000, completion_tokens=1_000_000).price("gpt-4o")
+        assert usage.cost_usd == pytest.approx(12.5)
+        assert TokenUsage(prompt_tokens=10).price("unknown-model").cost_usd == 0.0
+
+    @pytest.mark.asyncio
+    async def test_usage_is_attributed_to_stage_and_run(self):
+        """Test that concurrent runs keep separate ledgers, split by stage."""
+        async def run(ledger, tokens):
+            with usage_scope(ledger):
+                with stage_scope("strategist"):
+                    await asyncio.sleep(0)
+                    record_usage(TokenUsage(prompt_tokens=tokens, completion_tokens=1, calls=1))
+                with stage_scope("arena"):
+                    record_usage(TokenUsage(prompt_tokens=tokens, completion_tokens=1, calls=1))
+
+        first, second = UsageLedger(), UsageLedger()
+        await asyncio.gather(run(first, 10), run(second, 100))
+        record_usage(TokenUsage(prompt_tokens=5, calls=1))  # outside any run: ignored
+
+        assert first.total.total_tokens == 22
+        assert second.report()["stages"]["arena"]["prompt_tokens"] == 100
+        assert second.total.calls == 2
+
+    def test_gate_stops_before_overshooting(self):
+        """Test that a step is refused when its expected cost would exceed the share."""
+        ledger = UsageLedger(token_budget=1000)
+        ledger.record(TokenUsage(prompt_tokens=100, calls=1))
+        gate = ledger.gate("arena", share=0.5, calls_per_step=2)
+
+        assert gate()  # 10% spent + 2 * 10% expected
+        ledger.record(TokenUsage(prompt_tokens=300, calls=2))
+        assert not gate()  # 40% spent + 30% for the step just observed > 50%
+        assert ledger.report()["degraded"] == ["arena: stopped after 1 step(s) at 40% of budget"]
+
+    def test_gate_without_budget_always_allows(self):
+        """Test that unbudgeted runs are never degraded."""
+        ledger = UsageLedger()
+        ledger.record(TokenUsage(prompt_tokens=10_000_000, calls=1))
+        assert ledger.gate("evolution", share=0.1)()
+        assert ledger.report()["degraded"] == []
+
+
+class TestAgentUsage:
+    """Tests for usage capture in FitymiCopyAgent."""
+
+    @pytest.mark.asyncio
+    async def test_reported_usage_is_captured_and_recorded(self):
+        """Test that provider usage lands in AgentResponse and the current ledger."""
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", routing=RoutingPolicy(max_retries=0))
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Copy"))],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30),
+        )
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(return_value=response)
+
+        ledger = UsageLedger()
+        with usage_scope(ledger), stage_scope("copywriter"):
+            result = await agent.execute(_payload())
+
+        assert (result.usage.prompt_tokens, result.usage.completion_tokens) == (120, 30)
+        assert not result.usage.estimated
+        assert result.usage.cost_usd == pytest.approx((120 * 2.5 + 30 * 10.0) / 1_000_000)
+        assert ledger.stages["copywriter"].total_tokens == 150
+
+    @pytest.mark.asyncio
+    async def test_missing_usage_is_estimated(self):
+        """Test that calls without usage metadata fall back to a flagged estimate."""
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", routing=RoutingPolicy(max_retries=0))
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Copy"))])
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(return_value=response)
+
+        result = await agent.execute(_payload())
+
+        assert result.usage.estimated
+        assert result.usage.prompt_tokens > 0
+
+
+    @pytest.mark.asyncio
+    async def test_failed_attempts_are_charged(self):
+        """Test that a failed retry reaches the ledger alongside the attempt that served the call."""
+        class ServiceUnavailable(Exception):
+            status_code = 503
+
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o",
+                                routing=RoutingPolicy(max_retries=1, backoff_base=0.001, backoff_max=0.01))
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Copy"))],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30),
+        )
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(side_effect=[ServiceUnavailable("503"), response])
+
+        ledger = UsageLedger()
+        with usage_scope(ledger), stage_scope("copywriter"):
+            result = await agent.execute(_payload())
+
+        charged = ledger.stages["copywriter"]
+        assert result.usage.calls == 1
+        assert charged.calls == 2
+        assert charged.estimated
+        assert charged.prompt_tokens > 120
+        assert charged.completion_tokens == 30
+
+
+class TestWorkflowBudget:
+    """Tests for budget-driven degradation of the Nexus workflow."""
+
+    @pytest.mark.asyncio
+    async def test_tight_budget_trims_optional_stages(self, monkeypatch):
+        """Test that a small token budget skips evolution, arena and quantum states but still scores."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        monkeypatch.delenv("FITYMI_MEMORY_DIR", raising=False)
+        configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+        from nexus import FitymiNexus, NexusContext
+
+        nexus = FitymiNexus()
+        context = NexusContext(brand="TechCorp", target_audience="CTOs", product="Scanner", goal="Demo",
+                               task_type="Landing", constraints={"max_words": 100}, token_budget=2000)
+        try:
+            result = await nexus.execute_workflow(context)
+        finally:
+            configure_mock_provider(MockProviderConfig())
+
+        usage = result["usage"]
+        assert result["final_copy"]
+        assert "evaluator" in usage["stages"]
+        assert "evolution" not in usage["stages"]
+        assert any(note.startswith("states:") for note in usage["degraded"])
+        assert usage["total"]["total_tokens"] <= 2000
+
+
+class TestPromptCaching:
+    """Tests for the cacheable prompt-prefix layout and cached-token accounting."""
+
+    def test_prefix_layout_keeps_static_layers_in_system(self):
+        """Test that the prefix layout sends only the brief as user message."""
+        agent = FitymiCopyAgent(provider="mock", model="mock", prompt_layout="prefix")
+        first_system, first_user = agent._build_full_prompt(_payload())
+        second_system, _ = agent._build_full_prompt(_payload().model_copy(update={"user_context": "Other brief"}))
+
+        assert first_user == "Brief"
+        assert first_system == second_system
+        assert first_system.startswith("System") and "Verify\nShield" in first_system
+
+    def test_unknown_layout_is_rejected(self):
+        """Test that an unsupported prompt layout raises ValueError."""
+        with pytest.raises(ValueError):
+            FitymiCopyAgent(provider="mock", model="mock", prompt_layout="suffix")
+
+    def test_cached_tokens_are_discounted(self):
+        """Test that cached prompt tokens are priced at the model family's cache rate."""
+        usage = TokenUsage(prompt_tokens=1_000_000, cached_tokens=800_000).price("claude-3-haiku-20240307")
+        assert usage.cost_usd == pytest.approx(0.2 * 0.25 + 0.8 * 0.25 * 0.1)
+        assert usage.summary()["cached_tokens"] == 800_000
+
+    @pytest.mark.asyncio
+    async def test_anthropic_prefix_is_marked_and_cache_reads_counted(self, monkeypatch):
+        """Test that the Anthropic system block carries cache_control and cache reads reach the usage."""
+        monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+        agent = FitymiCopyAgent(provider="anthropic", model="claude-3-haiku-20240307",
+                                routing=RoutingPolicy(max_retries=0), prompt_layout="prefix")
+        response = SimpleNamespace(
+            content=[SimpleNamespace(text="Copy")],
+            usage=SimpleNamespace(input_tokens=20, cache_read_input_tokens=900, cache_creation_input_tokens=0,
+                                  output_tokens=30),
+        )
+        agent._anthropic_client = MagicMock()
+        agent._anthropic_client.messages.create = AsyncMock(return_value=response)
+
+        result = await agent.execute(_payload())
+
+        system = agent._anthropic_client.messages.create.call_args.kwargs["system"]
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
+        assert (result.usage.prompt_tokens, result.usage.cached_tokens) == (920, 900)
+
+    @pytest.mark.asyncio
+    async def test_openai_cached_tokens_are_reported(self):
+        """Test that OpenAI prompt_tokens_details.cached_tokens is captured."""
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", routing=RoutingPolicy(max_retries=0))
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Copy"))],
+            usage=SimpleNamespace(prompt_tokens=2000, completion_tokens=10,
+                                  prompt_tokens_details=SimpleNamespace(cached_tokens=1024)),
+        )
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(return_value=response)
+
+        result = await agent.execute(_payload())
+
+        assert result.usage.cached_tokens == 1024
+        assert result.usage.cost_usd == pytest.approx((976 * 2.5 + 1024 * 1.25 + 10 * 10.0) / 1_000_000)
+
+    @pytest.mark.asyncio
+    async def test_mock_reports_repeated_prefix_as_cached(self):
+        """Test that the mock provider serves a repeated system prefix from its simulated cache."""
+        configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+        agent = FitymiCopyAgent(provider="mock", model="mock", routing=RoutingPolicy(max_retries=0), prompt_layout="prefix")
+        try:
+            first = await agent.execute(_payload())
+            second = await agent.execute(_payload().model_copy(update={"user_context": "Other brief"}))
+        finally:
+            configure_mock_provider(MockProviderConfig())
+
+        assert first.usage.cached_tokens == 0
+        assert 0 < second.usage.cached_tokens < second.usage.prompt_tokens
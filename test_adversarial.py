@@ -0,0 +1,87 @@
+"""
+Unit tests for the red-team panel of the AdversarialArena.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.adversarial import AdversarialArena, Flaw, merge_flaws, parse_flaws
+
+
+class TestFlawMerging:
+    """Tests for critique parsing and deduplication."""
+
+    def test_parse_severity_tags(self):
+        """Test that numbered lines are parsed with their severity, defaulting to 3."""
+        flaws = parse_flaws("Here you go:\n1. [severity 5] The claim about speed has no proof\n"
+                            "2) Headline is a generic cliché for the market", lens="logic")
+        assert [(f.severity, f.lenses) for f in flaws] == [(5, ["logic"]), (3, ["logic"])]
+        assert parse_flaws("No major flaws, ship it.") == []
+
+    def test_markers_inside_listed_flaws_do_not_clear_them(self):
+        """Test that "flawless" inside a flaw line keeps the flaw and prose critiques count as one flaw."""
+        flaws = parse_flaws("1. [severity 5] Claims a flawless onboarding with no proof at all")
+        assert [(f.severity, f.text) for f in flaws] == [(5, "Claims a flawless onboarding with no proof at all")]
+
+        prose = parse_flaws("The headline overpromises and the CTA is buried\nat the very end.", lens="clarity")
+        assert [(f.severity, f.lenses) for f in prose] == [(3, ["clarity"])]
+        assert prose[0].text == "The headline overpromises and the CTA is buried at the very end."
+
+    def test_similar_flaws_are_merged(self):
+        """Test that overlapping critiques from different lenses collapse into one, keeping the max severity."""
+        merged = merge_flaws([
+            Flaw(text="The call to action is vague and weak", severity=2, lenses=["clarity"]),
+            Flaw(text="Weak and vague call to action", severity=4, lenses=["audience"]),
+            Flaw(text="Uses the hype word revolutionary", severity=3, lenses=["hype"]),
+        ])
+        assert len(merged) == 2
+        assert merged[0].severity == 4
+        assert merged[0].lenses == ["audience", "clarity"]
+
+
+class TestRedTeamPanel:
+    """Tests for the concurrent red-team mode of battle_loop."""
+
+    @pytest.fixture
+    def arena(self, monkeypatch):
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        arena = AdversarialArena(red_team_size=3, min_severity=3)
+        arena.blue_team.fire = AsyncMock(return_value="A revised copy that resolves every attack.")
+        return arena
+
+    @pytest.mark.asyncio
+    async def test_panel_merges_into_one_revision(self, arena):
+        """Test that K critics run per round and the blue team receives one merged list."""
+        critiques = ["1. [severity 4] The call to action is vague and weak",
+                     "1. [severity 2] Weak and vague call to action",
+                     "1. [severity 3] Uses the hype word revolutionary"]
+        for node, critique in zip(arena.red_panel, critiques):
+            node.fire = AsyncMock(side_effect=[critique, "No major flaws"])
+
+        result = await arena.battle_loop("Initial copy for the arena test.", "CTOs")
+
+        assert result == "A revised copy that resolves every attack."
+        assert arena.blue_team.fire.await_count == 1
+        defend_prompt = arena.blue_team.fire.await_args.args[0]
+        assert defend_prompt.count("[severity") == 2
+        assert all(node.fire.await_count == 2 for node in arena.red_panel)
+
+    @pytest.mark.asyncio
+    async def test_low_severity_stops_early_and_failures_are_tolerated(self, arena):
+        """Test that minor merged flaws stop the loop and one failing critic does not."""
+        arena.red_panel[0].fire = AsyncMock(side_effect=RuntimeError("critic down"))
+        arena.red_panel[1].fire = AsyncMock(return_value="1. [severity 2] Slightly long second sentence here")
+        arena.red_panel[2].fire = AsyncMock(return_value="No major flaws")
+
+        result = await arena.battle_loop("Initial copy for the arena test.", "CTOs")
+
+        assert result == "Initial copy for the arena test."
+        arena.blue_team.fire.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_all_critics_failing_raises(self, arena):
+        """Test that the round fails when no critic answers."""
+        for node in arena.red_panel:
+            node.fire = AsyncMock(side_effect=RuntimeError("down"))
+        with pytest.raises(RuntimeError):
+            await arena.battle_loop("Initial copy for the arena test.", "CTOs")
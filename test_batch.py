@@ -0,0 +1,116 @@
+"""
+Unit tests for the batch runner of the CLI.
+"""
+import asyncio
+import json
+
+import pytest
+
+from batch import BatchRunner, build_context, completed_ids, load_batch
+
+
+class FakeNexus:
+    """Records contexts and tracks how many workflows run at once."""
+
+    def __init__(self, fail_products=()):
+        self.fail_products = set(fail_products)
+        self.contexts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def execute_workflow(self, context):
+        self.contexts.append(context)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if context.product in self.fail_products:
+                raise RuntimeError("provider down")
+            return {"final_copy": f"Copy for {context.product}", "final_score": 0.9, "usage": {}, "trace_id": "t"}
+        finally:
+            self.in_flight -= 1
+
+
+def _write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+
+class TestBatchSources:
+    """Tests for loading briefs and mapping them onto NexusContext."""
+
+    def test_csv_and_directory_sources(self, tmp_path):
+        """Test that CSV rows and brief files become batch items with stable ids."""
+        csv_path = tmp_path / "catalogue.csv"
+        csv_path.write_text("id,product,task,max_words\nsku-1,Shoes,Description,80\nsku-2,Bag,,\n", encoding="utf-8")
+        items = list(load_batch(csv_path))
+        assert [item.id for item in items] == ["sku-1", "sku-2"]
+        assert items[1].row == {"id": "sku-2", "product": "Bag"}
+
+        briefs = tmp_path / "briefs"
+        briefs.mkdir()
+        (briefs / "one.md").write_text("Brief one", encoding="utf-8")
+        (briefs / "ignored.json").write_text("{}", encoding="utf-8")
+        assert [item.id for item in load_batch(briefs)] == ["one.md"]
+
+    def test_row_mapping(self):
+        """Test aliases, defaults, brief text and extra columns merged into constraints."""
+        context = build_context({"audience": "CTOs", "task": "Ad", "brief": "Text", "max_words": "80"},
+                                defaults={"brand": "Acme", "target_audience": "All", "product": "P", "goal": "G"})
+        assert context.target_audience == "CTOs"
+        assert context.task_type == "Ad"
+        assert context.constraints["brief_content"] == "Text"
+        assert context.constraints["max_words"] == "80"
+
+
+class TestBatchRunner:
+    """Tests for BatchRunner."""
+
+    @pytest.mark.asyncio
+    async def test_results_stream_and_concurrency_is_bounded(self, tmp_path):
+        """Test that every row gets an output record and no more than `concurrency` run at once."""
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_jsonl(source, [{"id": str(i), "product": f"P{i}", "task": "Ad"} for i in range(6)])
+        nexus = FakeNexus(fail_products={"P3"})
+
+        stats = await BatchRunner(nexus, output, concurrency=2, defaults={"brand": "B", "target_audience": "A", "goal": "G"}).run(load_batch(source))
+
+        assert stats == {"ok": 5, "error": 1, "skipped": 0}
+        assert nexus.max_in_flight == 2
+        records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        assert sorted(r["id"] for r in records) == [str(i) for i in range(6)]
+        assert next(r for r in records if r["id"] == "3")["error"] == "provider down"
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_rows(self, tmp_path):
+        """Test that a rerun only processes rows that failed or never finished."""
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        rows = [{"id": str(i), "product": f"P{i}", "task": "Ad"} for i in range(3)]
+        _write_jsonl(source, rows)
+        defaults = {"brand": "B", "target_audience": "A", "goal": "G"}
+        await BatchRunner(FakeNexus(fail_products={"P1"}), output, defaults=defaults).run(load_batch(source))
+        with open(output, "a", encoding="utf-8") as f:
+            f.write('{"id": "2", "status": "o')  # crash mid-write
+
+        nexus = FakeNexus()
+        stats = await BatchRunner(nexus, output, defaults=defaults).run(load_batch(source))
+
+        assert stats == {"ok": 1, "error": 0, "skipped": 2}
+        assert [c.product for c in nexus.contexts] == ["P1"]
+        assert completed_ids(output) == {"0", "1", "2"}
+
+    @pytest.mark.asyncio
+    async def test_invalid_rows_are_recorded(self, tmp_path):
+        """Test that a row failing validation is written as an error without stopping the batch."""
+        output = tmp_path / "out.jsonl"
+        items = list(load_batch(_jsonl(tmp_path, [{"id": "x", "brand": "B"}])))
+
+        stats = await BatchRunner(FakeNexus(), output).run(items)
+
+        assert stats["error"] == 1
+        assert json.loads(output.read_text(encoding="utf-8"))["error"].startswith("Invalid brief")
+
+
+def _jsonl(tmp_path, rows):
+    path = tmp_path / "rows.jsonl"
+    _write_jsonl(path, rows)
+    return path
@@ -0,0 +1,125 @@
+"""
+Unit tests for the LLM response cache and its integration in FitymiCopyAgent.execute.
+"""
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from agent import FitymiCopyAgent, FitymiPayload
+from cache import MemoryResponseCache, SQLiteResponseCache, make_cache_key
+from routing import RoutingPolicy
+
+
+def _payload(text: str = "Brief") -> FitymiPayload:
+    return FitymiPayload(
+        system_prompt="System",
+        user_context=text,
+        task_definition="Task",
+        verification_protocol="Verify",
+        aeo_shielding="Shield",
+    )
+
+
+class TestCacheKey:
+    """Tests for the content address of a call."""
+
+    def test_key_is_stable_and_sensitive_to_params(self):
+        """Test that identical calls share a key and sampling params change it."""
+        a = make_cache_key("openai", "gpt-4o", "sys", "user", {"temperature": 0.7})
+        b = make_cache_key("openai", "gpt-4o", "sys", "user", {"temperature": 0.7})
+        c = make_cache_key("openai", "gpt-4o", "sys", "user", {"temperature": 0.0})
+
+        assert a == b
+        assert a != c
+
+
+class TestMemoryResponseCache:
+    """Tests for the in-memory LRU backend."""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = MemoryResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are treated as misses."""
+        cache = MemoryResponseCache(ttl=0.01)
+        cache.set("a", "1")
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+
+    def test_stats_per_role(self):
+        """Test that hits and misses are counted per role."""
+        cache = MemoryResponseCache()
+        cache.set("a", "1")
+        cache.get("a", role="judge")
+        cache.get("b", role="judge")
+        cache.get("b", role="selector")
+
+        stats = cache.stats()
+        assert stats["judge"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+        assert stats["selector"]["misses"] == 1
+
+
+class TestSQLiteResponseCache:
+    """Tests for the on-disk backend."""
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that entries survive reopening the database."""
+        path = str(tmp_path / "cache.sqlite3")
+        SQLiteResponseCache(path).set("a", "1")
+
+        assert SQLiteResponseCache(path).get("a") == "1"
+
+    def test_size_eviction(self, tmp_path):
+        """Test that the store never exceeds max_entries."""
+        cache = SQLiteResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+            time.sleep(0.001)
+
+        assert len(cache) == 2
+        assert cache.get("a") is None
+
+
+class TestAgentCaching:
+    """Tests for the cache layered under FitymiCopyAgent.execute."""
+
+    @pytest.mark.asyncio
+    async def test_second_identical_call_is_served_from_cache(self):
+        """Test that an identical payload hits the cache instead of the provider."""
+        cache = MemoryResponseCache()
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", cache=cache, role="judge")
+
+        with patch.object(agent, "_dispatch", new=AsyncMock(return_value="0.8")) as dispatch:
+            first = await agent.execute(_payload())
+            second = await agent.execute(_payload())
+            await agent.execute(_payload("Other brief"))
+
+        assert first.raw_output == second.raw_output == "0.8"
+        assert dispatch.await_count == 2
+        assert cache.stats()["judge"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_answer_is_not_cached_as_primary(self, monkeypatch):
+        """Test that an answer served by a fallback route is not stored under the primary route's key."""
+        monkeypatch.delenv("FITYMI_PROVIDER_OVERRIDE", raising=False)
+        cache = MemoryResponseCache()
+        policy = RoutingPolicy(max_retries=0, fallbacks=["openai/gpt-4o-mini"])
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", cache=cache, role="judge", routing=policy)
+        agent._route_agent("openai/gpt-4o-mini")._dispatch = AsyncMock(return_value="0.3")
+
+        with patch.object(agent, "_dispatch", new=AsyncMock(side_effect=[ValueError("bad request"), "0.8"])):
+            first = await agent.execute(_payload())
+            second = await agent.execute(_payload())
+
+        assert (first.raw_output, second.raw_output) == ("0.3", "0.8")
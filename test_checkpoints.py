@@ -0,0 +1,144 @@
+"""
+Unit tests for stage checkpointing and resumed workflows.
+"""
+import time
+
+import pytest
+
+from checkpoints import MemoryCheckpointStore, SQLiteCheckpointStore, WorkflowCheckpoint
+from core.scheduler import DAGScheduler
+from mock_provider import MockProviderConfig, configure_mock_provider
+
+
+class TestCheckpointStores:
+    """Tests for the checkpoint stores."""
+
+    def test_sqlite_roundtrip_and_clear(self, tmp_path):
+        """Test that stage outputs survive a new store instance and are removed by clear."""
+        path = str(tmp_path / "checkpoints.sqlite3")
+        SQLiteCheckpointStore(path).save("wf-1", "states", ["a", "b"])
+
+        store = SQLiteCheckpointStore(path)
+        assert store.load("wf-1") == {"states": ["a", "b"]}
+        store.clear("wf-1")
+        assert store.load("wf-1") == {}
+
+    def test_expired_checkpoints_are_ignored(self, monkeypatch):
+        """Test that checkpoints older than the TTL are not restored."""
+        store = MemoryCheckpointStore(ttl=60)
+        store.save("wf-1", "strategist", "Angle")
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 120)
+        assert store.load("wf-1") == {}
+
+
+class TestSchedulerCheckpoints:
+    """Tests for checkpoint restore in DAGScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_restored_stage_skips_work(self):
+        """Test that a checkpointed stage is restored and only the missing stages run."""
+        store = MemoryCheckpointStore()
+        store.save("wf", "draft", "saved draft")
+        calls = []
+
+        def stage(name, value):
+            async def run(deps):
+                calls.append(name)
+                return value(deps)
+            return run
+
+        events = []
+        dag = DAGScheduler(listener=events.append, checkpoint=WorkflowCheckpoint(store, "wf"))
+        dag.add_stage("brief", stage("brief", lambda deps: "brief"), checkpoint=True)
+        dag.add_stage("draft", stage("draft", lambda deps: "new draft"), depends_on=["brief"], checkpoint=True)
+        dag.add_stage("score", stage("score", lambda deps: len(deps["draft"])), depends_on=["draft"])
+
+        results = await dag.run()
+
+        assert results["score"] == len("saved draft")
+        assert "draft" not in calls
+        assert {"event": "stage_restored", "data": {"stage": "draft"}} in events
+        assert store.load("wf")["brief"] == "brief"
+        assert "score" not in store.load("wf")
+
+    def test_checkpoints_are_bound_to_their_inputs(self):
+        """Test that a run reusing a workflow id with a different brief restores nothing."""
+        store = MemoryCheckpointStore()
+        WorkflowCheckpoint(store, "wf", inputs={"brand": "TechCorp", "goal": "Demo"}).save("strategist", "Angle")
+
+        same = WorkflowCheckpoint(store, "wf", inputs={"goal": "Demo", "brand": "TechCorp"})
+        other = WorkflowCheckpoint(store, "wf", inputs={"brand": "OtherCorp", "goal": "Demo"})
+
+        assert same.restore("strategist") == (True, "Angle")
+        assert other.restore("strategist") == (False, None)
+        other.clear()
+        assert same.store.load(same.key) == {"strategist": "Angle"}
+
+
+class TestWorkflowResume:
+    """Tests for resuming FitymiNexus.execute_workflow."""
+
+    @pytest.mark.asyncio
+    async def test_failed_run_resumes_from_checkpoints(self, monkeypatch):
+        """Test that a retry after an evaluator failure only repeats the evaluator."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        monkeypatch.delenv("FITYMI_MEMORY_DIR", raising=False)
+        mock = configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+        from evaluator import AutonomousEvaluator
+        from nexus import FitymiNexus, NexusContext
+
+        original = AutonomousEvaluator.evaluate_copy
+
+        async def failing(self, *args, **kwargs):
+            raise RuntimeError("judge unavailable")
+
+        store = MemoryCheckpointStore()
+        nexus = FitymiNexus(checkpoints=store)
+        context = NexusContext(brand="TechCorp", target_audience="CTOs", product="Scanner", goal="Demo",
+                               task_type="Landing", constraints={"max_words": 100}, workflow_id="wf-retry")
+        try:
+            monkeypatch.setattr(AutonomousEvaluator, "evaluate_copy", failing)
+            with pytest.raises(RuntimeError):
+                await nexus.execute_workflow(context)
+            first_calls = mock.calls
+
+            monkeypatch.setattr(AutonomousEvaluator, "evaluate_copy", original)
+            result = await nexus.execute_workflow(context)
+        finally:
+            configure_mock_provider(MockProviderConfig())
+
+        assert "collapse" in result["restored_stages"]
+        assert result["final_copy"]
+        assert mock.calls - first_calls == 1  # only the judge
+        assert store.load("wf-retry") == {}
+
+    @pytest.mark.asyncio
+    async def test_same_id_with_new_brief_reruns(self, monkeypatch):
+        """Test that a failed run's checkpoints are not restored into a different brief with the same id."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        monkeypatch.delenv("FITYMI_MEMORY_DIR", raising=False)
+        configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+        from evaluator import AutonomousEvaluator
+        from nexus import FitymiNexus, NexusContext
+
+        original = AutonomousEvaluator.evaluate_copy
+
+        async def failing(self, *args, **kwargs):
+            raise RuntimeError("judge unavailable")
+
+        nexus = FitymiNexus(checkpoints=MemoryCheckpointStore())
+        first = NexusContext(brand="TechCorp", target_audience="CTOs", product="Scanner", goal="Demo",
+                             task_type="Landing", constraints={"max_words": 100}, workflow_id="wf-shared")
+        second = first.model_copy(update={"product": "Firewall"})
+        try:
+            monkeypatch.setattr(AutonomousEvaluator, "evaluate_copy", failing)
+            with pytest.raises(RuntimeError):
+                await nexus.execute_workflow(first)
+
+            monkeypatch.setattr(AutonomousEvaluator, "evaluate_copy", original)
+            result = await nexus.execute_workflow(second)
+        finally:
+            configure_mock_provider(MockProviderConfig())
+
+        assert result["restored_stages"] == []
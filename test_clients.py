@@ -0,0 +1,75 @@
+"""
+Unit tests for the process-wide ProviderClientRegistry.
+"""
+import asyncio
+from unittest.mock import patch, MagicMock
+
+from clients import PoolLimits, ProviderClientRegistry
+
+
+class TestProviderClientRegistry:
+    """Tests for client sharing and shutdown."""
+
+    @patch("openai.AsyncOpenAI")
+    def test_same_key_shares_one_client(self, mock_async_openai):
+        """Test that agents with the same credentials reuse a single client."""
+        mock_async_openai.side_effect = lambda **kwargs: MagicMock()
+        registry = ProviderClientRegistry(limits=PoolLimits())
+
+        first = registry.get_openai("key-a")
+        second = registry.get_openai("key-a")
+        other = registry.get_openai("key-b")
+
+        assert first is second
+        assert first is not other
+        assert mock_async_openai.call_count == 2
+
+    def test_limits_from_env(self, monkeypatch):
+        """Test that pool limits are configurable through the environment."""
+        monkeypatch.setenv("FITYMI_HTTP_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("FITYMI_HTTP_KEEPALIVE_EXPIRY", "2.5")
+
+        limits = PoolLimits.from_env()
+
+        assert limits.max_connections == 7
+        assert limits.keepalive_expiry == 2.5
+
+    @patch("openai.AsyncOpenAI")
+    def test_aclose_closes_pools_and_resets(self, mock_async_openai):
+        """Test that aclose drains the HTTP pools and forgets cached clients."""
+        mock_async_openai.side_effect = lambda **kwargs: MagicMock()
+        registry = ProviderClientRegistry(limits=PoolLimits())
+        first = registry.get_openai("key-a")
+        http_client = registry._http_clients[0]
+
+        asyncio.run(registry.aclose())
+
+        assert http_client.is_closed
+        assert registry.get_openai("key-a") is not first
+
+    @patch("google.generativeai.configure")
+    @patch("google.generativeai.GenerativeModel")
+    @patch("google.generativeai.caching.CachedContent.create")
+    def test_google_context_cache_for_long_prefixes(self, mock_create, mock_model, mock_configure):
+        """Test that only prefixes above the size threshold are uploaded as a Gemini context cache."""
+        mock_model.side_effect = lambda *args, **kwargs: MagicMock()
+        registry = ProviderClientRegistry(limits=PoolLimits(), gemini_cache_min_tokens=100)
+
+        short = registry.get_google_model("key", "gemini-1.5-flash", system_instruction="Role")
+        assert registry.get_google_model("key", "gemini-1.5-flash", system_instruction="Role") is short
+        mock_create.assert_not_called()
+
+        registry.get_google_model("key", "gemini-1.5-flash", system_instruction="x" * 1000)
+        assert mock_create.call_args.kwargs["model"] == "models/gemini-1.5-flash"
+        mock_model.from_cached_content.assert_called_once()
+
+    @patch("google.generativeai.configure")
+    @patch("google.generativeai.GenerativeModel")
+    @patch("google.generativeai.caching.CachedContent.create", side_effect=RuntimeError("too small"))
+    def test_google_context_cache_failure_falls_back(self, mock_create, mock_model, mock_configure):
+        """Test that a rejected context cache falls back to an inline system instruction."""
+        registry = ProviderClientRegistry(limits=PoolLimits(), gemini_cache_min_tokens=0)
+
+        registry.get_google_model("key", "gemini-1.5-pro", system_instruction="Prefix")
+
+        mock_model.assert_called_with("gemini-1.5-pro", system_instruction="Prefix")
@@ -0,0 +1,125 @@
+"""
+Unit tests for convergence detection in the evolution and arena loops.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.convergence import ConvergenceTracker, MinHasher, jaccard
+from core.evolution import CopyGenome, EvolutionEngine
+
+COPY = "Ship secure releases faster with automated scans that catch vulnerabilities before your customers do."
+
+
+class TestSimilarity:
+    """Tests for shingle similarity and MinHash."""
+
+    def test_minhash_estimates_jaccard(self):
+        """Test that MinHash similarity tracks the exact shingle Jaccard."""
+        edited = COPY.replace("customers", "users")
+        hasher = MinHasher(num_perm=128)
+        estimate = hasher.similarity(hasher.signature(COPY), hasher.signature(edited))
+        assert abs(estimate - jaccard(COPY, edited)) < 0.2
+        assert hasher.similarity(hasher.signature(COPY), hasher.signature("Totally unrelated words about gardening")) < 0.1
+
+
+class TestConvergenceTracker:
+    """Tests for ConvergenceTracker."""
+
+    def test_stable_text_converges(self):
+        """Test that a near-identical successive copy stops the loop."""
+        tracker = ConvergenceTracker(similarity_threshold=0.9)
+        assert not tracker.observe(text=COPY)
+        assert not tracker.observe(text="A completely rewritten headline that shares nothing with the seed.")
+        assert tracker.observe(text="A completely rewritten headline that shares nothing with the seed!")
+        assert tracker.reason.startswith("copy stable")
+
+    def test_score_plateau_respects_patience(self):
+        """Test that fitness gains below the minimum stop the loop only after `patience` steps."""
+        tracker = ConvergenceTracker(min_improvement=0.05, patience=2)
+        assert not tracker.observe(score=0.5)
+        assert not tracker.observe(score=0.7)
+        assert not tracker.observe(score=0.72)
+        assert tracker.observe(score=0.71)
+        assert tracker.reason.startswith("score plateau")
+
+    def test_regression_is_not_a_plateau(self):
+        """Test that a generation scoring clearly below the best does not stop the loop."""
+        tracker = ConvergenceTracker(min_improvement=0.01, patience=1)
+        assert not tracker.observe(score=0.8)
+        assert not tracker.observe(score=0.6)
+        assert tracker.observe(score=0.805)
+        assert tracker.reason.startswith("score plateau (best 0.800")
+
+    def test_disabled_tracker_never_stops(self):
+        """Test that FITYMI_CONVERGENCE=0 keeps the fixed round counts."""
+        tracker = ConvergenceTracker(enabled=False)
+        assert not any(tracker.observe(text=COPY, score=0.5) for _ in range(3))
+
+
+class TestLoopEarlyStopping:
+    """Tests for early stopping of evolve and battle_loop."""
+
+    @pytest.mark.asyncio
+    async def test_evolution_stops_on_plateau(self, monkeypatch):
+        """Test that evolve skips the remaining generations once the top fitness stops improving."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        engine = EvolutionEngine()
+        generation = iter(range(100))
+
+        async def mutate(seed, num_variants=3, task_context=""):
+            g = next(generation)
+            return [CopyGenome(id=f"g{g}_{i}", content=f"Variant {g} {i} " + " ".join(str(g * 10 + n) for n in range(12)))
+                    for i in range(num_variants)]
+
+        async def score(genomes, target_audience):
+            for genome in genomes:
+                genome.fitness_score = 0.8
+            return genomes
+
+        engine.mutate = AsyncMock(side_effect=mutate)
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+
+        await engine.evolve(COPY, "CTOs", generations=5, convergence=ConvergenceTracker(min_improvement=0.01))
+        assert engine.mutate.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_evolution_returns_best_genome_seen(self, monkeypatch):
+        """Test that a regressing last generation does not replace the best genome of the run."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        engine = EvolutionEngine()
+        generation = iter(range(100))
+        scores = iter([0.8, 0.6, 0.5])
+
+        async def mutate(seed, num_variants=3, task_context=""):
+            g = next(generation)
+            return [CopyGenome(id=f"g{g}", content=f"Variant {g} " + " ".join(str(g * 10 + n) for n in range(12)))]
+
+        async def score(genomes, target_audience):
+            fitness = next(scores)
+            for genome in genomes:
+                genome.fitness_score = fitness
+            return genomes
+
+        engine.mutate = AsyncMock(side_effect=mutate)
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+
+        best = await engine.evolve(COPY, "CTOs", generations=3, pop_size=1,
+                                   convergence=ConvergenceTracker(min_improvement=0.01))
+        assert engine.mutate.await_count == 3
+        assert (best.id, best.fitness_score) == ("g0", 0.8)
+
+    @pytest.mark.asyncio
+    async def test_arena_stops_when_revision_stops_changing(self, monkeypatch):
+        """Test that the arena ends once the Blue Team returns essentially the same copy."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        from core.adversarial import AdversarialArena
+
+        arena = AdversarialArena(red_team_size=1)
+        arena.red_team.fire = AsyncMock(return_value="1. Vague claim\n2. Weak call to action")
+        arena.blue_team.fire = AsyncMock(side_effect=[COPY, COPY + " Today."])
+
+        result = await arena.battle_loop("An initial draft with a vague claim and a weak call to action.", "CTOs",
+                                         max_rounds=3, convergence=ConvergenceTracker())
+        assert result == COPY + " Today."
+        assert arena.red_team.fire.await_count == 2
@@ -0,0 +1,79 @@
+"""
+Unit tests for the near-duplicate genome index of the EvolutionEngine.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.convergence import ConvergenceTracker
+from core.dedup import GenomeIndex
+from core.evolution import CopyGenome, EvolutionEngine
+from core.prefilter import GenomePrefilter
+
+COPY = ("Ship secure releases faster. Automated scans catch vulnerabilities before your customers ever notice them, "
+        "and every finding arrives with a suggested fix your team can merge in one click.")
+OTHER = "Security reviews take weeks. Ours take minutes, and they run on every single commit you push to production."
+
+
+class TestGenomeIndex:
+    """Tests for GenomeIndex."""
+
+    def test_lookup_finds_near_duplicates_only(self):
+        """Test that a recorded genome is found for a light edit but not for unrelated copy."""
+        index = GenomeIndex(threshold=0.8)
+        index.record([CopyGenome(id="scored", content=COPY, fitness_score=0.7)])
+
+        assert index.lookup(COPY.replace("one click", "one click!")).id == "scored"
+        assert index.lookup(OTHER) is None
+
+    def test_dedupe_carries_scores_and_collapses_twins(self):
+        """Test that known genomes reuse their score and twins within a generation collapse."""
+        index = GenomeIndex(threshold=0.8)
+        index.record([CopyGenome(id="scored", content=COPY, fitness_score=0.7)])
+
+        fresh, carried = index.dedupe([
+            CopyGenome(id="again", content=COPY + " Today."),
+            CopyGenome(id="new", content=OTHER),
+            CopyGenome(id="new-twin", content=OTHER.replace("production.", "production!")),
+        ])
+
+        assert [g.id for g in fresh] == ["new"]
+        assert [(g.id, g.fitness_score) for g in carried] == [("scored", 0.7)]
+
+    def test_threshold_zero_disables(self, monkeypatch):
+        """Test that FITYMI_GENOME_DEDUP_THRESHOLD=0 turns the index off."""
+        monkeypatch.setenv("FITYMI_GENOME_DEDUP_THRESHOLD", "0")
+        assert GenomeIndex.from_env() is None
+
+
+class TestDedupedEvolution:
+    """Tests for deduplication inside evolve."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_variants_are_not_rescored(self, monkeypatch):
+        """Test that a variant already scored in an earlier generation skips the selector."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        engine = EvolutionEngine(prefilter=GenomePrefilter(enabled=False))
+        engine.mutate = AsyncMock(side_effect=[
+            [CopyGenome(id="g1", content=COPY), CopyGenome(id="g1-twin", content=COPY + " Today.")],
+            [CopyGenome(id="g2", content=COPY.replace("one click", "one click!")), CopyGenome(id="g2-new", content=OTHER)],
+        ])
+        scored_batches = []
+
+        async def score(genomes, target_audience):
+            scored_batches.append([g.id for g in genomes])
+            for genome in genomes:
+                genome.fitness_score = 0.6
+            return genomes
+
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+        await engine.evolve("A seed that shares nothing with the variants at all.", "CTOs", generations=2,
+                            convergence=ConvergenceTracker(enabled=False))
+
+        assert scored_batches == [["g1"], ["g2-new"]]
+
+    def test_diversity_metric(self):
+        """Test that identical generations score 0 and disjoint ones close to 1."""
+        same = [CopyGenome(id=str(i), content=COPY) for i in range(3)]
+        assert EvolutionEngine.diversity(same) == 0.0
+        assert EvolutionEngine.diversity([CopyGenome(id="a", content=COPY), CopyGenome(id="b", content=OTHER)]) > 0.9
@@ -0,0 +1,108 @@
+"""
+Unit tests for the AutonomousEvaluator batch judge.
+"""
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from agent import AgentResponse
+from evaluator import AutonomousEvaluator, parse_score, parse_scores
+
+
+def _response(text):
+    return AgentResponse(raw_output=text)
+
+
+class TestScoreParsing:
+    """Tests for judge answer parsing."""
+
+    @pytest.mark.parametrize("answer, expected", [
+        ("0.72", 0.72), ("```\n0.8\n```", 0.8), ("Score: 72%", 0.72), ("I rate it 7/10.", 0.7),
+        ('{"score": 0.3}', 0.3), ("Across 3 personas: 0.65", 0.65), ("great copy", None), ("1.5", None),
+        ("On a scale of 0 to 1, I would give this 0.35", 0.35), ("Draft 1 scores 0.8", 0.8),
+        ("Between 0.0 and 1.0 this is a 0.6", 0.6), ("0.35 out of 1.0", 0.35), ("Score: 1", 1.0),
+    ])
+    def test_parse_score(self, answer, expected):
+        """Test that numbers, percentages, ratings and JSON are read and junk is rejected."""
+        assert parse_score(answer) == expected
+
+    def test_parse_scores_json_and_lines(self):
+        """Test that batch answers are read from JSON or from one line per draft, skipping bad items."""
+        assert parse_scores('[{"draft": 1, "score": 0.4}, {"draft": 0, "score": "n/a"}]', 2) == {1: 0.4}
+        assert parse_scores("DRAFT 0: 0.7\nDraft 1 - 80%\n5) 0.5", 3) == {0: 0.7, 1: 0.8}
+
+
+class TestEvaluateMany:
+    """Tests for AutonomousEvaluator.evaluate_many."""
+
+    @pytest.fixture
+    def judge(self, monkeypatch):
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        return AutonomousEvaluator(batch_size=3, samples=1)
+
+    @pytest.mark.asyncio
+    async def test_drafts_are_packed_per_request(self, judge):
+        """Test that drafts are scored batch_size at a time, in order."""
+        def answer(payload):
+            count = payload.user_context.count("[DRAFT ")
+            return _response(json.dumps([{"draft": i, "score": round(0.1 * (i + 1), 1)} for i in range(count)]))
+
+        judge.judge_agent.execute = AsyncMock(side_effect=answer)
+        scores = await judge.evaluate_many([f"Draft {i}" for i in range(5)], "CTOs", "Book a demo")
+
+        assert judge.judge_agent.execute.await_count == 2
+        assert scores == [0.1, 0.2, 0.3, 0.1, 0.2]
+
+    @pytest.mark.asyncio
+    async def test_only_unparsed_drafts_are_retried(self, judge):
+        """Test that the retry request contains only the drafts missing from the first answer."""
+        judge.judge_agent.execute = AsyncMock(side_effect=[
+            _response('[{"draft": 0, "score": 0.9}, {"draft": 1, "score": "?"}, {"draft": 2, "score": 0.3}]'),
+            _response('[{"draft": 0, "score": 0.6}]'),
+        ])
+
+        scores = await judge.evaluate_many(["Alpha copy", "Beta copy", "Gamma copy"], "CTOs", "Book a demo")
+
+        retry_prompt = judge.judge_agent.execute.await_args_list[1].args[0].user_context
+        assert "Beta copy" in retry_prompt and "Alpha copy" not in retry_prompt
+        assert scores == [0.9, 0.6, 0.3]
+
+    @pytest.mark.asyncio
+    async def test_retry_prompt_differs_from_unparsable_request(self, judge):
+        """Test that a fully unparsable chunk is retried with a distinct prompt (a new cache key)."""
+        def answer(payload):
+            if "could not be parsed" in payload.user_context:
+                return _response("[0.7, 0.2]")
+            return _response("Both drafts are decent, I guess.")
+
+        judge.judge_agent.execute = AsyncMock(side_effect=answer)
+
+        scores = await judge.evaluate_many(["Alpha copy", "Beta copy"], "CTOs", "Book a demo")
+
+        first, retry = (call.args[0].user_context for call in judge.judge_agent.execute.await_args_list)
+        assert first != retry
+        assert scores == [0.7, 0.2]
+
+    @pytest.mark.asyncio
+    async def test_self_consistency_averages_samples(self, judge):
+        """Test that N distinct samples run per chunk and are averaged; unscorable drafts are None."""
+        def answer(payload):
+            if "Alpha copy" not in payload.user_context:
+                return _response("no idea")  # the retry of the unscorable draft
+            return _response('[0.4, "x"]' if "#1 of 2" in payload.user_context else '[0.8, "x"]')
+
+        judge.judge_agent.execute = AsyncMock(side_effect=answer)
+
+        scores = await judge.evaluate_many(["Alpha copy", "Beta copy"], "CTOs", "Book a demo", samples=2)
+
+        prompts = {call.args[0].user_context for call in judge.judge_agent.execute.await_args_list}
+        assert judge.judge_agent.execute.await_count == 4
+        assert len(prompts) == 4
+        assert scores == [0.6, None]
+
+    @pytest.mark.asyncio
+    async def test_mock_provider_roundtrip(self, judge):
+        """Test that the offline mock answers batch judge requests."""
+        scores = await judge.evaluate_many([f"Draft number {i} of the copy." for i in range(4)], "CTOs", "Book a demo")
+        assert all(0.0 <= s <= 1.0 for s in scores)
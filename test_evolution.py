@@ -0,0 +1,143 @@
+"""
+Unit tests for EvolutionEngine fitness scoring and the island model.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.convergence import ConvergenceTracker
+from core.evolution import CopyGenome, EvolutionEngine
+
+
+def _genomes(n):
+    return [CopyGenome(id=f"g{i}", content=f"Variant number {i} of the copy.") for i in range(n)]
+
+
+class TestBatchedFitness:
+    """Tests for batched selector calls."""
+
+    @pytest.mark.asyncio
+    async def test_one_call_scores_every_genome(self):
+        """Test that a generation is graded with a single selector request."""
+        engine = EvolutionEngine()
+        engine.selector_node.fire = AsyncMock(return_value=
+            '```json\n[{"genome": 0, "overall_score": 0.2}, {"genome": 1, "overall_score": 0.9}, {"genome": 2, "overall_score": 0.5}]\n```'
+        )
+
+        ranked = await engine.evaluate_fitness(_genomes(3), "CTOs")
+
+        assert engine.selector_node.fire.await_count == 1
+        assert [g.id for g in ranked] == ["g1", "g2", "g0"]
+
+    @pytest.mark.asyncio
+    async def test_unparsed_items_fall_back_to_single_calls(self):
+        """Test that only genomes missing from the batch answer are re-scored individually."""
+        engine = EvolutionEngine()
+        engine.selector_node.fire = AsyncMock(side_effect=[
+            '[{"genome": 0, "overall_score": 0.7}, {"genome": 1, "overall_score": "n/a"}]',
+            '{"overall_score": 0.4}',
+        ])
+
+        ranked = await engine.evaluate_fitness(_genomes(2), "CTOs")
+
+        assert engine.selector_node.fire.await_count == 2
+        assert {g.id: g.fitness_score for g in ranked} == {"g0": 0.7, "g1": 0.4}
+
+    @pytest.mark.asyncio
+    async def test_per_genome_mode(self):
+        """Test that batch_scoring=False keeps one call per genome."""
+        engine = EvolutionEngine(batch_scoring=False)
+        engine.selector_node.fire = AsyncMock(return_value='{"overall_score": 0.6}')
+
+        await engine.evaluate_fitness(_genomes(3), "CTOs")
+
+        assert engine.selector_node.fire.await_count == 3
+
+
+class TestIslandModel:
+    """Tests for island-model evolution."""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        return EvolutionEngine(islands=3, migration_interval=1)
+
+    @pytest.mark.asyncio
+    async def test_islands_mutate_concurrently_with_their_own_mutators(self, engine):
+        """Test that every island mutates with its own node and temperature each generation."""
+        seen = []
+
+        async def mutate(seed, num_variants=3, task_context="", mutator=None):
+            seen.append((mutator.name, mutator.agent.temperature))
+            return [CopyGenome(id=f"{mutator.name}-{len(seen)}-{i}", content=f"{mutator.name} {len(seen)} {i} {seed[:20]}")
+                    for i in range(num_variants)]
+
+        async def score(genomes, target_audience):
+            for genome in genomes:
+                genome.fitness_score = 0.9 if "gemini" in genome.content else 0.1 * len(seen)
+            return sorted(genomes, key=lambda g: g.fitness_score, reverse=True)
+
+        engine.mutate = AsyncMock(side_effect=mutate)
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+
+        best = await engine.evolve("Seed copy for the islands.", "CTOs", generations=2,
+                                   convergence=ConvergenceTracker(enabled=False))
+
+        assert len(seen) == 6
+        assert len({name for name, _ in seen}) == 3
+        assert {temperature for _, temperature in seen} == {0.7, 1.0, 0.9}
+        assert best.fitness_score >= 0.9
+
+    @pytest.mark.asyncio
+    async def test_dormant_island_elite_does_not_stop_the_run(self, engine):
+        """Test that convergence follows the islands that ran, not an unchanged elite on a dormant one."""
+        calls = iter(range(100))
+        scores = iter([0.8, 0.5])
+
+        async def mutate(seed, num_variants=3, task_context="", mutator=None):
+            n = next(calls)
+            return [CopyGenome(id=f"v{n}", content=f"Variant {n} " + " ".join(str(n * 10 + i) for i in range(12)))]
+
+        async def score(genomes, target_audience):
+            fitness = next(scores)
+            for genome in genomes:
+                genome.fitness_score = fitness
+            return sorted(genomes, key=lambda g: g.fitness_score, reverse=True)
+
+        engine.mutate = AsyncMock(side_effect=mutate)
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+        engine.active_islands = lambda generation: [generation % 2]  # one island per generation
+        engine.migration_interval = 10
+        convergence = ConvergenceTracker()
+
+        best = await engine.evolve("Seed copy for the islands.", "CTOs", generations=2, pop_size=1,
+                                   convergence=convergence)
+
+        assert convergence.reason is None
+        assert (best.id, best.fitness_score) == ("v0", 0.8)
+
+    def test_ring_migration_replaces_the_weakest(self, engine):
+        """Test that each island's elite replaces the weakest survivor of the next island."""
+        populations = [[CopyGenome(id=f"i{i}-best", content="a", fitness_score=0.5 + i / 10),
+                        CopyGenome(id=f"i{i}-worst", content="b", fitness_score=0.1)] for i in range(3)]
+
+        engine.migrate(populations)
+
+        assert [[g.id for g in population] for population in populations] == [
+            ["i2-best", "i0-best"], ["i1-best", "i0-best"], ["i2-best", "i1-best"]]
+
+    def test_active_islands_follow_rate_limit_headroom(self, engine, monkeypatch):
+        """Test that a nearly exhausted provider runs fewer islands, rotating which ones."""
+        from core.neural_mesh import PROVIDER_LIMITERS, RateLimiter
+
+        limiter = RateLimiter(4, 60.0)  # mutators and selector share the mock provider: 2 requests per island
+        monkeypatch.setitem(PROVIDER_LIMITERS, "mock", limiter)
+        assert engine.active_islands(0) == [0, 1]
+        assert engine.active_islands(1) == [1, 2]
+
+        limiter.tokens = 0
+        assert engine.active_islands(2) == [2]
+
+        limiter.tokens = 30
+        limiter.capacity = 30
+        assert engine.active_islands(0) == [0, 1, 2]
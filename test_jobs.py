@@ -0,0 +1,238 @@
+"""
+Unit tests for the asynchronous JobManager and job stores.
+"""
+import asyncio
+import time
+
+import pytest
+
+from jobs import Job, JobManager, JobStatus, QueueFullError, SQLiteJobStore
+
+
+async def _wait_for(manager, job_id, statuses, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = manager.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"Job {job_id} stuck in {manager.get(job_id).status}")
+
+
+async def _wait_until_idle(manager, job_id, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while job_id in manager._running:
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError(f"Job {job_id} still running")
+        await asyncio.sleep(0.005)
+
+
+class TestJobManager:
+    """Tests for queueing, backpressure and cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_job_runs_to_completion(self):
+        """Test that a submitted job is executed and its result stored."""
+        async def runner(request):
+            return {"echo": request["brand"]}
+
+        manager = JobManager(runner, num_workers=1)
+        await manager.start()
+        try:
+            job = manager.submit({"brand": "Acme"})
+            done = await _wait_for(manager, job.id, {JobStatus.SUCCEEDED})
+        finally:
+            await manager.stop()
+
+        assert done.result == {"echo": "Acme"}
+        assert done.started_at is not None
+
+    @pytest.mark.asyncio
+    async def test_full_queue_raises(self):
+        """Test that submissions beyond the queue capacity are rejected."""
+        gate = asyncio.Event()
+
+        async def runner(request):
+            await gate.wait()
+            return {}
+
+        manager = JobManager(runner, max_queue_size=1, num_workers=1)
+        await manager.start()
+        try:
+            first = manager.submit({})
+            await _wait_for(manager, first.id, {JobStatus.RUNNING})
+            manager.submit({})
+            with pytest.raises(QueueFullError):
+                manager.submit({})
+        finally:
+            gate.set()
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self):
+        """Test that cancelling a running job stops it and keeps the worker alive."""
+        async def runner(request):
+            if request.get("slow"):
+                await asyncio.sleep(10)
+            return {"ok": True}
+
+        manager = JobManager(runner, num_workers=1)
+        await manager.start()
+        try:
+            slow = manager.submit({"slow": True})
+            await _wait_for(manager, slow.id, {JobStatus.RUNNING})
+            cancelled = manager.cancel(slow.id)
+            fast = manager.submit({})
+            done = await _wait_for(manager, fast.id, {JobStatus.SUCCEEDED})
+        finally:
+            await manager.stop()
+
+        assert cancelled.status == JobStatus.CANCELLED
+        assert manager.get(slow.id).status == JobStatus.CANCELLED
+        assert done.result == {"ok": True}
+
+    @pytest.mark.asyncio
+    async def test_failure_is_recorded(self):
+        """Test that runner exceptions mark the job as failed."""
+        async def runner(request):
+            raise RuntimeError("provider down")
+
+        manager = JobManager(runner, num_workers=1)
+        await manager.start()
+        try:
+            job = manager.submit({})
+            failed = await _wait_for(manager, job.id, {JobStatus.FAILED})
+        finally:
+            await manager.stop()
+
+        assert "provider down" in failed.error
+
+
+class TestJobLeases:
+    """Tests for job ownership across worker processes sharing a store."""
+
+    @pytest.mark.asyncio
+    async def test_start_keeps_live_jobs_of_other_workers(self, tmp_path):
+        """Test that a starting worker neither fails another worker's running job nor reruns it."""
+        path = str(tmp_path / "jobs.sqlite3")
+        gate = asyncio.Event()
+        runs = []
+
+        async def runner(request):
+            runs.append(request)
+            await gate.wait()
+            return {"ok": True}
+
+        first = JobManager(runner, store=SQLiteJobStore(path), num_workers=1, lease_seconds=0.3)
+        second = JobManager(runner, store=SQLiteJobStore(path), num_workers=1, lease_seconds=0.3)
+        await first.start()
+        try:
+            job = first.submit({})
+            await _wait_for(first, job.id, {JobStatus.RUNNING})
+            await second.start()
+            await asyncio.sleep(0.5)  # longer than the lease: only heartbeats keep the job alive
+            assert second.get(job.id).status == JobStatus.RUNNING
+            gate.set()
+            done = await _wait_for(first, job.id, {JobStatus.SUCCEEDED})
+        finally:
+            gate.set()
+            await first.stop()
+            await second.stop()
+
+        assert done.owner == first.owner
+        assert len(runs) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_failed(self, tmp_path):
+        """Test that a running job whose worker stopped renewing its lease is failed on start."""
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+        stale = Job(request={}, status=JobStatus.RUNNING, owner="dead-worker", heartbeat_at=time.time() - 120)
+        store.save(stale)
+
+        async def runner(request):
+            return {}
+
+        manager = JobManager(runner, store=store, num_workers=1, lease_seconds=60)
+        await manager.start()
+        await manager.stop()
+
+        assert store.get(stale.id).status == JobStatus.FAILED
+        assert "dead-worker" in store.get(stale.id).error
+
+    @pytest.mark.asyncio
+    async def test_expired_job_is_not_overwritten_on_finish(self, tmp_path):
+        """Test that a worker whose lease was expired by another process drops its late result."""
+        path = str(tmp_path / "jobs.sqlite3")
+        gate = asyncio.Event()
+
+        async def runner(request):
+            await gate.wait()
+            return {"ok": True}
+
+        manager = JobManager(runner, store=SQLiteJobStore(path), num_workers=1, lease_seconds=60)
+        await manager.start()
+        try:
+            job = manager.submit({})
+            await _wait_for(manager, job.id, {JobStatus.RUNNING})
+            SQLiteJobStore(path).expire(time.time() + 1)  # another worker sees the lease as lapsed
+            gate.set()
+            await _wait_until_idle(manager, job.id)
+        finally:
+            gate.set()
+            await manager.stop()
+
+        stored = SQLiteJobStore(path).get(job.id)
+        assert stored.status == JobStatus.FAILED
+        assert stored.result is None
+
+    @pytest.mark.asyncio
+    async def test_cancel_from_another_worker_is_kept(self, tmp_path):
+        """Test that a job cancelled through another process is not overwritten by its owner's result."""
+        path = str(tmp_path / "jobs.sqlite3")
+        gate = asyncio.Event()
+
+        async def runner(request):
+            await gate.wait()
+            return {"ok": True}
+
+        owner = JobManager(runner, store=SQLiteJobStore(path), num_workers=1, lease_seconds=60)
+        other = JobManager(runner, store=SQLiteJobStore(path), num_workers=1, lease_seconds=60)
+        await owner.start()
+        await other.start()
+        try:
+            job = owner.submit({})
+            await _wait_for(owner, job.id, {JobStatus.RUNNING})
+            assert other.cancel(job.id).status == JobStatus.CANCELLED
+            gate.set()
+            await _wait_until_idle(owner, job.id)
+        finally:
+            gate.set()
+            await owner.stop()
+            await other.stop()
+
+        assert SQLiteJobStore(path).get(job.id).status == JobStatus.CANCELLED
+
+
+class TestSQLiteJobStore:
+    """Tests for the default persistent store."""
+
+    def test_claim_is_exclusive_across_connections(self, tmp_path):
+        """Test that a queued job is claimed by exactly one of two processes sharing the database."""
+        path = str(tmp_path / "jobs.sqlite3")
+        job = Job(request={})
+        SQLiteJobStore(path).save(job)
+
+        claimed = SQLiteJobStore(path).claim(job.id, "worker-a")
+        assert claimed.status == JobStatus.RUNNING
+        assert SQLiteJobStore(path).claim(job.id, "worker-b") is None
+        assert SQLiteJobStore(path).get(job.id).owner == "worker-a"
+
+    def test_roundtrip_and_status_listing(self, tmp_path):
+        """Test that jobs survive reopening the store and can be listed by status."""
+        path = str(tmp_path / "jobs.sqlite3")
+        job = Job(request={"brand": "Acme"})
+        SQLiteJobStore(path).save(job)
+
+        store = SQLiteJobStore(path)
+        assert store.get(job.id).request == {"brand": "Acme"}
+        assert [j.id for j in store.list_by_status(JobStatus.QUEUED)] == [job.id]
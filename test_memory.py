@@ -0,0 +1,101 @@
+"""
+Unit tests for the local vector index behind NexusMemoryCore.
+"""
+import threading
+
+import numpy as np
+
+from embeddings import HashingTfidfEmbedder
+from memory import MemoryNode, NexusMemoryCore, VectorIndex
+
+
+class TestHashingTfidfEmbedder:
+    """Tests for the offline embedding function."""
+
+    def test_rows_are_normalised_float32(self):
+        """Test that embeddings are unit-length float32 rows."""
+        vectors = HashingTfidfEmbedder(dim=64)(["loss aversion angle", "brand voice"])
+
+        assert vectors.dtype == np.float32
+        assert vectors.shape == (2, 64)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+    def test_similar_texts_score_higher(self):
+        """Test that overlapping vocabulary yields higher cosine similarity."""
+        embed = HashingTfidfEmbedder(dim=256)
+        query, near, far = embed(["security posture management", "automated security posture", "holiday recipes"])
+
+        assert query @ near > query @ far
+
+
+class TestVectorIndex:
+    """Tests for cosine top-k with metadata pre-filtering."""
+
+    def test_filters_and_ranking(self):
+        """Test that filters restrict candidates and results are sorted by score."""
+        index = VectorIndex(dim=2, initial_capacity=1)
+        index.add(np.array([1.0, 0.0], dtype=np.float32), {"brand": "A", "type": "tone_of_voice"})
+        index.add(np.array([0.6, 0.8], dtype=np.float32), {"brand": "A", "target": "CTOs", "type": "historical_performance"})
+        index.add(np.array([1.0, 0.0], dtype=np.float32), {"brand": "B", "type": "tone_of_voice"})
+        index.add(np.array([0.0, 1.0], dtype=np.float32), {"brand": "A", "target": "CMOs", "type": "historical_performance"})
+
+        hits = index.search(np.array([0.0, 1.0], dtype=np.float32), k=5, filters={"brand": "A", "target": "CTOs"})
+
+        assert [row for row, _ in hits] == [1, 0]
+        assert index.search(np.array([1.0, 0.0], dtype=np.float32), k=5, filters={"brand": "Z"}) == []
+
+
+class TestNexusMemoryCore:
+    """Tests for retrieval through the memory core."""
+
+    def test_retrieve_context_respects_brand_and_k(self):
+        """Test that only the requested brand is retrieved, most relevant first, capped at k."""
+        memory = NexusMemoryCore()
+        memory.add_nodes([
+            MemoryNode("other", "Other brand voice guidelines.", {"type": "tone_of_voice", "brand": "Other"}),
+        ])
+
+        context = memory.retrieve_context(brand="TechCorp", target="CTOs", query="security posture hours saved", k=1)
+
+        assert context.startswith("[PRODUCT_KNOWLEDGE]")
+        assert "Other brand" not in context
+        assert len(context.splitlines()) == 1
+
+    def test_precomputed_embedding_is_used(self):
+        """Test that MemoryNode.embedding, when provided, is indexed without re-embedding."""
+        memory = NexusMemoryCore(embedding_dim=8)
+        vector = np.eye(8, dtype=np.float32)[0]
+        memory.add_nodes([MemoryNode("pre", "x", {"type": "note", "brand": "Pre"}, embedding=vector)])
+
+        hits = memory.search("anything", brand="Pre")
+
+        assert hits[0][0].node_id == "pre"
+
+    def test_search_while_adding_from_another_thread(self):
+        """Test that a search in a worker thread never sees an index row missing from the store."""
+        memory = NexusMemoryCore(embedding_dim=32)
+        added, searched = threading.Event(), threading.Event()
+        errors = []
+        index_add = memory.index.add
+
+        def add(vector, metadata):
+            row = index_add(vector, metadata)
+            added.set()
+            searched.wait(0.2)  # let the reader run between the index row and the store append
+            return row
+
+        def search():
+            added.wait(1.0)
+            try:
+                memory.search("security posture", k=10)
+            except Exception as e:
+                errors.append(e)
+            searched.set()
+
+        memory.index.add = add
+        reader = threading.Thread(target=search)
+        reader.start()
+        memory.add_nodes([MemoryNode("new", "security posture", {"type": "product_knowledge"})])
+        reader.join()
+
+        assert errors == []
@@ -0,0 +1,101 @@
+"""
+Unit tests for the persistent, memory-mapped brand memory.
+"""
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from memory import MemoryNode, NexusMemoryCore
+from memory_store import PersistentVectorIndex
+
+
+class TestPersistentMemory:
+    """Tests for durability, supersession and compaction."""
+
+    def test_learning_survives_restart_without_bootstrap(self, tmp_path):
+        """Test that update_learning results are visible to a fresh process-like instance."""
+        path = str(tmp_path / "memory")
+        first = NexusMemoryCore(storage_path=path)
+        first.update_learning("camp_1", 0.9, "Loss Aversion")
+
+        second = NexusMemoryCore(storage_path=path)
+
+        assert second.index.size == first.index.size == 4
+        assert isinstance(second.index.matrix, np.memmap)
+        hits = second.search("Loss Aversion campaign", node_type="historical_performance", k=5)
+        assert any(node.node_id == "learning_camp_1" for node, _ in hits)
+
+    def test_rewritten_node_supersedes_older_row(self, tmp_path):
+        """Test that a node id written twice is only returned once, with its latest content."""
+        memory = NexusMemoryCore(storage_path=str(tmp_path / "memory"))
+        memory.index.compaction_threshold = 1.1  # keep both rows on disk
+        memory.update_learning("latest", 0.2, "Angle A")
+        memory.update_learning("latest", 0.8, "Angle B")
+
+        hits = [node for node, _ in memory.search("campaign angle", node_type="historical_performance", k=10)
+                if node.node_id == "learning_latest"]
+
+        assert len(hits) == 1
+        assert "Angle B" in hits[0].content
+
+    def test_compaction_keeps_live_rows(self, tmp_path):
+        """Test that compaction drops superseded rows and switches generation."""
+        path = str(tmp_path / "memory")
+        index = PersistentVectorIndex(path, dim=4, compaction_threshold=1.1)
+        vector = np.eye(4, dtype=np.float32)[:1]
+        for content in ("v1", "v2", "v3"):
+            index.add_nodes([MemoryNode("same", content, {"type": "note", "brand": "A"})], vector)
+
+        index.compact()
+
+        assert index.size == 1
+        assert index._generation == "gen-00001"
+        (node, _), = index.search_nodes(vector[0], filters={"brand": "A"})
+        assert node.content == "v3"
+
+    def test_add_honours_the_vector_index_contract(self, tmp_path):
+        """Test that the inherited VectorIndex.add persists a searchable row and returns it."""
+        index = PersistentVectorIndex(str(tmp_path / "memory"), dim=4)
+        vector = np.eye(4, dtype=np.float32)[2]
+
+        row = index.add(vector, {"type": "note", "brand": "A"})
+
+        assert row == 0
+        assert index.search(vector, filters={"brand": "A"}) == [(0, pytest.approx(1.0))]
+
+    def test_reader_survives_compaction_in_another_process(self, tmp_path):
+        """Test that rows found before another process compacted (twice) can still be materialised."""
+        path = str(tmp_path / "memory")
+        reader = PersistentVectorIndex(path, dim=4, compaction_threshold=1.1)
+        vector = np.eye(4, dtype=np.float32)[:1]
+        reader.add_nodes([MemoryNode("kept", "original", {"type": "note", "brand": "A"})], vector)
+        rows = [row for row, _ in reader.search(vector[0], filters={"brand": "A"})]
+
+        compactor = textwrap.dedent(f"""
+            import numpy as np
+            from memory import MemoryNode
+            from memory_store import PersistentVectorIndex
+            index = PersistentVectorIndex({path!r}, dim=4, compaction_threshold=1.1)
+            vector = np.eye(4, dtype=np.float32)[:1]
+            for content in ("second", "third"):
+                index.add_nodes([MemoryNode("kept", content, {{"type": "note", "brand": "A"}})], vector)
+                index.compact()
+        """)
+        subprocess.run([sys.executable, "-c", compactor], check=True, cwd=str(Path(__file__).parent))
+
+        assert not (tmp_path / "memory" / "gen-00000").exists()
+        assert reader.get_node(rows[0]).content == "original"
+        (node, _), = reader.search_nodes(vector[0], filters={"brand": "A"})
+        assert node.content == "third"
+
+    def test_dimension_mismatch_is_rejected(self, tmp_path):
+        """Test that an embedder with a different dimension cannot open the store."""
+        path = str(tmp_path / "memory")
+        PersistentVectorIndex(path, dim=4)
+
+        with pytest.raises(ValueError):
+            PersistentVectorIndex(path, dim=8)
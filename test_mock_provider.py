@@ -0,0 +1,84 @@
+"""
+Unit tests for the offline mock provider and its end-to-end use by the swarm.
+"""
+import json
+
+import pytest
+
+from agent import FitymiCopyAgent
+from mock_provider import MockLLM, MockProviderConfig, MockProviderError, configure_mock_provider
+from routing import RoutingPolicy, is_transient
+
+
+@pytest.fixture
+def instant_mock():
+    """Zero-latency mock installed process-wide for the duration of a test."""
+    yield configure_mock_provider(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+    configure_mock_provider(MockProviderConfig())
+
+
+class TestMockLLM:
+    """Tests for MockLLM."""
+
+    def test_same_prompt_same_answer(self):
+        """Test that content depends only on the seed and the prompt."""
+        a = MockLLM(MockProviderConfig(latency_ms=0))
+        b = MockLLM(MockProviderConfig(latency_ms=0))
+        assert a.render("sys", "write a headline") == b.render("sys", "write a headline")
+        assert a.render("sys", "write a headline") != a.render("sys", "write a tagline")
+
+    def test_formats_follow_the_prompt(self):
+        """Test that batch scoring, float scoring and variant prompts get parseable answers."""
+        mock = MockLLM(MockProviderConfig(latency_ms=0))
+        batch = json.loads(mock.render("Respond ONLY with valid JSON.", "[GENOME 0]\na\n[GENOME 1]\nb\nReturn ONLY a JSON array"))
+        assert [item["genome"] for item in batch] == [0, 1]
+        assert 0.0 <= float(mock.render("", "Output exclusively a single float number")) <= 1.0
+        variants = mock.render("Generate exactly 3 variations. Separate them ONLY with '===VAR==='.", "copy")
+        assert len(variants.split("===VAR===")) == 3
+
+    @pytest.mark.asyncio
+    async def test_error_rate_raises_transient_errors(self):
+        """Test that simulated failures are classified as transient by the router."""
+        mock = MockLLM(MockProviderConfig(latency_ms=0, error_rate=1.0))
+        with pytest.raises(MockProviderError) as excinfo:
+            await mock.complete("sys", "user")
+        assert is_transient(excinfo.value)
+
+    @pytest.mark.asyncio
+    async def test_stream_reassembles_to_complete_answer(self):
+        """Test that streamed chunks join back to the non-streaming answer."""
+        mock = MockLLM(MockProviderConfig(latency_ms=0, tokens_per_second=0))
+        chunks = [chunk async for chunk in mock.stream("sys", "write a headline")]
+        assert len(chunks) > 1
+        assert "".join(chunks) == await mock.complete("sys", "write a headline")
+
+
+class TestProviderOverride:
+    """Tests for FITYMI_PROVIDER_OVERRIDE."""
+
+    @pytest.mark.asyncio
+    async def test_override_reroutes_agent_to_mock(self, monkeypatch, instant_mock):
+        """Test that any agent runs on the mock when the override is set."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        agent = FitymiCopyAgent(provider="google", model="gemini-1.5-pro", routing=RoutingPolicy(max_retries=0))
+        payload = agent.build_payload("Copywriter", {}, {}, "Write a headline", {"cta_style": "direct"})
+        response = await agent.execute(payload)
+        assert agent.route == "mock/gemini-1.5-pro"
+        assert response.aeo_summary
+        assert instant_mock.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_workflow_runs_end_to_end_offline(self, monkeypatch, instant_mock):
+        """Test that the full Nexus workflow completes on the mock with every stage timed."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        monkeypatch.delenv("FITYMI_MEMORY_DIR", raising=False)
+        from nexus import FitymiNexus, NexusContext
+
+        nexus = FitymiNexus()
+        context = NexusContext(brand="TechCorp", target_audience="CTOs", product="Scanner",
+                               goal="Demo", task_type="Landing", constraints={"max_words": 100})
+        result = await nexus.execute_workflow(context)
+
+        assert result["final_copy"]
+        assert 0.0 <= result["final_score"] <= 1.0
+        assert {"strategist", "evolution", "arena", "collapse", "evaluator"} <= set(result["timings"]["stages"])
@@ -0,0 +1,73 @@
+"""
+Unit tests for the local genome prefilter of the EvolutionEngine.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.evolution import CopyGenome, EvolutionEngine
+from core.prefilter import GenomePrefilter
+
+PARENT = "Ship secure releases faster. Automated scans catch vulnerabilities before your customers ever notice them."
+
+
+def _genome(gid, content):
+    return CopyGenome(id=gid, content=content)
+
+
+class TestGenomePrefilter:
+    """Tests for GenomePrefilter."""
+
+    def test_hard_rejections(self):
+        """Test that short, over-long, malformed and parent-duplicate candidates are rejected."""
+        prefilter = GenomePrefilter()
+        assert prefilter.rejection("Too short.", PARENT).startswith("too short")
+        assert prefilter.rejection(" ".join(["word"] * 60) + ".", PARENT, max_words=40).startswith("too long")
+        assert prefilter.rejection("##Heading without space\nThen some body text here.", PARENT).startswith("Malformed")
+        assert prefilter.rejection(PARENT.replace("them.", "them!"), PARENT) == "near-duplicate of the parent"
+        assert prefilter.rejection("Stop shipping bugs. Our scanner flags risky code in every pull request.", PARENT) is None
+
+    def test_select_keeps_best_distinct_candidates(self):
+        """Test that complete sentences rank above mid-sentence splices and duplicates are dropped."""
+        prefilter = GenomePrefilter(keep=2)
+        genomes = [
+            _genome("splice", "Stop shipping bugs because our scanner flags risky code in every pull"),
+            _genome("good", "Stop shipping bugs. Our scanner flags risky code in every single pull request you open."),
+            _genome("twin", "Stop shipping bugs. Our scanner flags risky code in every single pull request you open!"),
+            _genome("other", "Security reviews take weeks. Ours take minutes, and they run on every commit."),
+        ]
+        survivors = prefilter.select(genomes, parent=PARENT)
+        assert [g.id for g in survivors] == ["good", "other"]
+
+    def test_never_returns_empty(self):
+        """Test that the best candidate is kept when every candidate is rejected."""
+        prefilter = GenomePrefilter()
+        survivors = prefilter.select([_genome("a", "Tiny."), _genome("b", PARENT)], parent=PARENT, max_words="100")
+        assert len(survivors) == 1
+
+
+class TestPrefilteredEvolution:
+    """Tests for prefiltering inside evolve."""
+
+    @pytest.mark.asyncio
+    async def test_only_survivors_reach_the_selector(self, monkeypatch):
+        """Test that rejected genomes are never sent to LLM scoring."""
+        monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+        engine = EvolutionEngine(prefilter=GenomePrefilter(keep=3))
+        engine.mutate = AsyncMock(return_value=[
+            _genome("fallback", "Sure!"),
+            _genome("copy", PARENT.replace("them.", "them!")),
+            _genome("fresh", "Security reviews take weeks. Ours take minutes, and they run on every commit."),
+        ])
+
+        async def score(genomes, target_audience):
+            for genome in genomes:
+                genome.fitness_score = 0.8
+            return genomes
+
+        engine.evaluate_fitness = AsyncMock(side_effect=score)
+        best = await engine.evolve(PARENT, "CTOs", generations=1)
+
+        scored = engine.evaluate_fitness.await_args.args[0]
+        assert [g.id for g in scored] == ["fresh"]
+        assert best.id == "fresh"
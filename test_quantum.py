@@ -0,0 +1,142 @@
+"""
+Unit tests for parallel quantum state generation and the collapse modes.
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.quantum import QuantumCopyState, QuantumStateGenerator, WaveFunctionCollapse
+
+COPY = "Ship secure releases faster with automated scans."
+
+
+@pytest.fixture
+def mock_provider(monkeypatch):
+    monkeypatch.setenv("FITYMI_PROVIDER_OVERRIDE", "mock")
+
+
+class TestQuantumStateGenerator:
+    """Tests for QuantumStateGenerator."""
+
+    @pytest.mark.asyncio
+    async def test_one_concurrent_call_per_tone(self, mock_provider):
+        """Test that every tone gets its own call, started concurrently, and states keep tone order."""
+        generator = QuantumStateGenerator(tones=["Emotional", "Rational", "Urgent"])
+        in_flight, peak = 0, 0
+
+        async def fire(input_signal, task):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return f"{input_signal.splitlines()[0]} version of the copy."
+
+        generator.node.fire = fire
+        states = await generator.generate(COPY)
+
+        assert peak == 3
+        assert [s.split()[1] for s in states] == ["Emotional", "Rational", "Urgent"]
+
+    @pytest.mark.asyncio
+    async def test_empty_tone_is_retried_and_failed_tone_dropped(self, mock_provider):
+        """Test that an empty answer is asked again while a provider error (already retried by the router) drops the tone."""
+        generator = QuantumStateGenerator(tones=["Emotional", "Rational"], retries=1)
+        attempts = {"Emotional": 0, "Rational": 0}
+
+        async def fire(input_signal, task):
+            tone = input_signal.split()[1]
+            attempts[tone] += 1
+            if tone == "Emotional":
+                raise RuntimeError("provider error")
+            return "A calm, rational version of the copy." if attempts[tone] > 1 else ""
+
+        generator.node.fire = fire
+        states = await generator.generate(COPY)
+
+        assert attempts == {"Emotional": 1, "Rational": 2}
+        assert states == ["A calm, rational version of the copy."]
+
+    @pytest.mark.asyncio
+    async def test_collapse_starts_without_the_slowest_tone(self, mock_provider):
+        """Test that generation returns once `min_states` states exist and cancels the stragglers."""
+        generator = QuantumStateGenerator(tones=["Emotional", "Rational", "Urgent"], min_states=2)
+        cancelled = []
+
+        async def fire(input_signal, task):
+            tone = input_signal.split()[1]
+            try:
+                await asyncio.sleep(5 if tone == "Urgent" else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(tone)
+                raise
+            return f"The {tone} version of the copy."
+
+        generator.node.fire = fire
+        states = await asyncio.wait_for(generator.generate(COPY), timeout=1)
+        await asyncio.sleep(0)
+
+        assert states == ["The Emotional version of the copy.", "The Rational version of the copy."]
+        assert cancelled == ["Urgent"]
+
+    def test_tones_from_env(self, mock_provider, monkeypatch):
+        """Test that FITYMI_QUANTUM_TONES configures the tones."""
+        monkeypatch.setenv("FITYMI_QUANTUM_TONES", "Playful, Authoritative")
+        assert QuantumStateGenerator().tones == ["Playful", "Authoritative"]
+
+
+STATES = [
+    "Feel the relief of a release night without fear. Your team deserves to sleep.",
+    "Security audits for CTOs: cut review time by 60% with automated scans in your CI pipeline.",
+    "Only 3 days left! Book your demo now before the offer ends.",
+]
+CONTEXT = "Audience: CTOs. Goal constraints: security audits, review time, automated scans, CI pipeline."
+
+
+class TestWaveFunctionCollapse:
+    """Tests for the collapse modes of WaveFunctionCollapse."""
+
+    @pytest.mark.asyncio
+    async def test_index_mode_returns_the_validated_state(self, mock_provider):
+        """Test that the observer answers with a number and the state text is taken locally."""
+        collapse = WaveFunctionCollapse(mode="index")
+        collapse.observer.fire = AsyncMock(return_value="State 3")
+        tokens = []
+
+        result = await collapse.observe(QuantumCopyState(states=STATES), CONTEXT, on_token=tokens.append)
+
+        assert result == STATES[2]
+        assert tokens == [STATES[2]]
+        assert "number of the best state (1-3)" in collapse.observer.fire.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_invalid_index_falls_back_to_local_ranking(self, mock_provider):
+        """Test that an out-of-range answer is rejected in favour of the best local state."""
+        collapse = WaveFunctionCollapse(mode="index")
+        collapse.observer.fire = AsyncMock(return_value="7")
+
+        assert await collapse.observe(QuantumCopyState(states=STATES), CONTEXT) == STATES[1]
+
+    @pytest.mark.asyncio
+    async def test_local_mode_skips_the_observer_on_a_clear_winner(self, mock_provider):
+        """Test that a clear embedding margin collapses without any LLM call."""
+        collapse = WaveFunctionCollapse(mode="local", margin=0.05)
+        collapse.observer.fire = AsyncMock(return_value="1")
+
+        assert await collapse.observe(QuantumCopyState(states=STATES), CONTEXT) == STATES[1]
+        collapse.observer.fire.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_local_mode_escalates_on_a_close_call(self, mock_provider):
+        """Test that a margin below the threshold asks the observer for an index."""
+        collapse = WaveFunctionCollapse(mode="local", margin=10.0)
+        collapse.observer.fire = AsyncMock(return_value="1")
+
+        assert await collapse.observe(QuantumCopyState(states=STATES), CONTEXT) == STATES[0]
+        collapse.observer.fire.assert_awaited_once()
+
+    def test_unknown_mode_is_rejected(self, mock_provider):
+        """Test that an unsupported FITYMI_COLLAPSE_MODE fails fast."""
+        with pytest.raises(ValueError):
+            WaveFunctionCollapse(mode="telepathy")
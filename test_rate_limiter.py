@@ -0,0 +1,209 @@
+"""
+Unit tests for the adaptive RateLimiter in core/neural_mesh.py.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from agent import FitymiCopyAgent, FitymiPayload
+from cache import MemoryResponseCache
+from clients import ProviderClientRegistry
+from core.neural_mesh import PROVIDER_LIMITERS, RateLimiter, _parse_duration, _rate_limit_details, configure_provider_limit
+from routing import RoutingPolicy
+
+
+class TestRateLimiter:
+    """Tests for exact waits, FIFO fairness, token budgets and AIMD."""
+
+    @pytest.mark.asyncio
+    async def test_waits_exactly_for_next_slot(self):
+        """Test that an exhausted bucket waits for the refill time, not a polling multiple."""
+        limiter = RateLimiter(10, 1.0)  # one slot every 100ms
+        limiter.tokens = 0
+
+        start = time.perf_counter()
+        await limiter.acquire()
+        elapsed = time.perf_counter() - start
+
+        assert 0.08 <= elapsed < 0.15
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_fifo(self):
+        """Test that waiters acquire in arrival order."""
+        limiter = RateLimiter(100, 1.0)
+        limiter.tokens = 0
+        order = []
+
+        async def waiter(i):
+            await limiter.acquire()
+            order.append(i)
+
+        tasks = []
+        for i in range(5):
+            tasks.append(asyncio.create_task(waiter(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_token_budget_limits_throughput(self):
+        """Test that the tokens-per-period bucket delays large requests."""
+        limiter = RateLimiter(1000, 1.0, tokens_per_period=1000)
+        await limiter.acquire(tokens=1000)
+
+        start = time.perf_counter()
+        await limiter.acquire(tokens=100)
+        elapsed = time.perf_counter() - start
+
+        assert 0.08 <= elapsed < 0.2
+
+    def test_aimd_adjusts_rate(self):
+        """Test multiplicative decrease on 429 and additive recovery capped at the limit."""
+        limiter = RateLimiter(60, 60.0, additive_increase=5)
+        limiter.on_rate_limited()
+        assert limiter.rate == 30
+
+        for _ in range(10):
+            limiter.on_success()
+        assert limiter.rate == 60
+
+    def test_headers_calibrate_account_tier(self):
+        """Test that advertised limits and retry-after are honoured."""
+        limiter = RateLimiter(60, 60.0)
+        limiter.observe_headers({"x-ratelimit-limit-requests": "500", "retry-after": "2"})
+
+        assert limiter.max_rate == 500
+        assert limiter.blocked_until > time.monotonic() + 1
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def _payload():
+    return FitymiPayload(system_prompt="Role", user_context="Brief", task_definition="Write",
+                         verification_protocol="Check", aeo_shielding="Plain")
+
+
+def _routed_agent(monkeypatch, limiters, fallbacks=()):
+    monkeypatch.delenv("FITYMI_PROVIDER_OVERRIDE", raising=False)
+    policy = RoutingPolicy(deadline=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.01, fallbacks=list(fallbacks))
+    return FitymiCopyAgent(provider="mock", model="mock", routing=policy, limiters=limiters)
+
+
+class TestRoutedAttempts:
+    """Tests for per-attempt rate limiting in FitymiCopyAgent."""
+
+    @pytest.mark.asyncio
+    async def test_every_retry_acquires_and_reports(self, monkeypatch):
+        """Test that each retry takes a limiter slot and an intermediate 429 reaches AIMD."""
+        limiter = RateLimiter(60, 1.0)
+        agent = _routed_agent(monkeypatch, {"mock": limiter})
+        calls = []
+
+        async def dispatch(system_message, user_message, usage=None):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RateLimitError("429")
+            return "Copy"
+
+        agent._dispatch = dispatch
+        result = await agent.execute(_payload())
+
+        assert result.raw_output == "Copy"
+        assert len(calls) == 2
+        assert limiter.rate == 31  # halved by the 429, then +1 on success
+        assert limiter.tokens < 1  # the 429 drained the bucket and the retry waited for a fresh slot
+
+    @pytest.mark.asyncio
+    async def test_fallback_uses_its_own_limiter(self, monkeypatch):
+        """Test that a fallback route is throttled by its provider's limiter, not the primary's."""
+        primary, backup = RateLimiter(60, 60.0), RateLimiter(60, 60.0)
+        agent = _routed_agent(monkeypatch, {"mock": primary, "openai": backup}, fallbacks=["openai/gpt-4o"])
+
+        async def failing(system_message, user_message, usage=None):
+            raise ValueError("bad request")
+
+        async def working(system_message, user_message, usage=None):
+            return "From fallback"
+
+        agent._dispatch = failing
+        agent._route_agent("openai/gpt-4o")._dispatch = working
+        result = await agent.execute(_payload())
+
+        assert result.raw_output == "From fallback"
+        assert 58 < primary.tokens < 59.5
+        assert 58 < backup.tokens < 59.5
+
+    @pytest.mark.asyncio
+    async def test_streaming_cache_hits_keep_their_slot(self, monkeypatch):
+        """Test that a streamed cache hit is replayed without draining the provider limiter."""
+        monkeypatch.setenv("FITYMI_MOCK_LATENCY_MS", "0")
+        limiter = RateLimiter(60, 60.0)
+        agent = _routed_agent(monkeypatch, {"mock": limiter})
+        agent.cache = MemoryResponseCache()
+
+        first = [chunk async for chunk in agent.execute_stream(_payload())]
+        after_miss = limiter.tokens
+        second = [chunk async for chunk in agent.execute_stream(_payload())]
+
+        assert "".join(second) == "".join(first)
+        assert 58 < after_miss < 59.5
+        assert after_miss <= limiter.tokens < after_miss + 0.5
+
+    @pytest.mark.asyncio
+    async def test_successful_response_headers_calibrate_limiter(self, monkeypatch):
+        """Test that rate-limit headers of a successful pooled-client response reach the limiter."""
+        limiter = RateLimiter(60, 60.0, tokens_per_period=100_000)
+        agent = _routed_agent(monkeypatch, {"mock": limiter})
+        http_client = ProviderClientRegistry()._new_http_client()
+        http_client._transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}, headers={
+            "x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-tokens": "1200", "server": "test"}))
+
+        async def dispatch(system_message, user_message, usage=None):
+            await http_client.post("https://provider.test/v1/chat")
+            return "Copy"
+
+        agent._dispatch = dispatch
+        try:
+            await agent.execute(_payload())
+        finally:
+            await http_client.aclose()
+
+        assert limiter.max_rate == 500
+        assert limiter.token_budget == 1200
+
+
+class TestRateLimitHelpers:
+    """Tests for header parsing helpers."""
+
+    def test_parse_duration_formats(self):
+        """Test the duration formats used by provider reset headers."""
+        assert _parse_duration("12") == 12
+        assert _parse_duration("250ms") == 0.25
+        assert _parse_duration("6m0s") == 360
+        assert _parse_duration("soon") is None
+
+    def test_rate_limit_details_detects_429(self):
+        """Test that SDK errors carrying a 429 response expose their headers."""
+        response = SimpleNamespace(status_code=429, headers={"retry-after": "3"})
+        exc = Exception("too many")
+        exc.response = response
+
+        assert _rate_limit_details(exc) == {"retry-after": "3"}
+        assert _rate_limit_details(ValueError("bad")) is None
+
+    def test_configure_provider_limit_keeps_unset_dimensions(self, monkeypatch):
+        """Test that overriding only the TPM (or only the RPM) keeps the other configured limit."""
+        monkeypatch.setitem(PROVIDER_LIMITERS, "openai", RateLimiter(500, 60.0, tokens_per_period=90_000))
+
+        limiter = configure_provider_limit("openai", tpm=200_000)
+        assert (limiter.max_rate, limiter.token_capacity) == (500, 200_000)
+
+        limiter = configure_provider_limit("openai", rpm=800)
+        assert (limiter.max_rate, limiter.token_capacity) == (800, 200_000)
+        assert PROVIDER_LIMITERS["openai"] is limiter
@@ -0,0 +1,210 @@
+"""
+Unit tests for the provider routing layer (retries, fallbacks, hedging, circuit breaker).
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from core.neural_mesh import RateLimiter
+from routing import CircuitBreaker, ProviderRouter, RoutingPolicy, get_breaker, get_latency_tracker, is_transient
+
+
+class TransientError(Exception):
+    status_code = 503
+
+
+def _route(name):
+    # Breakers and latency trackers are process-wide: isolate each test
+    return f"{name}-{uuid.uuid4().hex[:6]}/model"
+
+
+def _policy(**overrides):
+    defaults = dict(deadline=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.01)
+    defaults.update(overrides)
+    return RoutingPolicy(**defaults)
+
+
+class TestProviderRouter:
+    """Tests for ProviderRouter.call."""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        """Test that a transient failure is retried on the same route."""
+        route = _route("primary")
+        calls = []
+
+        async def attempt():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TransientError("503")
+            return "ok"
+
+        assert await ProviderRouter(_policy()).call([route], {route: attempt}) == "ok"
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_falls_back_without_retry(self):
+        """Test that a non-transient error moves straight to the next route."""
+        primary, backup = _route("primary"), _route("backup")
+        calls = {primary: 0, backup: 0}
+
+        async def failing():
+            calls[primary] += 1
+            raise ValueError("bad request")
+
+        async def working():
+            calls[backup] += 1
+            return "from backup"
+
+        result = await ProviderRouter(_policy()).call([primary, backup], {primary: failing, backup: working})
+
+        assert result == "from backup"
+        assert calls == {primary: 1, backup: 1}
+
+    @pytest.mark.asyncio
+    async def test_deadline_triggers_fallback(self):
+        """Test that a stalled provider is abandoned after the per-call deadline."""
+        primary, backup = _route("stall"), _route("backup")
+
+        async def stall():
+            await asyncio.sleep(10)
+
+        async def working():
+            return "fast"
+
+        policy = _policy(deadline=0.05, max_retries=0)
+        assert await ProviderRouter(policy).call([primary, backup], {primary: stall, backup: working}) == "fast"
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_takes_first_result(self):
+        """Test that a hedge fires after the latency threshold and the faster answer wins."""
+        primary, backup = _route("slow"), _route("hedge")
+
+        async def slow():
+            await asyncio.sleep(0.5)
+            return "slow"
+
+        async def fast():
+            return "hedged"
+
+        policy = _policy(hedge=True, hedge_min_delay=0.02)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await ProviderRouter(policy).call([primary, backup], {primary: slow, backup: fast})
+
+        assert result == "hedged"
+        assert loop.time() - start < 0.3
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped(self):
+        """Test that routes with an open breaker are not called."""
+        primary, backup = _route("broken"), _route("backup")
+        breaker = get_breaker(primary)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        async def never():
+            raise AssertionError("should not be called")
+
+        async def working():
+            return "ok"
+
+        assert await ProviderRouter(_policy()).call([primary, backup], {primary: never, backup: working}) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_half_open_slot(self):
+        """Test that cancelling a half-open probe lets the next call probe the route."""
+        route = _route("probe")
+        breaker = get_breaker(route)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        breaker.reset_timeout = 0.0
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def working():
+            return "ok"
+
+        probe = asyncio.ensure_future(ProviderRouter(_policy(deadline=None)).call([route], {route: hang}))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert await ProviderRouter(_policy()).call([route], {route: working}) == "ok"
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_non_transient_probe_failure_releases_slot(self):
+        """Test that a probe failing with a permanent error does not leave the breaker stuck."""
+        route = _route("probe")
+        breaker = get_breaker(route)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        breaker.reset_timeout = 0.0
+
+        async def bad_request():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await ProviderRouter(_policy()).call([route], {route: bad_request})
+        assert breaker.allow() is True
+
+    @pytest.mark.asyncio
+    async def test_limiter_wait_is_outside_the_deadline(self):
+        """Test that queueing on a tight rate limiter neither times out attempts nor opens the breaker."""
+        route = _route("throttled")
+        limiter = RateLimiter(20, 1.0)  # 20 slots up front, then one every 50ms
+
+        async def acquire(name):
+            await limiter.acquire()
+
+        async def attempt():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        router = ProviderRouter(_policy(deadline=0.2, max_retries=0))
+        results = await asyncio.gather(*(router.call([route], {route: attempt}, acquire=acquire) for _ in range(30)),
+                                       return_exceptions=True)
+
+        assert results == ["ok"] * 30
+        assert get_breaker(route).state == "closed"
+        assert max(get_latency_tracker(route).samples) < 0.1
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_half_open_allows_single_probe(self):
+        """Test open -> half-open -> closed transitions."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+        breaker.record_failure()
+        breaker.record_failure()
+
+        assert breaker.state == "half_open"
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+
+class TestHelpers:
+    """Tests for error classification and latency percentiles."""
+
+    def test_is_transient(self):
+        """Test that 5xx/timeouts are transient and validation errors are not."""
+        assert is_transient(TransientError())
+        assert is_transient(asyncio.TimeoutError())
+        assert not is_transient(ValueError("bad"))
+
+    def test_latency_percentile_needs_samples(self):
+        """Test that hedging thresholds only kick in with enough observations."""
+        tracker = get_latency_tracker(_route("lat"))
+        assert tracker.percentile(0.95) is None
+        for i in range(20):
+            tracker.record(i / 10)
+        assert tracker.percentile(0.95) == pytest.approx(1.9)
@@ -0,0 +1,96 @@
+"""
+Unit tests for the DAGScheduler used by FitymiNexus.execute_workflow.
+"""
+import asyncio
+import time
+
+import pytest
+
+from core.scheduler import DAGScheduler
+
+
+def _sleeper(value, delay):
+    async def stage(deps):
+        await asyncio.sleep(delay)
+        return value
+    return stage
+
+
+class TestDAGScheduler:
+    """Tests for dependency resolution and concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_dependencies_receive_upstream_results(self):
+        """Test that a stage receives the results of its dependencies."""
+        dag = DAGScheduler()
+        dag.add_stage("a", _sleeper(1, 0))
+        dag.add_stage("b", _sleeper(2, 0))
+
+        async def total(deps):
+            return deps["a"] + deps["b"]
+
+        dag.add_stage("sum", total, depends_on=["a", "b"])
+        results = await dag.run()
+
+        assert results == {"a": 1, "b": 2, "sum": 3}
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_run_concurrently(self):
+        """Test that independent stages overlap instead of running serially."""
+        dag = DAGScheduler()
+        for name in ("a", "b", "c"):
+            dag.add_stage(name, _sleeper(name, 0.1))
+
+        start = time.perf_counter()
+        await dag.run()
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.25
+
+    @pytest.mark.asyncio
+    async def test_critical_path_follows_slowest_dependency(self):
+        """Test that the critical path walks back through the dependency that gated each stage."""
+        dag = DAGScheduler()
+        dag.add_stage("fast", _sleeper(None, 0.01))
+        dag.add_stage("slow", _sleeper(None, 0.1))
+        dag.add_stage("join", _sleeper(None, 0.01), depends_on=["fast", "slow"])
+        await dag.run()
+
+        path, latency_ms = dag.critical_path()
+        report = dag.report()
+
+        assert path == ["slow", "join"]
+        assert latency_ms >= 100
+        assert report["critical_path"] == path
+        assert set(report["stages"]) == {"fast", "slow", "join"}
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_pending_stages(self):
+        """Test that a failing stage propagates and cancels the rest of the graph."""
+        dag = DAGScheduler()
+
+        async def boom(deps):
+            raise RuntimeError("provider down")
+
+        dag.add_stage("boom", boom)
+        dag.add_stage("slow", _sleeper(None, 5))
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(dag.run(), timeout=1)
+
+    def test_cycle_is_rejected(self):
+        """Test that cyclic graphs are rejected before execution."""
+        dag = DAGScheduler()
+        dag.add_stage("a", _sleeper(None, 0), depends_on=["b"])
+        dag.add_stage("b", _sleeper(None, 0), depends_on=["a"])
+
+        with pytest.raises(ValueError):
+            asyncio.run(dag.run())
+
+    def test_unknown_dependency_is_rejected(self):
+        """Test that a dependency on an unregistered stage raises ValueError."""
+        dag = DAGScheduler()
+        dag.add_stage("a", _sleeper(None, 0), depends_on=["missing"])
+
+        with pytest.raises(ValueError):
+            asyncio.run(dag.run())
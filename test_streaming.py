@@ -0,0 +1,87 @@
+"""
+Unit tests for FitymiCopyAgent.execute_stream.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import asyncio
+
+import pytest
+
+from agent import FitymiCopyAgent, FitymiPayload
+from cache import MemoryResponseCache
+from routing import RoutingPolicy
+
+
+def _payload() -> FitymiPayload:
+    return FitymiPayload(
+        system_prompt="System",
+        user_context="Brief",
+        task_definition="Task",
+        verification_protocol="Verify",
+        aeo_shielding="Shield",
+    )
+
+
+def _openai_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class TestExecuteStream:
+    """Tests for token-level streaming."""
+
+    @pytest.mark.asyncio
+    async def test_openai_stream_yields_deltas(self):
+        """Test that OpenAI deltas are yielded in order, skipping empty ones."""
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o")
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(
+            return_value=_aiter([_openai_chunk("Hello"), _openai_chunk(None), _openai_chunk(" world")])
+        )
+
+        chunks = [chunk async for chunk in agent.execute_stream(_payload())]
+
+        assert chunks == ["Hello", " world"]
+        assert agent._openai_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_completed_stream_is_cached_and_replayed(self):
+        """Test that a finished stream is written to the cache and replayed as one chunk."""
+        cache = MemoryResponseCache()
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", cache=cache, role="observer")
+        agent._openai_client = MagicMock()
+        agent._openai_client.chat.completions.create = AsyncMock(
+            return_value=_aiter([_openai_chunk("Hello"), _openai_chunk(" world")])
+        )
+
+        [chunk async for chunk in agent.execute_stream(_payload())]
+        replay = [chunk async for chunk in agent.execute_stream(_payload())]
+
+        assert replay == ["Hello world"]
+        assert agent._openai_client.chat.completions.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stalled_stream_falls_back_before_first_chunk(self, monkeypatch):
+        """Test that a stream silent past the deadline fails over, and the fallback answer is not cached as the primary's."""
+        monkeypatch.delenv("FITYMI_PROVIDER_OVERRIDE", raising=False)
+        cache = MemoryResponseCache()
+        policy = RoutingPolicy(deadline=0.05, max_retries=0, fallbacks=["openai/gpt-4o-mini"])
+        agent = FitymiCopyAgent(provider="openai", model="gpt-4o", cache=cache, role="observer", routing=policy)
+
+        async def stalled(system_message, user_message, usage=None):
+            await asyncio.sleep(10)
+            yield "never"
+
+        agent._stream_openai = stalled
+        agent._route_agent("openai/gpt-4o-mini")._stream_openai = lambda *args: _aiter(["From", " fallback"])
+
+        chunks = [chunk async for chunk in agent.execute_stream(_payload())]
+
+        assert chunks == ["From", " fallback"]
+        agent._stream_openai = lambda *args: _aiter(["From primary"])
+        assert [chunk async for chunk in agent.execute_stream(_payload())] == ["From primary"]
@@ -0,0 +1,70 @@
+"""
+Unit tests for the in-memory template registry.
+"""
+import os
+
+import pytest
+from pydantic import ValidationError
+
+from agent import FitymiCopyAgent, FitymiPayload
+from template_registry import TemplateRegistry, get_template_registry
+
+
+class TestTemplateRegistry:
+    """Tests for TemplateRegistry."""
+
+    def test_repository_frameworks_are_discovered(self):
+        """Test that the root markdown frameworks are registered by name, README excluded."""
+        registry = get_template_registry()
+        assert "master_framework" in registry.frameworks()
+        assert "ad_copy_facebook" in registry.frameworks()
+        assert "readme" not in registry.frameworks()
+        assert "[LAYER 1]" in registry.get("master_framework")
+        assert "<html" in registry.get("dashboard").lower()
+
+    def test_changed_file_is_reloaded(self, tmp_path):
+        """Test that an edited framework is picked up through its mtime."""
+        path = tmp_path / "Custom_Framework.md"
+        path.write_text("v1", encoding="utf-8")
+        registry = TemplateRegistry(root=tmp_path, check_interval=0)
+        assert registry.get("custom_framework") == "v1"
+
+        path.write_text("version 2", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert registry.get("custom_framework") == "version 2"
+
+    def test_checks_are_throttled(self, tmp_path):
+        """Test that within the check interval lookups are served from memory."""
+        path = tmp_path / "Framework.md"
+        path.write_text("cached", encoding="utf-8")
+        registry = TemplateRegistry(root=tmp_path, check_interval=3600)
+
+        path.unlink()
+        assert registry.get("framework") == "cached"
+        assert registry.get("dashboard") == ""
+        with pytest.raises(KeyError):
+            registry.get("unknown")
+
+
+class TestFrameworkSelection:
+    """Tests for named frameworks in prompts and requests."""
+
+    def test_payload_framework_is_used_in_prompt(self):
+        """Test that the payload's framework is appended as the framework reference."""
+        agent = FitymiCopyAgent(provider="mock", model="mock")
+        payload = FitymiPayload(system_prompt="System", user_context="Brief", task_definition="Task",
+                                verification_protocol="Verify", aeo_shielding="Shield", framework="ad_copy_facebook")
+        _, user_message = agent._build_full_prompt(payload)
+        assert get_template_registry().get("ad_copy_facebook") in user_message
+
+        with pytest.raises(ValueError):
+            agent._build_full_prompt(payload.model_copy(update={"framework": "missing"}))
+
+    def test_unknown_framework_is_rejected_by_context(self):
+        """Test that NexusContext validates the framework name."""
+        from nexus import NexusContext
+
+        with pytest.raises(ValidationError):
+            NexusContext(brand="B", target_audience="T", product="P", goal="G", task_type="Ad",
+                         constraints={}, framework="missing")
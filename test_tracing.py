@@ -0,0 +1,107 @@
+"""
+Unit tests for the tracing spans and Prometheus histograms.
+"""
+import asyncio
+import json
+
+import pytest
+
+from tracing import Histogram, Tracer, annotate, current_span
+
+
+class TestTracer:
+    """Tests for Tracer spans."""
+
+    @pytest.mark.asyncio
+    async def test_spans_nest_across_tasks(self):
+        """Test that spans opened in child tasks share the trace and point at their parent."""
+        tracer = Tracer()
+
+        async def child(i):
+            with tracer.span("node.process", node=f"n{i}", provider="mock", model="m"):
+                await asyncio.sleep(0)
+
+        with tracer.span("workflow") as root:
+            await asyncio.gather(child(1), child(2))
+
+        spans = tracer.spans(trace_id=root.trace_id)
+        children = [s for s in spans if s.name == "node.process"]
+        assert len(children) == 2
+        assert all(s.parent_id == root.span_id for s in children)
+        assert current_span() is None
+
+    def test_errors_are_recorded(self):
+        """Test that an exception marks the span and increments the error counter."""
+        tracer = Tracer()
+        with pytest.raises(RuntimeError):
+            with tracer.span("stage", stage="arena"):
+                raise RuntimeError("boom")
+
+        span = tracer.spans()[-1]
+        assert span.status == "error"
+        assert "boom" in span.error
+        assert 'fitymi_span_errors_total{span="stage"} 1' in tracer.render_prometheus()
+
+    def test_annotate_tags_current_span_only(self):
+        """Test that annotate is a no-op outside spans and tags the innermost one inside."""
+        tracer = Tracer()
+        annotate(cache="hit")
+        with tracer.span("node.process") as outer:
+            with tracer.span("llm.call") as inner:
+                annotate(cache="hit", retries=1)
+        assert inner.attributes == {"cache": "hit", "retries": 1}
+        assert outer.attributes == {}
+
+    def test_export_json_and_disabled_tracer(self):
+        """Test JSON export and that a disabled tracer records nothing."""
+        tracer = Tracer()
+        with tracer.span("limiter.wait", provider="google"):
+            pass
+        exported = json.loads(tracer.export_json())
+        assert exported[0]["name"] == "limiter.wait"
+        assert exported[0]["attributes"]["provider"] == "google"
+
+        disabled = Tracer(enabled=False)
+        with disabled.span("workflow") as span:
+            assert span is None
+        assert disabled.spans() == []
+
+    def test_jsonl_export_is_written_off_the_caller_thread(self, tmp_path):
+        """Test that finished spans reach the JSONL file through the writer thread, in order."""
+        path = tmp_path / "spans.jsonl"
+        tracer = Tracer(export_path=str(path))
+        for name in ("stage", "llm.call", "workflow"):
+            with tracer.span(name):
+                pass
+        tracer.flush()
+
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [line["name"] for line in lines] == ["stage", "llm.call", "workflow"]
+        assert tracer._exporter.name == "fitymi-trace-export"
+
+    def test_llm_call_tokens_are_counted(self):
+        """Test that llm.call spans feed the token counter."""
+        tracer = Tracer()
+        with tracer.span("llm.call", provider="mock", model="m", role="judge", cache="off", prompt_tokens=10) as span:
+            span.set(response_tokens=4)
+        text = tracer.render_prometheus()
+        assert 'fitymi_tokens_total{provider="mock",model="m",kind="prompt_tokens"} 10' in text
+        assert 'fitymi_tokens_total{provider="mock",model="m",kind="response_tokens"} 4' in text
+
+
+class TestHistogram:
+    """Tests for Histogram rendering."""
+
+    def test_buckets_are_cumulative(self):
+        """Test Prometheus bucket, sum and count lines."""
+        histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="arena")
+        histogram.observe(0.5, stage="arena")
+        histogram.observe(5.0, stage="arena")
+
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{stage="arena",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{stage="arena",le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{stage="arena",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{stage="arena"} 3' in lines
+        assert any(line.startswith('latency_seconds_sum{stage="arena"} 5.55') for line in lines)
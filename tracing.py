@@ -0,0 +1,268 @@
+import asyncio
+import atexit
+import bisect
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) spanning cache hits up to slow multi-round LLM stages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Span(BaseModel):
+    """One timed operation; `parent_id` links it into the trace of its workflow."""
+    trace_id: str
+    span_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    name: str
+    start_time: float = Field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, labelled by a fixed set of label names."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key))
+                sep = "," if labels else ""
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative:g}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series[-1]:g}')
+                block = f"{{{labels}}}" if labels else ""
+                lines.append(f"{self.name}_sum{block} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{block} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    """Monotonic Prometheus counter."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key))
+                lines.append(f"{self.name}{{{labels}}} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Span name -> (histogram name, span attributes used as labels)
+SPAN_METRICS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "workflow": ("fitymi_workflow_duration_seconds", ()),
+    "stage": ("fitymi_stage_duration_seconds", ("stage",)),
+    "node.process": ("fitymi_node_duration_seconds", ("node", "provider", "model")),
+    "llm.call": ("fitymi_llm_call_duration_seconds", ("provider", "model", "role", "cache")),
+    "limiter.wait": ("fitymi_limiter_wait_seconds", ("provider",)),
+    "arena.round": ("fitymi_arena_round_duration_seconds", ("round",)),
+    "evolution.generation": ("fitymi_evolution_generation_duration_seconds", ("generation",)),
+}
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("fitymi_current_span", default=None)
+
+
+class Tracer:
+    """
+    In-process tracer. Spans nest through a context variable, so they follow asyncio tasks
+    and `asyncio.to_thread` calls spawned inside them. Finished spans land in a bounded
+    ring buffer (exportable as JSON) and feed the latency histograms of SPAN_METRICS.
+    The optional JSONL sink is written in batches by a background thread, off the event loop.
+    """
+
+    def __init__(self, buffer_size: int = 5000, export_path: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._spans: Deque[Span] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._export_queue: "queue.Queue[Span]" = queue.Queue()
+        self._exporter: Optional[threading.Thread] = None
+        self.histograms: Dict[str, Histogram] = {
+            name: Histogram(metric, f"Duration of '{name}' spans in seconds.", labels)
+            for name, (metric, labels) in SPAN_METRICS.items()
+        }
+        self.tokens = Counter("fitymi_tokens_total", "Prompt, cached prompt and response tokens per provider/model.", ("provider", "model", "kind"))
+        self.errors = Counter("fitymi_span_errors_total", "Spans that ended with an exception.", ("span",))
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """FITYMI_TRACING (default on), FITYMI_TRACE_BUFFER and FITYMI_TRACE_FILE (JSONL sink)."""
+        return cls(
+            buffer_size=int(os.getenv("FITYMI_TRACE_BUFFER", "5000")),
+            export_path=os.getenv("FITYMI_TRACE_FILE") or None,
+            enabled=os.getenv("FITYMI_TRACING", "1").lower() not in ("0", "false", "no"),
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Time the enclosed block as a child of the current span (a new trace if there is none)."""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current_span.get()
+        span = Span(trace_id=parent.trace_id if parent else uuid.uuid4().hex, parent_id=parent.span_id if parent else None,
+                    name=name, attributes=attributes)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else "error"
+            span.error = repr(e)
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Async generators finalised from another context: nothing to restore
+                pass
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+        if span.name in self.histograms:
+            labels = SPAN_METRICS[span.name][1]
+            self.histograms[span.name].observe(span.duration_ms / 1000, **{k: span.attributes.get(k, "") for k in labels})
+        if span.status == "error":
+            self.errors.inc(span=span.name)
+        for kind in ("prompt_tokens", "cached_tokens", "response_tokens"):
+            # Counted once per provider call; node.process spans repeat the figures for readability
+            if span.name == "llm.call" and span.attributes.get(kind):
+                self.tokens.inc(span.attributes[kind], provider=span.attributes["provider"], model=span.attributes.get("model", ""), kind=kind)
+        if self.export_path:
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        """Queue the span for the JSONL writer thread, starting it on first use."""
+        with self._lock:
+            if self._exporter is None:
+                self._exporter = threading.Thread(target=self._write_spans, name="fitymi-trace-export", daemon=True)
+                self._exporter.start()
+                # Spans still queued when the process exits are written out first
+                atexit.register(self.flush)
+        self._export_queue.put(span)
+
+    def _write_spans(self) -> None:
+        while True:
+            batch = [self._export_queue.get()]
+            while True:
+                try:
+                    batch.append(self._export_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write("".join(span.model_dump_json() + "\n" for span in batch))
+            except OSError as e:
+                logger.warning(f"Trace export to {self.export_path} failed: {e}")
+            finally:
+                for _ in batch:
+                    self._export_queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every finished span has been written to the JSONL export."""
+        self._export_queue.join()
+
+    def spans(self, trace_id: Optional[str] = None, limit: Optional[int] = None) -> List[Span]:
+        """Finished spans, oldest first, optionally restricted to one trace."""
+        with self._lock:
+            spans = [s for s in self._spans if trace_id is None or s.trace_id == trace_id]
+        return spans[-limit:] if limit else spans
+
+    def export_json(self, trace_id: Optional[str] = None, limit: Optional[int] = None) -> str:
+        return json.dumps([s.model_dump() for s in self.spans(trace_id, limit)], default=str)
+
+    def render_prometheus(self) -> str:
+        """All histograms and counters in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        lines.extend(self.tokens.render())
+        lines.extend(self.errors.render())
+        return "\n".join(lines) + "\n"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Tag the current span (no-op outside a span), e.g. with cache status or retries."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer.from_env()
+        return _tracer
+
+
+def set_tracer(tracer: Tracer) -> None:
+    global _tracer
+    with _tracer_lock:
+        _tracer = tracer